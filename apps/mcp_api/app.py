@@ -32,16 +32,32 @@ from services.agent_workflows.results import (
     MongoDBWorkflowResultService,
     WorkflowResultService,
 )
+from services.memory_search import (
+    MemoryIndexCache,
+    MemorySearchService,
+    MongoDBMemorySearchService,
+)
 from services.agents.prompts import INVESTMENT_ADVISOR_PROMPT
-from services.agents.skills import SkillName, skills
+from services.agents.skill_registry import skill_registry
+from services.analytics.expressions import (
+    NamedExpression,
+    evaluate_expressions,
+)
+from services.analytics.valuation import run_dcf_valuation
 from models.user_context import (
     UserContext,
     UserConversationNotes,
 )
 from models.agent_reminder import AgentReminder
+from models.memory import (
+    MemorySnippet,
+    MemorySource,
+)
 from models.agent_workflow import (
     AgentWorkflow,
+    WorkflowExecutionMode,
     WorkflowResult,
+    WorkflowResultSummary,
     WorkflowStatus,
 )
 
@@ -66,13 +82,18 @@ class LoggingMiddleware(Middleware):
 @lifespan
 async def db_lifespan(server):
     db_client = AsyncMongoClient(settings.MONGO_URI)
-    yield {"db_client": db_client}
+    yield {"db_client": db_client, "memory_index_cache": MemoryIndexCache()}
     await db_client.close()
 
 
+def get_memory_search_service(ctx: Context = CurrentContext()) -> MemorySearchService:
+    db_client = ctx.lifespan_context["db_client"]
+    return MongoDBMemorySearchService(mongo_client=db_client, index_cache=ctx.lifespan_context["memory_index_cache"])
+
+
 def get_user_context_service(ctx: Context = CurrentContext()) -> UserContextService:
     db_client = ctx.lifespan_context["db_client"]
-    return MongoDBUserContextService(mongo_client=db_client)
+    return MongoDBUserContextService(mongo_client=db_client, memory_search_service=get_memory_search_service(ctx))
 
 
 def get_agent_reminder_service(ctx: Context = CurrentContext()) -> AgentReminderService:
@@ -87,7 +108,7 @@ def get_agent_workflow_service(ctx: Context = CurrentContext()) -> AgentWorkflow
 
 def get_workflow_result_service(ctx: Context = CurrentContext()) -> WorkflowResultService:
     db_client = ctx.lifespan_context["db_client"]
-    return MongoDBWorkflowResultService(mongo_client=db_client)
+    return MongoDBWorkflowResultService(mongo_client=db_client, memory_search_service=get_memory_search_service(ctx))
 
 
 mcp_app = FastMCP("InvestPal MCP Server", lifespan=db_lifespan)
@@ -135,7 +156,8 @@ async def get_current_datetime() -> str:
     name="getUserConversationNotes",
     description=(
         "Retrieve conversation notes for a user, ordered by most recent date first. "
-        "Allows the agent to recall specific details from past conversations."
+        "Allows the agent to recall specific details from past conversations. Older notes are merged into "
+        "weekly or monthly digests, with their period (e.g. 2026-W19 or 2026-05) set."
     ),
 )
 async def get_user_conversation_notes(
@@ -167,6 +189,27 @@ async def update_user_conversation_notes(
     )
 
 
+@mcp_app.tool(
+    name="searchUserMemory",
+    description=(
+        "Search all the conversation notes of a user, however old, and return only the notes most relevant "
+        "to the query with their date. Prefer this over getUserConversationNotes to recall a specific detail."
+    ),
+)
+async def search_user_memory(
+    user_id: Annotated[str, "The id of the user to search for"],
+    query: Annotated[str, "What to look for, in a few keywords, e.g. 'NVDA position sizing'"],
+    k: Annotated[int, "Maximum number of snippets to return. Defaults to 5."] = 5,
+    memory_search_service: MemorySearchService = Depends(get_memory_search_service),
+) -> list[MemorySnippet]:
+    return await memory_search_service.search(
+        user_id=user_id,
+        source=MemorySource.CONVERSATION_NOTES,
+        query=query,
+        k=max(1, min(k, 20)),
+    )
+
+
 @mcp_app.tool(
     name="createAgentReminder",
     description="Create a new reminder for the user.",
@@ -241,6 +284,7 @@ async def create_agent_workflow(
     name: Annotated[str, "A short human-readable name for the workflow"],
     description: Annotated[str, "Goal-only description of what the agent should achieve on each run. No tool names, no user data, no implementation steps — just the intent."],
     schedule: Annotated[str, "Cron expression for the schedule, e.g. '0 0 1 * *' for monthly on the 1st"],
+    execution_mode: Annotated[WorkflowExecutionMode, "'plan_execute' (default): data requests are planned up front and run in parallel, best for reviews and reports. 'react': each step is decided after the previous result, for tasks with conditional steps."] = WorkflowExecutionMode.PLAN_EXECUTE,
     agent_workflow_service: AgentWorkflowService = Depends(get_agent_workflow_service),
 ) -> AgentWorkflow:
     return await agent_workflow_service.create_workflow(
@@ -248,6 +292,7 @@ async def create_agent_workflow(
         name=name,
         description=description,
         schedule=schedule,
+        execution_mode=execution_mode,
     )
 
 
@@ -273,6 +318,7 @@ async def update_agent_workflow(
     description: Annotated[str | None, "Updated goal-only description. No tool names, no user data, no implementation steps. If omitted, existing description is kept."] = None,
     schedule: Annotated[str | None, "New cron schedule. If omitted, existing schedule is kept."] = None,
     status: Annotated[WorkflowStatus | None, "New status: 'active' or 'paused'. If omitted, existing status is kept."] = None,
+    execution_mode: Annotated[WorkflowExecutionMode | None, "New execution mode: 'plan_execute' or 'react'. If omitted, existing mode is kept."] = None,
     agent_workflow_service: AgentWorkflowService = Depends(get_agent_workflow_service),
 ) -> AgentWorkflow:
     return await agent_workflow_service.update_workflow(
@@ -282,6 +328,7 @@ async def update_agent_workflow(
         description=description,
         schedule=schedule,
         status=status,
+        execution_mode=execution_mode,
     )
 
 
@@ -302,14 +349,55 @@ async def delete_agent_workflow(
 
 @mcp_app.tool(
     name="getWorkflowResults",
-    description="Get the results of all past workflow runs for the user, ordered by most recent first. Use this when the user asks what the agent has done on their behalf since the last conversation.",
+    description=(
+        "Get a summary of all past workflow runs for the user, ordered by most recent first: what was found and done, "
+        "with the tickers, signals and actions of each run. Use this when the user asks what the agent has done on their "
+        "behalf since the last conversation, and getWorkflowResult with a result_id for the full report of a run."
+    ),
 )
 async def get_workflow_results(
     user_id: Annotated[str, "The id of the user to get workflow results for"],
     limit: Annotated[int | None, "Maximum number of results to return. Defaults to 10. Pass None to return all."] = 10,
     workflow_result_service: WorkflowResultService = Depends(get_workflow_result_service),
-) -> list[WorkflowResult]:
-    return await workflow_result_service.get_results(user_id=user_id, limit=limit)
+) -> list[WorkflowResultSummary]:
+    return await workflow_result_service.get_result_summaries(user_id=user_id, limit=limit)
+
+
+@mcp_app.tool(
+    name="getWorkflowResult",
+    description="Get the full report of a single workflow run.",
+)
+async def get_workflow_result(
+    user_id: Annotated[str, "The id of the user the result belongs to"],
+    result_id: Annotated[str, "The id of the result, from getWorkflowResults or searchWorkflowResults"],
+    workflow_result_service: WorkflowResultService = Depends(get_workflow_result_service),
+) -> WorkflowResult | str:
+    result = await workflow_result_service.get_result(user_id=user_id, result_id=result_id)
+    if result is None:
+        return f"Error: no workflow result with id '{result_id}' for this user."
+    return result
+
+
+@mcp_app.tool(
+    name="searchWorkflowResults",
+    description=(
+        "Search the reports of all past workflow runs of a user and return only the passages most relevant "
+        "to the query, with the workflow name, run date and result_id. Prefer this over getWorkflowResults "
+        "to find what a workflow found about a specific topic."
+    ),
+)
+async def search_workflow_results(
+    user_id: Annotated[str, "The id of the user to search for"],
+    query: Annotated[str, "What to look for, in a few keywords, e.g. 'AAPL earnings'"],
+    k: Annotated[int, "Maximum number of snippets to return. Defaults to 5."] = 5,
+    memory_search_service: MemorySearchService = Depends(get_memory_search_service),
+) -> list[MemorySnippet]:
+    return await memory_search_service.search(
+        user_id=user_id,
+        source=MemorySource.WORKFLOW_RESULTS,
+        query=query,
+        k=max(1, min(k, 20)),
+    )
 
 
 @mcp_app.tool(
@@ -317,55 +405,116 @@ async def get_workflow_results(
     description="Returns the available skill names. A skill is a set of instructions for performing a specific task, such as analyzing a company's balance sheet.",
 )
 async def get_skill_names() -> list[str]:
-    return [skill_name.value for skill_name in skills.keys()]
+    return [skill_name.value for skill_name in skill_registry.names]
+
+
+@mcp_app.tool(
+    name="getSkillTableOfContents",
+    description="Returns the sections of a skill with their ids and estimated token counts, to fetch only the sections needed with getSkill.",
+)
+async def get_skill_table_of_contents(
+    skill_name: Annotated[str, "The name of the skill"],
+) -> dict | str:
+    try:
+        entry = skill_registry.get(skill_name)
+    except ValueError:
+        return f"Skill '{skill_name}' not found. Use getSkillNames to see available skills."
+    return {
+        "skill_name": entry.name.value,
+        "etag": entry.etag,
+        "tokens": entry.tokens,
+        "sections": skill_registry.table_of_contents(entry.name),
+    }
 
 
 @mcp_app.tool(
     name="getSkill",
-    description="Returns the instructions for a specific skill. Use getSkillNames to retrieve the list of available skill names.",
+    description=(
+        "Returns the instructions for a specific skill, or only some of its sections. Use getSkillNames to retrieve "
+        "the list of available skill names and getSkillTableOfContents to list the sections of a skill. "
+        "Pass the etag of a previous response as if_none_match to skip the content when the skill hasn't changed."
+    ),
 )
 async def get_skill(
     skill_name: Annotated[str, "The name of the skill to retrieve"],
-) -> str:
+    sections: Annotated[list[str] | None, "Ids of the sections to return, from getSkillTableOfContents. Omit to get the whole skill."] = None,
+    if_none_match: Annotated[str | None, "The etag of the cached copy of the skill"] = None,
+) -> dict | str:
     try:
-        skill_enum = SkillName(skill_name)
+        entry = skill_registry.get(skill_name)
     except ValueError:
         return f"Skill '{skill_name}' not found. Use getSkillNames to see available skills."
-    return skills[skill_enum]
-
+    if if_none_match == entry.etag:
+        return {"skill_name": entry.name.value, "etag": entry.etag, "not_modified": True}
+    return {
+        "skill_name": entry.name.value,
+        "etag": entry.etag,
+        "not_modified": False,
+        "content": skill_registry.render(entry.name, sections),
+    }
 
-@mcp_app.tool(name="add", description="Add two numbers together.")
-async def add(
-    a: Annotated[float, "The first operand"],
-    b: Annotated[float, "The second operand"],
-) -> float:
-    return a + b
 
-
-@mcp_app.tool(name="subtract", description="Subtract b from a.")
-async def subtract(
-    a: Annotated[float, "The first operand"],
-    b: Annotated[float, "The second operand"],
-) -> float:
-    return a - b
-
-
-@mcp_app.tool(name="multiply", description="Multiply two numbers together.")
-async def multiply(
-    a: Annotated[float, "The first operand"],
-    b: Annotated[float, "The second operand"],
-) -> float:
-    return a * b
+@mcp_app.tool(
+    name="calculate",
+    description=(
+        "Evaluate a batch of named math expressions in a single call, e.g. all the ratios, margins, growth rates "
+        "and averages of an analysis at once. Supports + - * / // % **, comparisons, and/or/not, "
+        "'x if condition else y' and the functions abs, sqrt, log, log10, exp, round(x, digits), min, max, sum, "
+        "avg, mean (of arguments or of a [list]), pow, cagr(start, end, years), pct_change(old, new) and weighted_average([values], [weights]). "
+        "Returns the results by name plus an error message for every expression that failed."
+    ),
+)
+async def calculate(
+    expressions: Annotated[list[NamedExpression], "The expressions to evaluate. They can refer to the variables and to each other by name, in any order."],
+    variables: Annotated[dict[str, float] | None, "Input values by name"] = None,
+) -> dict:
+    return evaluate_expressions(
+        expressions={expression.name: expression.expression for expression in expressions},
+        variables=variables,
+    )
 
 
-@mcp_app.tool(name="divide", description="Divide a by b. Returns an error if b is zero.")
-async def divide(
-    a: Annotated[float, "The first operand"],
-    b: Annotated[float, "The second operand"],
-) -> float | str:
-    if b == 0:
-        return "Error: division by zero"
-    return a / b
+@mcp_app.tool(
+    name="calculateDcfValuation",
+    description=(
+        "Run a complete discounted cash flow valuation in a single call: the year by year DCF table, "
+        "terminal value, enterprise and equity value, values per share for every growth scenario, "
+        "a discount rate x terminal growth sensitivity matrix and margin of safety bands against the current price."
+    ),
+)
+async def calculate_dcf_valuation(
+    base_cash_flow: Annotated[float, "Cash flow of the base year, e.g. trailing free cash flow or normalized earnings power"],
+    growth_rates: Annotated[list[float], "Growth rate of every projected year as decimals. Pass [] for an earnings power value (no growth perpetuity)."],
+    discount_rate: Annotated[float, "Discount rate (cost of capital) as a decimal"],
+    terminal_growth_rate: Annotated[float | None, "Perpetual growth rate after the projection, as a decimal. Ignored if terminal_multiple is given."] = None,
+    terminal_multiple: Annotated[float | None, "Exit multiple applied to the last projected cash flow"] = None,
+    net_debt: Annotated[float, "Total debt minus excess cash, subtracted from the enterprise value"] = 0.0,
+    shares_outstanding: Annotated[float | None, "Diluted shares outstanding, to report values per share"] = None,
+    current_price: Annotated[float | None, "Current share price, to report margins of safety (requires shares_outstanding)"] = None,
+    mid_year_convention: Annotated[bool, "Discount cash flows from the middle of each year"] = False,
+    scenarios: Annotated[dict[str, list[float]] | None, "Additional named growth paths with as many years as growth_rates"] = None,
+    discount_rate_grid: Annotated[list[float] | None, "Discount rates for the sensitivity matrix"] = None,
+    terminal_growth_rate_grid: Annotated[list[float] | None, "Terminal growth rates for the sensitivity matrix"] = None,
+    margin_of_safety_levels: Annotated[list[float] | None, "Required margins of safety for the buy-below prices. Defaults to [0.2, 0.33, 0.5]."] = None,
+) -> dict | str:
+    try:
+        return run_dcf_valuation(
+            base_cash_flow=base_cash_flow,
+            growth_rates=growth_rates,
+            discount_rate=discount_rate,
+            terminal_growth_rate=terminal_growth_rate,
+            terminal_multiple=terminal_multiple,
+            net_debt=net_debt,
+            shares_outstanding=shares_outstanding,
+            current_price=current_price,
+            mid_year_convention=mid_year_convention,
+            scenarios=scenarios,
+            discount_rate_grid=discount_rate_grid,
+            terminal_growth_rate_grid=terminal_growth_rate_grid,
+            margin_of_safety_levels=margin_of_safety_levels,
+        )
+    except ValueError as e:
+        return f"Error: {e}"
 
 
 @mcp_app.prompt
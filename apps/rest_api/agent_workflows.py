@@ -12,7 +12,7 @@ from services.agent_workflows.workflow import (
     AgentWorkflowService,
     AgentWorkflowNotFoundError,
 )
-from models.agent_workflow import WorkflowStatus
+from models.agent_workflow import WorkflowExecutionMode, WorkflowResultHighlights, WorkflowStatus
 from services.agent_workflows.results import WorkflowResultService
 from services.agent_workflows.runner import WorkflowRunner
 from services.user_context import UserContextNotFoundError
@@ -27,6 +27,7 @@ class AgentWorkflowSchema(BaseModel):
     instructions: str
     schedule: str
     status: WorkflowStatus
+    execution_mode: WorkflowExecutionMode
     created_at: str
     last_run_at: str | None = None
     next_run_at: str | None = None
@@ -37,6 +38,7 @@ class CreateAgentWorkflowRequest(BaseModel):
     name: str
     instructions: str
     schedule: str
+    execution_mode: WorkflowExecutionMode = WorkflowExecutionMode.PLAN_EXECUTE
 
 
 class UpdateAgentWorkflowRequest(BaseModel):
@@ -44,6 +46,7 @@ class UpdateAgentWorkflowRequest(BaseModel):
     instructions: str | None = None
     schedule: str | None = None
     status: WorkflowStatus | None = None
+    execution_mode: WorkflowExecutionMode | None = None
 
 
 class WorkflowResultSchema(BaseModel):
@@ -51,8 +54,10 @@ class WorkflowResultSchema(BaseModel):
     workflow_id: str
     user_id: str
     workflow_name: str
-    output: str
     ran_at: str
+    summary: str | None = None
+    highlights: WorkflowResultHighlights | None = None
+    output: str | None = None
 
 
 @router.post("/workflows", response_model=AgentWorkflowSchema, status_code=http.HTTPStatus.CREATED)
@@ -66,6 +71,7 @@ async def create_workflow(
             name=body.name,
             instructions=body.instructions,
             schedule=body.schedule,
+            execution_mode=body.execution_mode,
         )
     except UserContextNotFoundError as e:
         raise HTTPException(status_code=http.HTTPStatus.NOT_FOUND, detail=str(e))
@@ -96,6 +102,7 @@ async def update_workflow(
             instructions=body.instructions,
             schedule=body.schedule,
             status=body.status,
+            execution_mode=body.execution_mode,
         )
     except AgentWorkflowNotFoundError as e:
         raise HTTPException(status_code=http.HTTPStatus.NOT_FOUND, detail=str(e))
@@ -123,11 +130,27 @@ async def check_and_run_workflows(
     background_tasks.add_task(runner.run_due_workflows)
 
 
-@router.get("/workflow_results/{user_id}", response_model=list[WorkflowResultSchema])
+@router.get("/workflow_results/{user_id}", response_model=list[WorkflowResultSchema], response_model_exclude_none=True)
 async def get_workflow_results(
     user_id: str,
     limit: int = 10,
+    include_output: bool = False,
     service: WorkflowResultService = Depends(get_workflow_result_service),
 ):
-    results = await service.get_results(user_id=user_id, limit=limit)
-    return [WorkflowResultSchema(**r.model_dump()) for r in results]
+    if include_output:
+        results = await service.get_results(user_id=user_id, limit=limit)
+        return [WorkflowResultSchema(**r.model_dump()) for r in results]
+    summaries = await service.get_result_summaries(user_id=user_id, limit=limit)
+    return [WorkflowResultSchema(user_id=user_id, **s.model_dump()) for s in summaries]
+
+
+@router.get("/workflow_results/{user_id}/{result_id}", response_model=WorkflowResultSchema)
+async def get_workflow_result(
+    user_id: str,
+    result_id: str,
+    service: WorkflowResultService = Depends(get_workflow_result_service),
+):
+    result = await service.get_result(user_id=user_id, result_id=result_id)
+    if result is None:
+        raise HTTPException(status_code=http.HTTPStatus.NOT_FOUND, detail=f"Workflow result {result_id} not found")
+    return WorkflowResultSchema(**result.model_dump())
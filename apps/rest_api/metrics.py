@@ -0,0 +1,66 @@
+import asyncio
+
+from fastapi import (
+    APIRouter,
+    Depends,
+)
+from pydantic import BaseModel
+
+from services.agents.scheduler import LLMAdmissionScheduler
+from services.agents.tool_cache import ToolResultCache
+from services.series_store import ColumnarSeriesStore
+from services.screener import ScreenerSnapshotStore
+from services.memory_search import MemoryIndexCache
+from services.agents.planning import plan_execute_metrics
+from services.agents.skill_router import skill_router_metrics
+from services.agents.tool_selection import tool_selection_metrics
+from services.agents.tool_schema import tool_schema_metrics
+from services.agents.model_router import model_router_metrics
+from services.agents.resilience import resilience_metrics
+from dependencies import (
+    get_llm_admission_scheduler,
+    get_tool_result_cache,
+    get_series_store,
+    get_screener_snapshot_store,
+    get_memory_index_cache,
+)
+
+
+router = APIRouter(tags=["Metrics"])
+
+
+class MetricsSchema(BaseModel):
+    llm_admission: dict
+    tool_result_cache: dict
+    series_store: dict | None
+    screener: dict
+    plan_execute: dict
+    skill_router: dict
+    memory_index: dict
+    tool_selection: dict
+    tool_schemas: dict
+    model_router: dict
+    llm_resilience: dict
+
+
+@router.get("/metrics", response_model=MetricsSchema)
+async def get_metrics(
+    admission_scheduler: LLMAdmissionScheduler = Depends(get_llm_admission_scheduler),
+    tool_result_cache: ToolResultCache = Depends(get_tool_result_cache),
+    series_store: ColumnarSeriesStore | None = Depends(get_series_store),
+    screener_snapshot_store: ScreenerSnapshotStore = Depends(get_screener_snapshot_store),
+    memory_index_cache: MemoryIndexCache = Depends(get_memory_index_cache),
+):
+    return MetricsSchema(
+        llm_admission=admission_scheduler.get_metrics(),
+        tool_result_cache=tool_result_cache.metrics.to_dict(),
+        series_store=await asyncio.to_thread(series_store.get_metrics) if series_store else None,
+        screener=screener_snapshot_store.get_metrics(),
+        plan_execute=plan_execute_metrics.to_dict(),
+        skill_router=skill_router_metrics.to_dict(),
+        memory_index=memory_index_cache.get_metrics(),
+        tool_selection=tool_selection_metrics.to_dict(),
+        tool_schemas=tool_schema_metrics.to_dict(),
+        model_router=model_router_metrics.to_dict(),
+        llm_resilience=resilience_metrics.to_dict(),
+    )
@@ -0,0 +1,64 @@
+import http
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+)
+from pydantic import (
+    BaseModel,
+    Field,
+)
+
+from config import settings
+from services.analytics.expressions import ExpressionError
+from services.screener import (
+    ScreenerError,
+    ScreenerService,
+)
+from dependencies import get_screener_service
+
+
+router = APIRouter(tags=["Screener"])
+
+
+class ScreenRequest(BaseModel):
+    filter_by: str | None = None
+    rank_by: str | None = None
+    descending: bool = True
+    sectors: list[str] | None = None
+    limit: int = Field(default=20, ge=1, le=settings.SCREENER_MAX_RESULTS)
+
+
+class ScreenResultsSchema(BaseModel):
+    columns: list[str]
+    rows: list[list]
+
+
+class ScreenResponse(BaseModel):
+    matches: int
+    universe_size: int
+    results: ScreenResultsSchema
+    snapshot_age_seconds: int
+    screen_ms: float
+
+
+@router.post("/screener", response_model=ScreenResponse)
+async def screen_stocks(
+    request: ScreenRequest,
+    screener_service: ScreenerService = Depends(get_screener_service),
+):
+    try:
+        result = await screener_service.screen(
+            filter_by=request.filter_by,
+            rank_by=request.rank_by,
+            descending=request.descending,
+            sectors=request.sectors,
+            limit=request.limit,
+        )
+    except ExpressionError as e:
+        raise HTTPException(status_code=http.HTTPStatus.BAD_REQUEST, detail=str(e))
+    except ScreenerError as e:
+        raise HTTPException(status_code=http.HTTPStatus.SERVICE_UNAVAILABLE, detail=str(e))
+
+    return ScreenResponse(**result)
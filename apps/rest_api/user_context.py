@@ -2,6 +2,7 @@ import http
 
 from fastapi import (
     APIRouter, 
+    BackgroundTasks,
     Depends, 
     HTTPException
 )
@@ -75,3 +76,11 @@ async def update_user_context(request: UserContextSchema, user_context_service:
         created_at=user_context.created_at,
         updated_at=user_context.updated_at,
     )
+
+@router.post("/user_context/conversation_notes/compact", status_code=http.HTTPStatus.ACCEPTED)
+async def compact_conversation_notes(
+    background_tasks: BackgroundTasks,
+    user_context_service: UserContextService = Depends(get_user_context_service),
+):
+    """Endpoint called periodically by an external cron job. Compacts older conversation notes into digests asynchronously."""
+    background_tasks.add_task(user_context_service.compact_conversation_notes)
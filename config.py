@@ -1,5 +1,7 @@
 from enum import Enum
+from typing import Any
 
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class LLMProvider(str, Enum):
@@ -8,6 +10,24 @@ class LLMProvider(str, Enum):
     ANTHROPIC = "anthropic"
 
 
+class StoreBackend(str, Enum):
+    MEMORY = "memory"
+    MONGODB = "mongodb"
+
+
+class LLMFallbackSettings(BaseModel):
+    """The secondary model an agent type's model calls are hedged to and fail over to."""
+    provider: LLMProvider
+    model: str
+    hedge: bool = True                      # Send a duplicate request when the primary model is slow
+    hedge_percentile: float = 0.95          # Of the primary model's recent latencies, the hedge delay
+    hedge_min_seconds: float = 2.0          # Floor of the hedge delay
+    hedge_initial_seconds: float = 30.0     # Hedge delay until enough latencies are recorded
+    failover: bool = True                   # Retry on the secondary model on 429, 5xx, timeout or connection errors
+    breaker_failures: int = 5               # Consecutive primary failures that open the circuit breaker
+    breaker_cooldown_seconds: float = 30.0  # Time the primary model is skipped for once the breaker is open
+
+
 class Settings(BaseSettings):
     # MongoDB
     MONGO_URI: str
@@ -18,6 +38,10 @@ class Settings(BaseSettings):
     AGENT_REMINDERS_COLLECTION_NAME: str = "agent_reminders"
     AGENT_WORKFLOWS_COLLECTION_NAME: str = "agent_workflows"
     WORKFLOW_RESULTS_COLLECTION_NAME: str = "workflow_results"
+    RATE_LIMIT_COLLECTION_NAME: str = "rate_limits"
+    TOOL_RESULT_CACHE_COLLECTION_NAME: str = "tool_result_cache"
+    TOOL_PAYLOAD_STORE_COLLECTION_NAME: str = "tool_payloads"
+    MEMORY_INDEX_COLLECTION_NAME: str = "memory_index"
     # LLM
     LLM_PROVIDER: LLMProvider   # Default LLM provider
     LLM_MODEL: str              # Default LLM model
@@ -46,6 +70,7 @@ class Settings(BaseSettings):
         "getCompanyKpiMetrics",
         "getUserConversationNotes",
         "getWorkflowResults",
+        "getWorkflowResult",
         "getCryptocurrencyNews",
         "getCryptocurrencyDataById",
     ]
@@ -53,6 +78,28 @@ class Settings(BaseSettings):
     INVESTMENT_MANAGER_LLM_PROVIDER: LLMProvider = LLMProvider.ANTHROPIC
     INVESTMENT_MANAGER_LLM_MODEL: str = "claude-sonnet-4-6"
     INVESTMENT_MANAGER_TEMPERATURE: float = 0.1
+    # Model routing: simple chat turns run on the fast model, the others on INVESTMENT_MANAGER_LLM_MODEL
+    MODEL_ROUTER_ENABLED: bool = True
+    MODEL_ROUTER_FAST_LLM_PROVIDER: LLMProvider = LLMProvider.ANTHROPIC
+    MODEL_ROUTER_FAST_LLM_MODEL: str = "claude-haiku-4-5"
+    MODEL_ROUTER_FAST_MAX_CHARS: int = 280          # Longer user messages always go to the heavy model
+    MODEL_ROUTER_CLASSIFIER_ENABLED: bool = True    # Ask the fast model when the heuristics can't tell
+    # Tools the fast model hands the turn over to the heavy model for
+    MODEL_ROUTER_HEAVY_TOOLS: list[str] = [
+        "delegateResearch",
+        "calculateDcfValuation",
+        "analyzePortfolioRisk",
+        "comparePeers",
+        "screenStocks",
+        "getSkill",
+        "createAlpacaOrder",
+        "createCoinbaseOrder",
+    ]
+    # USD per million input and output tokens, per provider/model, for the cost estimates
+    LLM_PRICES_PER_MILLION_TOKENS: dict[str, tuple[float, float]] = {
+        "anthropic/claude-sonnet-4-6": (3.0, 15.0),
+        "anthropic/claude-haiku-4-5": (1.0, 5.0),
+    }
 
     USER_CONTEXT_MEMORY_MANAGER_LLM_PROVIDER: LLMProvider = LLMProvider.ANTHROPIC
     USER_CONTEXT_MEMORY_MANAGER_LLM_MODEL: str = "claude-haiku-4-5"
@@ -63,6 +110,187 @@ class Settings(BaseSettings):
     WORKFLOW_EXECUTION_AGENT_LLM_MODEL: str = "claude-sonnet-4-6"
     WORKFLOW_EXECUTION_AGENT_TEMPERATURE: float = 0.1
 
+    WORKFLOW_RESULT_SUMMARIZER_LLM_PROVIDER: LLMProvider = LLMProvider.ANTHROPIC
+    WORKFLOW_RESULT_SUMMARIZER_LLM_MODEL: str = "claude-haiku-4-5"
+    WORKFLOW_RESULT_SUMMARIZER_TEMPERATURE: float = 0.0
+    # Listed in place of the summary of a result until it is generated
+    WORKFLOW_RESULT_SUMMARY_FALLBACK_CHARS: int = 600
+
+    # Research sub-agents, run concurrently by delegateResearch
+    RESEARCH_SUB_AGENT_LLM_PROVIDER: LLMProvider = LLMProvider.ANTHROPIC
+    RESEARCH_SUB_AGENT_LLM_MODEL: str = "claude-haiku-4-5"
+    RESEARCH_SUB_AGENT_TEMPERATURE: float = 0.1
+    RESEARCH_SUB_AGENT_MAX_CONCURRENCY: int = 6
+    RESEARCH_SUB_AGENT_MAX_TASKS: int = 20
+    RESEARCH_SUB_AGENT_TIMEOUT_SECONDS: float = 180
+    # Market-data tools the sub-agents get besides the analytics tools
+    RESEARCH_SUB_AGENT_MARKET_DATA_TOOLS: list[str] = [
+        "getStockOverview",
+        "getStockFinancials",
+        "getMarketNews",
+        "getCompanyKpiMetrics",
+        "getEarningsCallTranscript",
+        "getInsiderTransactions",
+    ]
+
+    # Context prefetched at the start of every chat turn and inlined into the prompt
+    PREFETCH_NOTES_LIMIT: int = 5                   # Most recent dates of conversation notes
+    PREFETCH_NOTES_MAX_CHARS: int = 3_000
+    PREFETCH_REMINDERS_LIMIT: int = 10
+    PREFETCH_WORKFLOWS_LIMIT: int = 10
+    PREFETCH_WORKFLOW_RESULTS_LIMIT: int = 3
+    PREFETCH_WORKFLOW_RESULT_MAX_CHARS: int = 1_000  # Per result
+
+    # Schemas of the tools loaded from the MCP servers, shrunk once per load
+    TOOL_SCHEMA_MINIFY_ENABLED: bool = True
+    TOOL_DESCRIPTION_MAX_CHARS: int = 400
+    TOOL_PARAMETER_DESCRIPTION_MAX_CHARS: int = 160
+    # Per tool name, a "description" and/or "parameters" (parameter name -> description) used instead of the server's
+    TOOL_SCHEMA_OVERRIDES: dict[str, dict[str, Any]] = {}
+
+    # Tool selection: the broker, crypto and scheduling tools are only offered to the chat model when the turn needs them
+    TOOL_SELECTION_BY_INTENT_ENABLED: bool = True
+    TOOL_SELECTION_HISTORY_MESSAGES: int = 2        # Most recent user messages the intent is read from
+
+    # Conversation notes compaction: older daily notes are rolled into weekly, then monthly, digests
+    NOTES_COMPACTION_WEEKLY_AFTER_DAYS: int = 14    # Age of the last day of a week before it is compacted
+    NOTES_COMPACTION_MONTHLY_AFTER_DAYS: int = 90   # Age of the last day of a month before it is compacted
+    NOTES_DIGEST_MAX_LIST_ITEMS: int = 20           # Per note key, the newest items are kept
+    NOTES_DIGEST_MAX_TEXT_CHARS: int = 500          # Per note key, the newest segments are kept
+
+    # Skill router: injects the skill best matching the user message into the prompt
+    SKILL_ROUTER_ENABLED: bool = True
+    SKILL_ROUTER_MIN_SCORE: float = 9.0     # BM25 score of the best matching section plus the name match
+    SKILL_ROUTER_MIN_MARGIN: float = 1.2    # Ratio to the score of any other skill
+    SKILL_ROUTER_MAX_TOKENS: int = 2_000    # Injection budget, bigger skills are injected section by section
+
+    # Relevance search over conversation notes and workflow results
+    MEMORY_SEARCH_CHUNK_CHARS: int = 800            # Workflow reports are indexed passage by passage
+    MEMORY_SEARCH_CACHE_MAX_USERS: int = 500        # Users whose index is held in memory
+    MEMORY_SEARCH_CACHE_TTL_SECONDS: int = 300      # Picks up the chunks indexed by other processes
+
+    # Plan-then-execute mode (default for new workflows)
+    PLAN_EXECUTE_MAX_STEPS: int = 25
+    # Tools whose arguments must be decided from earlier results: a plan calling one
+    # of them is dropped and the run goes on in ReAct mode
+    PLAN_EXECUTE_REACT_ONLY_TOOLS: list[str] = [
+        "createAlpacaOrder",
+        "createCoinbaseOrder",
+    ]
+
+    # LLM admission scheduler
+    LLM_DEFAULT_CONCURRENCY_LIMIT: int = 4
+    # Per provider/model overrides, e.g. {"anthropic/claude-sonnet-4-6": 8}
+    LLM_CONCURRENCY_LIMITS: dict[str, int] = {}
+    # Slots of every pool that only interactive (chat) calls can use. Background calls always keep
+    # one slot, so a pool with no more slots than this reserves none (a warning is logged).
+    LLM_INTERACTIVE_RESERVED_SLOTS: int = 1
+    LLM_ADMISSION_WAIT_WARNING_SECONDS: float = 10.0
+    # Per provider/model request budgets enforced across all workers, e.g. {"anthropic/claude-sonnet-4-6": 50}
+    LLM_REQUESTS_PER_MINUTE: dict[str, int] = {}
+
+    # Hedged and failover model calls, per agent type: investment_manager, workflow_execution,
+    # research_sub_agent, user_context_memory_manager or workflow_result_summarizer, e.g.
+    # {"investment_manager": {"provider": "openai", "model": "gpt-4.1"}}
+    LLM_FALLBACKS: dict[str, LLMFallbackSettings] = {}
+    LLM_LATENCY_WINDOW: int = 200           # Recent latencies kept per model for the hedge delay
+    LLM_LATENCY_MIN_SAMPLES: int = 20
+
+    # Rate limiting
+    RATE_LIMIT_BACKEND: StoreBackend = StoreBackend.MONGODB
+    # Token-intensive tool calls are paced through a shared token bucket.
+    # Each call costs TOOL_RATE_LIMIT_COST (or TOKEN_INTENSIVE_TOOL_RATE_LIMIT_COST)
+    # and the bucket refills at TOOL_RATE_LIMIT_REFILL_PER_SECOND.
+    TOOL_RATE_LIMIT_BUCKET_CAPACITY: float = 125
+    TOOL_RATE_LIMIT_REFILL_PER_SECOND: float = 1.0
+    TOOL_RATE_LIMIT_COST: float = 90
+    TOKEN_INTENSIVE_TOOL_RATE_LIMIT_COST: float = 125
+    # Minimum interval between two workflow runs across the fleet
+    WORKFLOW_RUN_INTERVAL_SECONDS: float = 90
+
+    # Tool result cache
+    TOOL_RESULT_CACHE_BACKEND: StoreBackend = StoreBackend.MONGODB
+    TOOL_RESULT_CACHE_MAX_ENTRIES: int = 1000   # Only used by the in-memory backend
+    # Cacheable tools and their TTL in seconds. Tools scoped to a user or with side
+    # effects (orders, reminders, workflows, notes) must never be listed here.
+    TOOL_RESULT_CACHE_TTLS: dict[str, int] = {
+        "getStockOverview": 900,
+        "getStockFinancials": 6 * 3600,
+        "getCompanyKpiMetrics": 6 * 3600,
+        "getEarningsCallTranscript": 24 * 3600,
+        "getInsiderTransactions": 3600,
+        "getMarketNews": 600,
+        "getETF": 3600,
+        "getSectors": 3600,
+        "getSectorStocks": 3600,
+        "getEconomicIndicatorTimeSeries": 6 * 3600,
+        "getCommodityTimeSeries": 3600,
+        "getSuperInvestors": 24 * 3600,
+        "getSuperInvestorPortfolio": 6 * 3600,
+        "getCryptocurrencyNews": 600,
+        "getCryptocurrencyDataById": 300,
+        "getStockPriceHistory": 3600,
+    }
+
+    # Session tool memo
+    # Per tool staleness in seconds. Tools not listed here fall back to TOOL_RESULT_CACHE_TTLS.
+    SESSION_TOOL_MEMO_TTLS: dict[str, int] = {}
+    SESSION_TOOL_MEMO_MAX_ENTRIES: int = 30
+    SESSION_TOOL_MEMO_MAX_ENTRY_CHARS: int = 50_000     # Bigger results are stored as a digest
+    SESSION_TOOL_MEMO_DIGEST_CHARS: int = 4_000
+
+    # Tool output compaction (applies to TOKEN_INTENSIVE_TOOLS, except the calls scoped to a user)
+    TOOL_OUTPUT_COMPACTION_MIN_CHARS: int = 2_000   # Smaller outputs are passed through
+    TOOL_OUTPUT_COMPACTION_MAX_LIST_ITEMS: int = 20
+    TOOL_OUTPUT_COMPACTION_FLOAT_DIGITS: int = 4
+    # Full payloads of the compacted outputs, read back with getFullToolResult
+    TOOL_PAYLOAD_STORE_BACKEND: StoreBackend = StoreBackend.MONGODB
+    TOOL_PAYLOAD_STORE_TTL_SECONDS: int = 3600
+    TOOL_PAYLOAD_STORE_MAX_ENTRIES: int = 200   # Only used by the in-memory backend
+
+    # Market data used by the analytics tools
+    MARKET_DATA_MAX_CONCURRENT_REQUESTS: int = 5
+    # Market-data MCP tool returning daily bars, called with ticker, start_date and end_date
+    MARKET_DATA_PRICE_HISTORY_TOOL_NAME: str = "getStockPriceHistory"
+    # Market-data MCP tool returning the financial statements, called with ticker
+    MARKET_DATA_FINANCIALS_TOOL_NAME: str = "getStockFinancials"
+    # Market-data MCP tool returning the stock overview (market cap, price, sector), called with ticker
+    MARKET_DATA_OVERVIEW_TOOL_NAME: str = "getStockOverview"
+
+    # Local columnar store for price histories and financial statements
+    SERIES_STORE_ENABLED: bool = True
+    SERIES_STORE_DIR: str = ".cache/series_store"
+    SERIES_STORE_MAX_BYTES: int = 1024 ** 3
+    SERIES_STORE_MAX_AGE_SECONDS: int = 30 * 24 * 3600   # Series not updated for this long are evicted
+    # Stored series older than this get their new bars / quarters appended on the next read
+    PRICE_HISTORY_REFRESH_SECONDS: int = 3600
+    FINANCIALS_REFRESH_SECONDS: int = 24 * 3600
+
+    # Portfolio risk
+    RISK_BENCHMARK_TICKER: str = "SPY"
+    RISK_LOOKBACK_DAYS: int = 365
+
+    # Peer comparison
+    PEER_COMPARISON_MAX_TICKERS: int = 25
+
+    # Financial statement ratios
+    FINANCIAL_RATIO_CACHE_MAX_ENTRIES: int = 500
+
+    # Technical indicators
+    TECHNICALS_MAX_TICKERS: int = 25
+
+    # Stock screener
+    SCREENER_UNIVERSE: list[str] = [
+        "AAPL", "MSFT", "NVDA", "AMZN", "GOOGL", "META", "AVGO", "TSLA", "BRK.B", "JPM",
+        "LLY", "V", "UNH", "XOM", "MA", "JNJ", "PG", "HD", "COST", "ABBV",
+        "MRK", "WMT", "CVX", "KO", "PEP", "BAC", "ADBE", "CRM", "ORCL", "NFLX",
+        "AMD", "TMO", "MCD", "CSCO", "ABT", "ACN", "LIN", "DHR", "INTC", "WFC",
+        "TXN", "VZ", "PM", "NEE", "IBM", "QCOM", "CAT", "UNP", "HON", "T",
+        "AMGN", "LOW", "GS", "MS", "RTX", "SBUX", "BLK", "DE", "MMM", "MO",
+    ]
+    SCREENER_SNAPSHOT_PATH: str = ".cache/screener/snapshot.npz"
+    SCREENER_REFRESH_SECONDS: int = 24 * 3600   # Older snapshots are rebuilt in the background
+    SCREENER_MAX_RESULTS: int = 50
 
     # MCP APP
     MCP_APP_SERVER_PORT: int = 9000
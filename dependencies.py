@@ -12,13 +12,33 @@ from services.agents.agent import (
     Agent,
     InvestmentManagerAgent,
     UserContextMemoryManagerAgent,
+    ResearchSubAgent,
+    WorkflowResultSummarizerAgent,
 )
 from services.agents.middleware import (
     ToolErrorMiddleware,
     ToolLoggingMiddleware,
     ToolTokenRateLimitMiddleware,
+    ToolResultCacheMiddleware,
+    SessionToolMemoMiddleware,
+    ToolOutputCompactionMiddleware,
+    SkillInjectionMiddleware,
 )
+from services.agents.tool_selection import ToolSelectionMiddleware
+from services.agents.tool_cache import ToolResultCache
+from services.agents.compaction import ToolPayloadStore
+from services.agents.scheduler import LLMAdmissionScheduler
+from services.rate_limiter import TokenBucketRateLimiter
 from services.agent_service import InvestmentManagerAgentService
+from services.series_store import ColumnarSeriesStore
+from services.screener import (
+    ScreenerService,
+    ScreenerSnapshotStore,
+)
+from services.market_data import (
+    MarketDataService,
+    MCPMarketDataService,
+)
 from services.session import (
     MongoDBSessionService, 
     SessionService,
@@ -48,6 +68,11 @@ from services.agent_workflows.notifier import (
     MongoDBWorkflowNotifier,
 )
 from services.agent_workflows.runner import WorkflowRunner
+from services.memory_search import (
+    MemoryIndexCache,
+    MemorySearchService,
+    MongoDBMemorySearchService,
+)
 from services.agents.agent import WorkflowExecutionAgent
 
 def get_db_client(request: Request):
@@ -56,6 +81,55 @@ def get_db_client(request: Request):
     return request.app.state.mongodb_client
 
 
+def get_llm_admission_scheduler(request: Request) -> LLMAdmissionScheduler:
+    if not hasattr(request.app.state, "llm_admission_scheduler"):
+        raise HTTPException(status_code=500, detail="LLM admission scheduler not initialized")
+    return request.app.state.llm_admission_scheduler
+
+
+def get_rate_limiter(request: Request) -> TokenBucketRateLimiter:
+    if not hasattr(request.app.state, "rate_limiter"):
+        raise HTTPException(status_code=500, detail="Rate limiter not initialized")
+    return request.app.state.rate_limiter
+
+
+def get_tool_result_cache(request: Request) -> ToolResultCache:
+    if not hasattr(request.app.state, "tool_result_cache"):
+        raise HTTPException(status_code=500, detail="Tool result cache not initialized")
+    return request.app.state.tool_result_cache
+
+
+def get_tool_payload_store(request: Request) -> ToolPayloadStore:
+    if not hasattr(request.app.state, "tool_payload_store"):
+        raise HTTPException(status_code=500, detail="Tool payload store not initialized")
+    return request.app.state.tool_payload_store
+
+
+def get_series_store(request: Request) -> ColumnarSeriesStore | None:
+    if not hasattr(request.app.state, "series_store"):
+        raise HTTPException(status_code=500, detail="Series store not initialized")
+    return request.app.state.series_store
+
+
+def get_screener_snapshot_store(request: Request) -> ScreenerSnapshotStore:
+    if not hasattr(request.app.state, "screener_snapshot_store"):
+        raise HTTPException(status_code=500, detail="Screener snapshot store not initialized")
+    return request.app.state.screener_snapshot_store
+
+
+def get_memory_index_cache(request: Request) -> MemoryIndexCache:
+    if not hasattr(request.app.state, "memory_index_cache"):
+        raise HTTPException(status_code=500, detail="Memory index cache not initialized")
+    return request.app.state.memory_index_cache
+
+
+def get_memory_search_service(
+    db_client: AsyncMongoClient = Depends(get_db_client),
+    memory_index_cache: MemoryIndexCache = Depends(get_memory_index_cache),
+) -> MemorySearchService:
+    return MongoDBMemorySearchService(mongo_client=db_client, index_cache=memory_index_cache)
+
+
 def get_mcp_client(
     alpaca_api_key: str | None = Header(None, alias="X-Alpaca-Api-Key"),
     alpaca_api_secret: str | None = Header(None, alias="X-Alpaca-Api-Secret"),
@@ -69,23 +143,24 @@ def get_mcp_client(
         }
     }
 
-    if settings.ALPACA_MCP_SERVER_URL:
+    # Without the user's credentials, the broker and crypto servers are left out and their tools aren't loaded
+    if settings.ALPACA_MCP_SERVER_URL and alpaca_api_key and alpaca_api_secret:
         connections[settings.ALPACA_MCP_SERVER_NAME] = {
             "transport": "streamable_http",
             "url": settings.ALPACA_MCP_SERVER_URL,
             "headers": {
-                "X-Alpaca-Api-Key": alpaca_api_key or "",
-                "X-Alpaca-Api-Secret": alpaca_api_secret or "",
+                "X-Alpaca-Api-Key": alpaca_api_key,
+                "X-Alpaca-Api-Secret": alpaca_api_secret,
             }
         }
     
-    if settings.COINBASE_MCP_SERVER_URL:
+    if settings.COINBASE_MCP_SERVER_URL and coinbase_api_key and coinbase_api_secret:
         connections[settings.COINBASE_MCP_SERVER_NAME] = {
             "transport": "streamable_http",
             "url": settings.COINBASE_MCP_SERVER_URL,
             "headers": {
-                "X-Coinbase-Api-Key": coinbase_api_key or "",
-                "X-Coinbase-Api-Secret": coinbase_api_secret or "",
+                "X-Coinbase-Api-Key": coinbase_api_key,
+                "X-Coinbase-Api-Secret": coinbase_api_secret,
             }
         }
 
@@ -94,6 +169,28 @@ def get_mcp_client(
     return mcp_server_client
 
 
+def get_market_data_service(
+    mcp_client: MultiServerMCPClient = Depends(get_mcp_client),
+    tool_result_cache: ToolResultCache = Depends(get_tool_result_cache),
+    series_store: ColumnarSeriesStore | None = Depends(get_series_store),
+) -> MarketDataService:
+    return MCPMarketDataService(
+        mcp_client=mcp_client,
+        tool_result_cache=tool_result_cache,
+        series_store=series_store,
+    )
+
+
+def get_screener_service(
+    market_data_service: MarketDataService = Depends(get_market_data_service),
+    snapshot_store: ScreenerSnapshotStore = Depends(get_screener_snapshot_store),
+) -> ScreenerService:
+    return ScreenerService(
+        market_data_service=market_data_service,
+        snapshot_store=snapshot_store,
+    )
+
+
 def get_session_service(
     db_client: AsyncMongoClient = Depends(get_db_client),
 ) -> SessionService:
@@ -102,8 +199,9 @@ def get_session_service(
 
 def get_user_context_service(
     db_client: AsyncMongoClient = Depends(get_db_client),
+    memory_search_service: MemorySearchService = Depends(get_memory_search_service),
 ) -> UserContextService:
-    return MongoDBUserContextService(mongo_client=db_client)
+    return MongoDBUserContextService(mongo_client=db_client, memory_search_service=memory_search_service)
 
 
 def get_agent_reminder_service(
@@ -114,17 +212,80 @@ def get_agent_reminder_service(
 
 async def get_investment_manager_agent(
     mcp_client: MultiServerMCPClient = Depends(get_mcp_client),
+    admission_scheduler: LLMAdmissionScheduler = Depends(get_llm_admission_scheduler),
+    tool_result_cache: ToolResultCache = Depends(get_tool_result_cache),
+    tool_payload_store: ToolPayloadStore = Depends(get_tool_payload_store),
 ) -> InvestmentManagerAgent:
     agent = await InvestmentManagerAgent.create(
         mcp_client=mcp_client,
-        middleware=[ToolErrorMiddleware(), ToolLoggingMiddleware()],
+        middleware=[
+            ToolErrorMiddleware(),
+            ToolLoggingMiddleware(),
+            ToolOutputCompactionMiddleware(payload_store=tool_payload_store),
+            SessionToolMemoMiddleware(),
+            ToolResultCacheMiddleware(cache=tool_result_cache),
+            SkillInjectionMiddleware(),
+            ToolSelectionMiddleware(),
+        ],
+        admission_scheduler=admission_scheduler,
     )
     return agent
 
 
-async def get_user_context_memory_manager_agent() -> UserContextMemoryManagerAgent:
+async def get_research_sub_agent(
+    mcp_client: MultiServerMCPClient = Depends(get_mcp_client),
+    admission_scheduler: LLMAdmissionScheduler = Depends(get_llm_admission_scheduler),
+    tool_result_cache: ToolResultCache = Depends(get_tool_result_cache),
+    tool_payload_store: ToolPayloadStore = Depends(get_tool_payload_store),
+) -> ResearchSubAgent:
+    return await ResearchSubAgent.create(
+        mcp_client=mcp_client,
+        middleware=[
+            ToolErrorMiddleware(),
+            ToolLoggingMiddleware(),
+            ToolOutputCompactionMiddleware(payload_store=tool_payload_store),
+            ToolResultCacheMiddleware(cache=tool_result_cache),
+        ],
+        admission_scheduler=admission_scheduler,
+    )
+
+
+async def get_workflow_research_sub_agent(
+    mcp_client: MultiServerMCPClient = Depends(get_mcp_client),
+    admission_scheduler: LLMAdmissionScheduler = Depends(get_llm_admission_scheduler),
+    rate_limiter: TokenBucketRateLimiter = Depends(get_rate_limiter),
+    tool_result_cache: ToolResultCache = Depends(get_tool_result_cache),
+    tool_payload_store: ToolPayloadStore = Depends(get_tool_payload_store),
+) -> ResearchSubAgent:
+    # Research delegated by a workflow is paced by the same token bucket as the workflow agent's own tool calls
+    return await ResearchSubAgent.create(
+        mcp_client=mcp_client,
+        middleware=[
+            ToolErrorMiddleware(),
+            ToolLoggingMiddleware(),
+            ToolOutputCompactionMiddleware(payload_store=tool_payload_store),
+            ToolResultCacheMiddleware(cache=tool_result_cache),
+            ToolTokenRateLimitMiddleware(rate_limiter=rate_limiter),
+        ],
+        admission_scheduler=admission_scheduler,
+    )
+
+
+async def get_user_context_memory_manager_agent(
+    admission_scheduler: LLMAdmissionScheduler = Depends(get_llm_admission_scheduler),
+) -> UserContextMemoryManagerAgent:
     return UserContextMemoryManagerAgent(
         middleware=[ToolErrorMiddleware(), ToolLoggingMiddleware()],
+        admission_scheduler=admission_scheduler,
+    )
+
+
+def get_workflow_result_summarizer_agent(
+    admission_scheduler: LLMAdmissionScheduler = Depends(get_llm_admission_scheduler),
+) -> WorkflowResultSummarizerAgent:
+    return WorkflowResultSummarizerAgent(
+        middleware=[],
+        admission_scheduler=admission_scheduler,
     )
 
 
@@ -136,8 +297,9 @@ def get_agent_workflow_service(
 
 def get_workflow_result_service(
     db_client: AsyncMongoClient = Depends(get_db_client),
+    memory_search_service: MemorySearchService = Depends(get_memory_search_service),
 ) -> WorkflowResultService:
-    return MongoDBWorkflowResultService(mongo_client=db_client)
+    return MongoDBWorkflowResultService(mongo_client=db_client, memory_search_service=memory_search_service)
 
 
 def get_workflow_notifier(
@@ -153,14 +315,27 @@ async def get_workflow_runner(
     user_context_service: UserContextService = Depends(get_user_context_service),
     agent_reminder_service: AgentReminderService = Depends(get_agent_reminder_service),
     notifier: WorkflowNotifier = Depends(get_workflow_notifier),
+    admission_scheduler: LLMAdmissionScheduler = Depends(get_llm_admission_scheduler),
+    rate_limiter: TokenBucketRateLimiter = Depends(get_rate_limiter),
+    tool_result_cache: ToolResultCache = Depends(get_tool_result_cache),
+    tool_payload_store: ToolPayloadStore = Depends(get_tool_payload_store),
+    market_data_service: MarketDataService = Depends(get_market_data_service),
+    screener_service: ScreenerService = Depends(get_screener_service),
+    research_sub_agent: ResearchSubAgent = Depends(get_workflow_research_sub_agent),
+    memory_search_service: MemorySearchService = Depends(get_memory_search_service),
+    workflow_result_summarizer: WorkflowResultSummarizerAgent = Depends(get_workflow_result_summarizer_agent),
 ) -> WorkflowRunner:
     agent = await WorkflowExecutionAgent.create(
         mcp_client=mcp_client,
         middleware=[
             ToolErrorMiddleware(),
             ToolLoggingMiddleware(),
-            ToolTokenRateLimitMiddleware(),
+            ToolOutputCompactionMiddleware(payload_store=tool_payload_store),
+            ToolResultCacheMiddleware(cache=tool_result_cache),
+            ToolTokenRateLimitMiddleware(rate_limiter=rate_limiter),
+            SkillInjectionMiddleware(),
         ],
+        admission_scheduler=admission_scheduler,
     )
     return WorkflowRunner(
         workflow_execution_agent=agent,
@@ -169,6 +344,13 @@ async def get_workflow_runner(
         user_context_service=user_context_service,
         agent_reminder_service=agent_reminder_service,
         notifier=notifier,
+        rate_limiter=rate_limiter,
+        market_data_service=market_data_service,
+        screener_service=screener_service,
+        research_sub_agent=research_sub_agent,
+        memory_search_service=memory_search_service,
+        workflow_result_summarizer=workflow_result_summarizer,
+        tool_payload_store=tool_payload_store,
     )
 
 
@@ -179,6 +361,11 @@ def get_investment_manager_agent_service(
     agent_reminder_service: AgentReminderService = Depends(get_agent_reminder_service),
     agent_workflow_service: AgentWorkflowService = Depends(get_agent_workflow_service),
     workflow_result_service: WorkflowResultService = Depends(get_workflow_result_service),
+    market_data_service: MarketDataService = Depends(get_market_data_service),
+    screener_service: ScreenerService = Depends(get_screener_service),
+    research_sub_agent: ResearchSubAgent = Depends(get_research_sub_agent),
+    memory_search_service: MemorySearchService = Depends(get_memory_search_service),
+    tool_payload_store: ToolPayloadStore = Depends(get_tool_payload_store),
 ) -> InvestmentManagerAgentService:
     return InvestmentManagerAgentService(
         investment_manager_agent=investment_manager_agent,
@@ -187,6 +374,11 @@ def get_investment_manager_agent_service(
         agent_reminder_service=agent_reminder_service,
         agent_workflow_service=agent_workflow_service,
         workflow_result_service=workflow_result_service,
+        market_data_service=market_data_service,
+        screener_service=screener_service,
+        research_sub_agent=research_sub_agent,
+        memory_search_service=memory_search_service,
+        tool_payload_store=tool_payload_store,
     )
 
 
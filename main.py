@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
@@ -15,8 +16,30 @@ from apps.rest_api import (
     chat,
     agent_reminders,
     agent_workflows,
+    metrics,
+    screener,
+)
+from config import (
+    settings,
+    StoreBackend,
+)
+from services.agents.scheduler import LLMAdmissionScheduler
+from services.agents.tool_cache import (
+    InMemoryToolResultCache,
+    MongoDBToolResultCache,
+)
+from services.agents.compaction import (
+    InMemoryToolPayloadStore,
+    MongoDBToolPayloadStore,
+)
+from services.series_store import ColumnarSeriesStore
+from services.screener import ScreenerSnapshotStore
+from services.memory_search import MemoryIndexCache
+from services.rate_limiter import (
+    TokenBucketRateLimiter,
+    InMemoryTokenBucketStore,
+    MongoDBTokenBucketStore,
 )
-from config import settings
 
 
 # Configure logging
@@ -31,6 +54,25 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     # Startup
     app.state.mongodb_client = AsyncMongoClient(settings.MONGO_URI)
+    if settings.RATE_LIMIT_BACKEND == StoreBackend.MONGODB:
+        rate_limit_store = MongoDBTokenBucketStore(mongo_client=app.state.mongodb_client)
+    else:
+        rate_limit_store = InMemoryTokenBucketStore()
+    app.state.rate_limiter = TokenBucketRateLimiter(store=rate_limit_store)
+    app.state.llm_admission_scheduler = LLMAdmissionScheduler(rate_limiter=app.state.rate_limiter)
+    if settings.TOOL_RESULT_CACHE_BACKEND == StoreBackend.MONGODB:
+        app.state.tool_result_cache = MongoDBToolResultCache(mongo_client=app.state.mongodb_client)
+    else:
+        app.state.tool_result_cache = InMemoryToolResultCache()
+    if settings.TOOL_PAYLOAD_STORE_BACKEND == StoreBackend.MONGODB:
+        app.state.tool_payload_store = MongoDBToolPayloadStore(mongo_client=app.state.mongodb_client)
+    else:
+        app.state.tool_payload_store = InMemoryToolPayloadStore()
+    app.state.series_store = ColumnarSeriesStore() if settings.SERIES_STORE_ENABLED else None
+    if app.state.series_store:
+        await asyncio.to_thread(app.state.series_store.evict)
+    app.state.screener_snapshot_store = ScreenerSnapshotStore()
+    app.state.memory_index_cache = MemoryIndexCache()
     yield
     # Shutdown
     await app.state.mongodb_client.close()
@@ -74,3 +116,5 @@ app.include_router(user_context.router)
 app.include_router(chat.router)
 app.include_router(agent_reminders.router)
 app.include_router(agent_workflows.router)
+app.include_router(metrics.router)
+app.include_router(screener.router)
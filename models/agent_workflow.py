@@ -8,6 +8,11 @@ class WorkflowStatus(str, Enum):
     RUNNING = "running"
 
 
+class WorkflowExecutionMode(str, Enum):
+    REACT = "react"                 # The agent decides its next tool call after every result
+    PLAN_EXECUTE = "plan_execute"   # The agent plans all its tool calls up front, they run concurrently
+
+
 class AgentWorkflow(BaseModel):
     workflow_id: str = Field(description="Unique id of the workflow")
     user_id: str = Field(description="The user this workflow belongs to")
@@ -15,11 +20,18 @@ class AgentWorkflow(BaseModel):
     description: str = Field(description="The instructions the agent will execute on each run")
     schedule: str = Field(description="Cron expression, e.g. '0 0 1 * *' for monthly")
     status: WorkflowStatus = Field(description="Workflow status")
+    execution_mode: WorkflowExecutionMode = Field(default=WorkflowExecutionMode.REACT, description="How the agent executes the workflow")
     created_at: str = Field(description="ISO 8601 creation timestamp")
     last_run_at: str | None = Field(default=None, description="ISO 8601 timestamp of last run")
     next_run_at: str | None = Field(default=None, description="ISO 8601 timestamp of next scheduled run")
 
 
+class WorkflowResultHighlights(BaseModel):
+    tickers: list[str] = Field(default=[], description="Tickers the report is about")
+    signals: list[str] = Field(default=[], description="Notable findings, e.g. 'AAPL: earnings beat, guidance raised'")
+    actions: list[str] = Field(default=[], description="Actions taken or recommended, e.g. 'Bought 10 MSFT'")
+
+
 class WorkflowResult(BaseModel):
     result_id: str = Field(description="Unique id of this result")
     workflow_id: str = Field(description="The workflow that produced this result")
@@ -27,3 +39,14 @@ class WorkflowResult(BaseModel):
     workflow_name: str = Field(description="Name of the workflow at time of execution")
     output: str = Field(description="The agent's report for this run")
     ran_at: str = Field(description="ISO 8601 timestamp of when the workflow ran")
+    summary: str | None = Field(default=None, description="Short summary of the report, generated after the run")
+    highlights: WorkflowResultHighlights | None = Field(default=None, description="Structured highlights of the report, generated after the run")
+
+
+class WorkflowResultSummary(BaseModel):
+    result_id: str = Field(description="Unique id of the result, to get the full report")
+    workflow_id: str = Field(description="The workflow that produced the result")
+    workflow_name: str = Field(description="Name of the workflow at time of execution")
+    ran_at: str = Field(description="ISO 8601 timestamp of when the workflow ran")
+    summary: str = Field(description="Short summary of the report, or its beginning while the summary isn't generated yet")
+    highlights: WorkflowResultHighlights | None = Field(default=None, description="Structured highlights of the report")
@@ -0,0 +1,19 @@
+from enum import Enum
+from pydantic import BaseModel, Field
+
+
+class MemorySource(str, Enum):
+    CONVERSATION_NOTES = "conversation_notes"
+    WORKFLOW_RESULTS = "workflow_results"
+
+
+class MemorySnippet(BaseModel):
+    source: MemorySource = Field(description="Where the snippet comes from")
+    source_id: str = Field(description="The date (or digest period) of the conversation notes, or the result_id of the workflow result")
+    date: str = Field(
+        description="The date of the conversation notes, the week (e.g. 2026-W19) or month (e.g. 2026-05) of a digest "
+        "of older notes, or the ISO 8601 timestamp of the workflow run",
+    )
+    workflow_name: str | None = Field(default=None, description="Name of the workflow, for workflow results")
+    text: str = Field(description="The matching note, or the matching passage of the workflow report")
+    score: float = Field(description="Relevance score of the snippet for the query")
@@ -1,4 +1,5 @@
 from enum import Enum
+from typing import Any
 
 from pydantic import BaseModel
 
@@ -13,9 +14,19 @@ class Message(BaseModel):
     created_at: str | None = None
 
 
+class ToolMemoEntry(BaseModel):
+    key: str
+    tool_name: str
+    args: dict[str, Any]
+    content: str | list
+    is_digest: bool = False     # True when only the beginning of a large result was kept
+    recorded_at: str
+
+
 class Session(BaseModel):
     session_id: str
     user_id: str
     messages: list[Message]
     name: str
     created_at: str
+    tool_memo: list[ToolMemoEntry] = []
@@ -10,5 +10,9 @@ class UserContext(BaseModel):
 
 class UserConversationNotes(BaseModel):
     user_id: str = Field(description="The unique identifier for the user")
-    date: str = Field(description="The date in YYYY-MM-DD format")
-    notes: dict = Field(description="A key-value store containing short, concise notes about the conversation on this date")
\ No newline at end of file
+    date: str = Field(description="The date in YYYY-MM-DD format, the first day of the period for a digest")
+    notes: dict = Field(description="A key-value store containing short, concise notes about the conversation on this date")
+    period: str | None = Field(
+        default=None,
+        description="For a digest of older notes, the week (e.g. 2026-W19) or month (e.g. 2026-05) it covers",
+    )
\ No newline at end of file
@@ -1,4 +1,5 @@
 import asyncio
+import datetime as dt
 import logging
 from abc import (
     ABC,
@@ -6,6 +7,7 @@ from abc import (
 )
 
 from models.session import Message
+from models.user_context import UserContext
 from services.user_context import (
     UserContextService,
     UserContextNotFoundError,
@@ -13,6 +15,15 @@ from services.user_context import (
 from services.agent_reminder import AgentReminderService
 from services.agent_workflows.workflow import AgentWorkflowService
 from services.agent_workflows.results import WorkflowResultService
+from services.agents.tool_memo import SessionToolMemo
+from services.agents.compaction import ToolPayloadStore
+from services.market_data import MarketDataService
+from services.screener import ScreenerService
+from services.memory_search import MemorySearchService
+from services.agents.scheduler import RequestPriority
+from services.agents.research import ResearchCoordinator
+from services.agents.session_context import render_session_context
+from config import settings
 from services.agents.agent import (
     InvestmentManagerAgent,
     InvestmentManagerPromptVars,
@@ -21,6 +32,8 @@ from services.agents.agent import (
     UserContextMemoryManagerPromptVars,
     InvestmentManagerRuntimeContext,
     UserContextManagerRuntimeContext,
+    ResearchSubAgent,
+    ResearchSubAgentRuntimeContext,
 )
 
 logger = logging.getLogger(__name__)
@@ -32,6 +45,7 @@ class TextAgentService(ABC):
         self,
         user_id: str, 
         conversation: list[Message],
+        session_tool_memo: SessionToolMemo | None = None,
     ) -> str:
         pass
 
@@ -41,7 +55,8 @@ class InvestmentManagerAgentService(TextAgentService):
     Service that orchestrates the investment management interaction by coordinating multiple agents.
 
     This service is responsible for:
-    1. Fetching the user's current context (profile).
+    1. Prefetching the user's current context (profile), recent notes, reminders, workflows
+       and workflow results concurrently, and inlining them into the agent's prompt.
     2. Invoking the InvestmentManagerAgent to generate a personalized response based on the 
        conversation history and the user's profile.
     3. Invoking the UserContextMemoryManagerAgent in parallel to update and persist any new 
@@ -60,6 +75,11 @@ class InvestmentManagerAgentService(TextAgentService):
         agent_reminder_service: AgentReminderService,
         agent_workflow_service: AgentWorkflowService,
         workflow_result_service: WorkflowResultService,
+        market_data_service: MarketDataService,
+        screener_service: ScreenerService,
+        research_sub_agent: ResearchSubAgent,
+        memory_search_service: MemorySearchService,
+        tool_payload_store: ToolPayloadStore,
     ):
         """
         Initializes the InvestmentManagerAgentService.
@@ -69,6 +89,11 @@ class InvestmentManagerAgentService(TextAgentService):
             user_context_memory_manager_agent: The agent responsible for updating user context.
             user_context_service: Service to retrieve and store user context.
             agent_reminder_service: Service to manage agent reminders.
+            market_data_service: Service the analytics tools fetch market data through.
+            screener_service: Service screening stocks on the fundamentals snapshot.
+            research_sub_agent: The agent research tasks delegated by the investment manager are run with.
+            memory_search_service: Service searching the user's conversation notes and workflow results.
+            tool_payload_store: Store of the full payloads of compacted tool outputs.
         """
         self._investment_manager_agent = investment_manager_agent
         self._user_context_memory_manager_agent = user_context_memory_manager_agent
@@ -76,11 +101,17 @@ class InvestmentManagerAgentService(TextAgentService):
         self._agent_reminder_service = agent_reminder_service
         self._agent_workflow_service = agent_workflow_service
         self._workflow_result_service = workflow_result_service
+        self._market_data_service = market_data_service
+        self._screener_service = screener_service
+        self._research_sub_agent = research_sub_agent
+        self._memory_search_service = memory_search_service
+        self._tool_payload_store = tool_payload_store
     
     async def generate_agent_text_response(
         self,
         user_id: str, 
         conversation: list[Message],
+        session_tool_memo: SessionToolMemo | None = None,
     ) -> str:
         """
         Generates a response from the investment manager agent and updates user context.
@@ -88,6 +119,8 @@ class InvestmentManagerAgentService(TextAgentService):
         Args:
             user_id: The unique identifier of the user.
             conversation: The list of messages in the current conversation.
+            session_tool_memo: Tool calls recorded earlier in the session. New calls made
+                during this turn are recorded into it.
 
         Returns:
             InvestmentManagerAgentResponse: The response generated by the investment manager.
@@ -95,9 +128,7 @@ class InvestmentManagerAgentService(TextAgentService):
         Raises:
             UserContextNotFoundError: If the user context cannot be found.
         """
-        user_context = await self._user_context_service.get_user_context(user_id)
-        if not user_context:
-            raise UserContextNotFoundError()
+        user_context, session_context = await self._prefetch_context(user_id)
         
         # Generate the response from the investment manager agent
         agent_response = await self._investment_manager_agent.generate_response(
@@ -107,10 +138,26 @@ class InvestmentManagerAgentService(TextAgentService):
                 agent_reminder_service=self._agent_reminder_service,
                 agent_workflow_service=self._agent_workflow_service,
                 workflow_result_service=self._workflow_result_service,
+                market_data_service=self._market_data_service,
+                screener_service=self._screener_service,
+                memory_search_service=self._memory_search_service,
+                tool_payload_store=self._tool_payload_store,
+                research_coordinator=ResearchCoordinator(
+                    sub_agent=self._research_sub_agent,
+                    runtime_context=ResearchSubAgentRuntimeContext(
+                        market_data_service=self._market_data_service,
+                        tool_payload_store=self._tool_payload_store,
+                    ),
+                    priority=RequestPriority.INTERACTIVE,
+                    user_id=user_id,
+                ),
+                session_tool_memo=session_tool_memo,
             ),
             system_prompt_placeholder_values=InvestmentManagerPromptVars(
                 client_profile=user_context.model_dump(),
-            )
+                session_context=session_context,
+            ),
+            user_id=user_id,
         )
 
         # Update the user context memory in the background safely
@@ -123,6 +170,45 @@ class InvestmentManagerAgentService(TextAgentService):
 
         return agent_response.response
 
+    async def _prefetch_context(self, user_id: str) -> tuple[UserContext, str]:
+        """
+        Fetches everything the agent would otherwise look up with its own tool calls at
+        the start of a turn, concurrently.
+
+        Returns:
+            The user context, and the rendered session context (see render_session_context).
+            Only the user context is required: the other sections are marked as unavailable
+            when their fetch fails.
+
+        Raises:
+            UserContextNotFoundError: If the user context cannot be found.
+        """
+        user_context, notes, reminders, workflows, workflow_results = await asyncio.gather(
+            self._user_context_service.get_user_context(user_id),
+            self._user_context_service.get_user_conversation_notes(user_id, limit=settings.PREFETCH_NOTES_LIMIT),
+            self._agent_reminder_service.get_agent_reminders(user_id),
+            self._agent_workflow_service.get_workflows(user_id),
+            self._workflow_result_service.get_result_summaries(user_id, limit=settings.PREFETCH_WORKFLOW_RESULTS_LIMIT),
+            return_exceptions=True,
+        )
+        if isinstance(user_context, BaseException):
+            raise user_context
+        if not user_context:
+            raise UserContextNotFoundError()
+
+        for name, value in (("notes", notes), ("reminders", reminders), ("workflows", workflows), ("workflow results", workflow_results)):
+            if isinstance(value, BaseException):
+                logger.warning("Failed to prefetch the %s of user %s: %s", name, user_id, str(value))
+
+        session_context = render_session_context(
+            now=dt.datetime.now(),
+            notes=notes,
+            reminders=reminders,
+            workflows=workflows,
+            workflow_results=workflow_results,
+        )
+        return user_context, session_context
+
     async def _update_context_memory_safely(
         self,
         user_id: str,
@@ -142,6 +228,7 @@ class InvestmentManagerAgentService(TextAgentService):
                 runtime_context=UserContextManagerRuntimeContext(
                     user_context_service=self._user_context_service,
                 ),
+                user_id=user_id,
             )
         except Exception as e:
             logger.error(f"Failed to update user context memory in background: {e}", exc_info=True)
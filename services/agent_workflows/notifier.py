@@ -6,7 +6,8 @@ from services.agent_workflows.results import WorkflowResultService
 
 class WorkflowNotifier(ABC):
     @abstractmethod
-    async def notify(self, result: WorkflowResult) -> None:
+    async def notify(self, result: WorkflowResult) -> WorkflowResult:
+        """Delivers the result of a run and returns it as saved, with its result_id."""
         pass
 
 
@@ -16,8 +17,8 @@ class MongoDBWorkflowNotifier(WorkflowNotifier):
     def __init__(self, workflow_result_service: WorkflowResultService):
         self._workflow_result_service = workflow_result_service
 
-    async def notify(self, result: WorkflowResult) -> None:
-        await self._workflow_result_service.save_result(
+    async def notify(self, result: WorkflowResult) -> WorkflowResult:
+        return await self._workflow_result_service.save_result(
             workflow_id=result.workflow_id,
             user_id=result.user_id,
             workflow_name=result.workflow_name,
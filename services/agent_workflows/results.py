@@ -1,4 +1,5 @@
 import datetime as dt
+import logging
 import uuid
 from abc import ABC, abstractmethod
 
@@ -6,7 +7,14 @@ from pydantic import BaseModel
 from pymongo import AsyncMongoClient
 
 from config import settings
-from models.agent_workflow import WorkflowResult
+from models.agent_workflow import (
+    WorkflowResult,
+    WorkflowResultHighlights,
+    WorkflowResultSummary,
+)
+from services.memory_search import MemorySearchService
+
+logger = logging.getLogger(__name__)
 
 
 class WorkflowResultService(ABC):
@@ -24,6 +32,18 @@ class WorkflowResultService(ABC):
     async def get_results(self, user_id: str, limit: int | None = 10) -> list[WorkflowResult]:
         pass
 
+    @abstractmethod
+    async def get_result(self, user_id: str, result_id: str) -> WorkflowResult | None:
+        pass
+
+    @abstractmethod
+    async def get_result_summaries(self, user_id: str, limit: int | None = 10) -> list[WorkflowResultSummary]:
+        pass
+
+    @abstractmethod
+    async def save_summary(self, result_id: str, summary: str, highlights: WorkflowResultHighlights) -> None:
+        pass
+
 
 class WorkflowResultMongoDoc(BaseModel):
     result_id: str
@@ -32,11 +52,14 @@ class WorkflowResultMongoDoc(BaseModel):
     workflow_name: str
     output: str
     ran_at: str
+    summary: str | None = None
+    highlights: WorkflowResultHighlights | None = None
 
 
 class MongoDBWorkflowResultService(WorkflowResultService):
-    def __init__(self, mongo_client: AsyncMongoClient):
+    def __init__(self, mongo_client: AsyncMongoClient, memory_search_service: MemorySearchService | None = None):
         self.db = mongo_client[settings.MONGO_DB_NAME]
+        self._memory_search_service = memory_search_service
 
     def _doc_to_model(self, doc: dict) -> WorkflowResult:
         return WorkflowResult(
@@ -46,6 +69,8 @@ class MongoDBWorkflowResultService(WorkflowResultService):
             workflow_name=doc["workflow_name"],
             output=doc["output"],
             ran_at=doc["ran_at"],
+            summary=doc.get("summary"),
+            highlights=doc.get("highlights"),
         )
 
     async def save_result(
@@ -67,10 +92,63 @@ class MongoDBWorkflowResultService(WorkflowResultService):
         )
         collection = self.db[settings.WORKFLOW_RESULTS_COLLECTION_NAME]
         await collection.insert_one(doc.model_dump())
-        return self._doc_to_model(doc.model_dump())
+        result = self._doc_to_model(doc.model_dump())
+
+        if self._memory_search_service:
+            # The result is saved either way, it is only missing from the search results
+            try:
+                await self._memory_search_service.index_workflow_result(result)
+            except Exception as e:
+                logger.warning("Failed to index workflow result %s: %s", result_id, str(e))
+        return result
 
     async def get_results(self, user_id: str, limit: int | None = 10) -> list[WorkflowResult]:
         collection = self.db[settings.WORKFLOW_RESULTS_COLLECTION_NAME]
         cursor = collection.find({"user_id": user_id}).sort("ran_at", -1)
         docs = await cursor.to_list(length=limit)
         return [self._doc_to_model(doc) for doc in docs]
+
+    async def get_result(self, user_id: str, result_id: str) -> WorkflowResult | None:
+        collection = self.db[settings.WORKFLOW_RESULTS_COLLECTION_NAME]
+        doc = await collection.find_one({"user_id": user_id, "result_id": result_id})
+        return self._doc_to_model(doc) if doc else None
+
+    async def get_result_summaries(self, user_id: str, limit: int | None = 10) -> list[WorkflowResultSummary]:
+        """
+        Lists the results without their full report. A result whose summary isn't
+        generated yet (or failed to be) is listed with the beginning of its report.
+        """
+        collection = self.db[settings.WORKFLOW_RESULTS_COLLECTION_NAME]
+        cursor = collection.find(
+            {"user_id": user_id},
+            {
+                "_id": 0,
+                "result_id": 1,
+                "workflow_id": 1,
+                "workflow_name": 1,
+                "ran_at": 1,
+                "summary": 1,
+                "highlights": 1,
+                # Only needed when there is no summary, but the projection can't depend on it
+                "output": {"$substrCP": ["$output", 0, settings.WORKFLOW_RESULT_SUMMARY_FALLBACK_CHARS]},
+            },
+        ).sort("ran_at", -1)
+        docs = await cursor.to_list(length=limit)
+        return [
+            WorkflowResultSummary(
+                result_id=doc["result_id"],
+                workflow_id=doc["workflow_id"],
+                workflow_name=doc["workflow_name"],
+                ran_at=doc["ran_at"],
+                summary=doc.get("summary") or f"{doc['output'].rstrip()}... [no summary yet, see the full report]",
+                highlights=doc.get("highlights"),
+            )
+            for doc in docs
+        ]
+
+    async def save_summary(self, result_id: str, summary: str, highlights: WorkflowResultHighlights) -> None:
+        collection = self.db[settings.WORKFLOW_RESULTS_COLLECTION_NAME]
+        await collection.update_one(
+            {"result_id": result_id},
+            {"$set": {"summary": summary, "highlights": highlights.model_dump()}},
+        )
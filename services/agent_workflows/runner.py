@@ -1,8 +1,8 @@
+import asyncio
 import datetime as dt
 import logging
-import time
 
-from models.agent_workflow import WorkflowResult
+from models.agent_workflow import WorkflowExecutionMode, WorkflowResult
 from models.session import Message, MessageRole
 from services.agent_workflows.workflow import AgentWorkflowService
 from services.agent_workflows.notifier import WorkflowNotifier
@@ -11,9 +11,21 @@ from services.agents.agent import (
     WorkflowExecutionAgent,
     WorkflowExecutionPromptVars,
     WorkflowExecutionAgentRuntimeContext,
+    ResearchSubAgent,
+    ResearchSubAgentRuntimeContext,
+    WorkflowResultSummarizerAgent,
+    WorkflowResultSummarizerPromptVars,
 )
+from services.agents.research import ResearchCoordinator
+from services.agents.compaction import ToolPayloadStore
+from services.agents.scheduler import RequestPriority
 from services.agent_reminder import AgentReminderService
 from services.user_context import UserContextService, UserContextNotFoundError
+from services.rate_limiter import TokenBucketRateLimiter
+from services.market_data import MarketDataService
+from services.screener import ScreenerService
+from services.memory_search import MemorySearchService
+from config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +39,13 @@ class WorkflowRunner:
         user_context_service: UserContextService,
         agent_reminder_service: AgentReminderService,
         notifier: WorkflowNotifier,
+        rate_limiter: TokenBucketRateLimiter,
+        market_data_service: MarketDataService,
+        screener_service: ScreenerService,
+        research_sub_agent: ResearchSubAgent,
+        memory_search_service: MemorySearchService,
+        workflow_result_summarizer: WorkflowResultSummarizerAgent,
+        tool_payload_store: ToolPayloadStore,
     ):
         self._agent = workflow_execution_agent
         self._workflow_service = agent_workflow_service
@@ -34,6 +53,13 @@ class WorkflowRunner:
         self._user_context_service = user_context_service
         self._agent_reminder_service = agent_reminder_service
         self._notifier = notifier
+        self._rate_limiter = rate_limiter
+        self._market_data_service = market_data_service
+        self._screener_service = screener_service
+        self._research_sub_agent = research_sub_agent
+        self._memory_search_service = memory_search_service
+        self._workflow_result_summarizer = workflow_result_summarizer
+        self._tool_payload_store = tool_payload_store
 
     async def run_due_workflows(self) -> None:
         failed_workflows = []
@@ -42,8 +68,14 @@ class WorkflowRunner:
             if not workflow:
                 break
             try:
+                # Space workflow runs out across all scheduler nodes to stay within provider limits
+                await self._rate_limiter.acquire(
+                    key="workflow_runs",
+                    tokens=1,
+                    capacity=1,
+                    refill_rate=1 / settings.WORKFLOW_RUN_INTERVAL_SECONDS,
+                )
                 await self._run_workflow(workflow)
-                time.sleep(90)
             except Exception as e:
                 logger.exception(
                     "Failed to run workflow %s for user %s: %s",
@@ -65,6 +97,19 @@ class WorkflowRunner:
         runtime_context = WorkflowExecutionAgentRuntimeContext(
             workflow_result_service=self._workflow_result_service,
             user_context_service=self._user_context_service,
+            market_data_service=self._market_data_service,
+            screener_service=self._screener_service,
+            memory_search_service=self._memory_search_service,
+            tool_payload_store=self._tool_payload_store,
+            research_coordinator=ResearchCoordinator(
+                sub_agent=self._research_sub_agent,
+                runtime_context=ResearchSubAgentRuntimeContext(
+                    market_data_service=self._market_data_service,
+                    tool_payload_store=self._tool_payload_store,
+                ),
+                priority=RequestPriority.WORKFLOW,
+                user_id=workflow.user_id,
+            ),
         )
 
         agent_response = await self._agent.generate_response(
@@ -73,6 +118,8 @@ class WorkflowRunner:
             system_prompt_placeholder_values=WorkflowExecutionPromptVars(
                 client_profile=user_context.model_dump(),
             ),
+            user_id=workflow.user_id,
+            plan_first=workflow.execution_mode == WorkflowExecutionMode.PLAN_EXECUTE,
         )
 
         ran_at = dt.datetime.now(dt.timezone.utc).isoformat()
@@ -85,5 +132,29 @@ class WorkflowRunner:
             output=agent_response.response,
             ran_at=ran_at,
         )
-        await self._notifier.notify(result)
+        saved_result = await self._notifier.notify(result)
         await self._workflow_service.mark_workflow_ran(workflow.workflow_id, ran_at)
+
+        # Summarize the report in the background, the run is done
+        asyncio.create_task(self._summarize_result_safely(saved_result))
+
+    async def _summarize_result_safely(self, result: WorkflowResult) -> None:
+        """
+        Generates and stores the summary and highlights of a saved result. Until they are
+        stored, or if this fails, the result is listed with the beginning of its report.
+        """
+        try:
+            summarizer_response = await self._workflow_result_summarizer.generate_response(
+                conversation=[Message(role=MessageRole.USER, content=result.output)],
+                system_prompt_placeholder_values=WorkflowResultSummarizerPromptVars(
+                    workflow_name=result.workflow_name,
+                ),
+                user_id=result.user_id,
+            )
+            await self._workflow_result_service.save_summary(
+                result_id=result.result_id,
+                summary=summarizer_response.summary,
+                highlights=summarizer_response.highlights,
+            )
+        except Exception as e:
+            logger.error(f"Failed to summarize workflow result {result.result_id} in background: {e}", exc_info=True)
@@ -7,7 +7,7 @@ from pydantic import BaseModel
 from pymongo import AsyncMongoClient, ReturnDocument
 
 from config import settings
-from models.agent_workflow import AgentWorkflow, WorkflowStatus
+from models.agent_workflow import AgentWorkflow, WorkflowExecutionMode, WorkflowStatus
 from services.user_context import UserContextNotFoundError
 
 
@@ -23,6 +23,7 @@ class AgentWorkflowService(ABC):
         name: str,
         description: str,
         schedule: str,
+        execution_mode: WorkflowExecutionMode = WorkflowExecutionMode.PLAN_EXECUTE,
     ) -> AgentWorkflow:
         pass
 
@@ -49,6 +50,7 @@ class AgentWorkflowService(ABC):
         description: str | None = None,
         schedule: str | None = None,
         status: str | None = None,
+        execution_mode: WorkflowExecutionMode | None = None,
     ) -> AgentWorkflow:
         pass
 
@@ -69,6 +71,7 @@ class AgentWorkflowMongoDoc(BaseModel):
     description: str
     schedule: str
     status: WorkflowStatus
+    execution_mode: WorkflowExecutionMode = WorkflowExecutionMode.REACT
     created_at: str
     last_run_at: str | None = None
     next_run_at: str | None = None
@@ -90,6 +93,9 @@ class MongoDBAgentWorkflowService(AgentWorkflowService):
             description=doc["description"],
             schedule=doc["schedule"],
             status=doc["status"],
+            # Workflows created before execution modes existed keep running in ReAct mode,
+            # they may hold conditional steps (e.g. an order placed if a price drops)
+            execution_mode=doc.get("execution_mode", WorkflowExecutionMode.REACT),
             created_at=doc["created_at"],
             last_run_at=doc.get("last_run_at"),
             next_run_at=doc.get("next_run_at"),
@@ -101,6 +107,7 @@ class MongoDBAgentWorkflowService(AgentWorkflowService):
         name: str,
         description: str,
         schedule: str,
+        execution_mode: WorkflowExecutionMode = WorkflowExecutionMode.PLAN_EXECUTE,
     ) -> AgentWorkflow:
         user_context_collection = self.db[settings.USER_CONTEXT_COLLECTION_NAME]
         if not await user_context_collection.find_one({"user_id": user_id}):
@@ -117,6 +124,7 @@ class MongoDBAgentWorkflowService(AgentWorkflowService):
             description=description,
             schedule=schedule,
             status=WorkflowStatus.ACTIVE,
+            execution_mode=execution_mode,
             created_at=now.isoformat(),
             next_run_at=next_run_at,
         )
@@ -162,6 +170,7 @@ class MongoDBAgentWorkflowService(AgentWorkflowService):
         description: str | None = None,
         schedule: str | None = None,
         status: str | None = None,
+        execution_mode: WorkflowExecutionMode | None = None,
     ) -> AgentWorkflow:
         collection = self.db[settings.AGENT_WORKFLOWS_COLLECTION_NAME]
         update_data: dict = {}
@@ -171,6 +180,8 @@ class MongoDBAgentWorkflowService(AgentWorkflowService):
             update_data["description"] = description
         if status is not None:
             update_data["status"] = status
+        if execution_mode is not None:
+            update_data["execution_mode"] = execution_mode
         if schedule is not None:
             update_data["schedule"] = schedule
             now = dt.datetime.now(dt.timezone.utc)
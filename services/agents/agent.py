@@ -20,6 +20,7 @@ from models.session import (
     MessageRole,
     Message,
 )
+from models.agent_workflow import WorkflowResultHighlights
 from config import (
     settings,
     LLMProvider,
@@ -27,42 +28,74 @@ from config import (
 from services.agents.prompts import (
     INVESTMENT_MANAGER_AGENT_PROMPT,
     USER_CONTEXT_MEMORY_MANAGER_PROMPT,
+    RESEARCH_SUB_AGENT_PROMPT,
 )
 from services.agents.tools import (
     UserContextToolsRuntimeContext,
     AgentWorkflowToolsRuntimeContext,
     AgentReminderToolsRuntimeContext,
     WorkflowResultsToolRuntimeContext,
+    MarketDataToolsRuntimeContext,
+    ScreenerToolsRuntimeContext,
+    ResearchToolsRuntimeContext,
+    MemorySearchToolsRuntimeContext,
+    ToolPayloadToolsRuntimeContext,
     update_user_context,
     get_user_context,
     get_current_datetime,
     get_user_conversation_notes,
     update_user_conversation_notes,
+    search_user_memory,
     create_agent_reminder,
     get_agent_reminders,
     update_agent_reminder,
     update_agent_reminder,
     delete_agent_reminder,
     get_skill_names,
+    get_skill_table_of_contents,
     get_skill,
-    add,
-    subtract,
-    multiply,
-    divide,
+    get_full_tool_result,
+    calculate,
+    calculate_dcf_valuation,
+    analyze_portfolio_risk,
+    compare_peers,
+    get_financial_ratios,
+    compute_technical_indicators,
+    screen_stocks,
+    delegate_research,
     create_agent_workflow,
     get_agent_workflows,
     update_agent_workflow,
     delete_agent_workflow,
     get_workflow_results,
+    get_workflow_result,
+    search_workflow_results,
 )
 from services.agent_workflows.workflow import AgentWorkflowService
 from services.agent_workflows.results import WorkflowResultService
-from services.agents.prompts import WORKFLOW_EXECUTION_AGENT_PROMPT
+from services.agents.prompts import (
+    WORKFLOW_EXECUTION_AGENT_PROMPT,
+    WORKFLOW_RESULT_SUMMARIZER_PROMPT,
+)
+from services.agents.middleware import LLMAdmissionMiddleware
+from services.agents.model_router import ModelRoutingMiddleware
+from services.agents.resilience import ResilientModelMiddleware
+from services.agents.planning import PlanExecuteMiddleware
+from services.agents.tool_memo import SessionToolMemoRuntimeContext
+from services.agents.tool_schema import tool_schema_minifier
+from services.agents.research import ResearchSubAgentResponse
+from services.agents.scheduler import (
+    LLMAdmissionScheduler,
+    RequestPriority,
+)
 
 # TODO: Create Agent ABC clas 
 
 
 class Agent:
+    # Key of the agent's settings in LLM_FALLBACKS
+    agent_type: str | None = None
+
     def __init__(
         self,
         tools: list[BaseTool],
@@ -73,7 +106,15 @@ class Agent:
         provider: LLMProvider = LLMProvider.ANTHROPIC,
         model_name: str = settings.LLM_MODEL,
         temperature: float = settings.TEMPERATURE,
+        priority: RequestPriority = RequestPriority.INTERACTIVE,
+        admission_scheduler: LLMAdmissionScheduler | None = None,
+        fast_tier: tuple[LLMProvider, str] | None = None,
     ):
+        """
+        Args:
+            fast_tier: Provider and name of a fast model the agent's simple turns are
+                routed to (see ModelRoutingMiddleware). None to run every turn on model_name.
+        """
         self.tools = tools
         self.response_format = response_format
         self.system_prompt = system_prompt
@@ -82,14 +123,29 @@ class Agent:
         self.provider = provider
         self.model_name = model_name
         self.temperature = temperature
+        self.priority = priority
+        self.admission_scheduler = admission_scheduler
+        self.fast_tier = fast_tier
 
     async def generate_response(
         self,
         conversation: list[Message],
         runtime_context: Any | None = None,
         system_prompt_placeholder_values: Mapping[str, Any] | None = None,
+        user_id: str | None = None,
+        priority: RequestPriority | None = None,
+        plan_first: bool = False,
     ) -> BaseModel:
-        agent = self._setup_agent(system_prompt_placeholder_values)
+        """
+        Runs the agent on the conversation and returns its structured response.
+
+        Args:
+            priority: Overrides the agent's LLM admission priority for this run.
+            plan_first: Run in plan-then-execute mode (see PlanExecuteMiddleware) instead
+                of the ReAct loop: the model plans all its tool calls at once, independent
+                calls run concurrently and the model answers once at the end.
+        """
+        agent = self._setup_agent(system_prompt_placeholder_values, user_id, priority, plan_first)
         messages = []
         # Keep the last settings.CONVERSATION_MESSAGES_LIMIT messages
         if len(conversation) > settings.CONVERSATION_MESSAGES_LIMIT:
@@ -108,19 +164,79 @@ class Agent:
 
         return response["structured_response"]
 
-    def _setup_agent(self, system_prompt_placeholder_values: Mapping[str, Any] | None = None):
+    def _setup_agent(
+        self,
+        system_prompt_placeholder_values: Mapping[str, Any] | None = None,
+        user_id: str | None = None,
+        priority: RequestPriority | None = None,
+        plan_first: bool = False,
+    ):
         model = self._setup_llm_model(self.provider, self.model_name, self.temperature)
 
         system_prompt = self.system_prompt
         if system_prompt_placeholder_values:
             system_prompt = system_prompt.format(**system_prompt_placeholder_values)
 
+        middleware = list(self.middleware)
+        model_pools = {}
+        if self.fast_tier:
+            fast_provider, fast_model_name = self.fast_tier
+            fast_model = self._setup_llm_model(fast_provider, fast_model_name, self.temperature)
+            model_pools[id(fast_model)] = (fast_provider, fast_model_name)
+            # Outside the admission middleware, so that every call is admitted in the pool of the model it goes to
+            middleware.append(
+                ModelRoutingMiddleware(
+                    fast_model=fast_model,
+                    fast_provider=fast_provider,
+                    fast_model_name=fast_model_name,
+                    heavy_provider=self.provider,
+                    heavy_model_name=self.model_name,
+                    admission_scheduler=self.admission_scheduler,
+                    priority=priority or self.priority,
+                    user_id=user_id,
+                )
+            )
+        fallback = settings.LLM_FALLBACKS.get(self.agent_type) if self.agent_type else None
+        if fallback:
+            secondary_model = self._setup_llm_model(fallback.provider, fallback.model, self.temperature)
+            model_pools[id(secondary_model)] = (fallback.provider, fallback.model)
+            # Inside the routing middleware, which calls the primary model for the heavy tier only,
+            # and outside the admission middleware, so that a hedged request is admitted in its own pool.
+            # It is thus outside PlanExecuteMiddleware too, whose plan waves it doesn't record (see is_planned_wave).
+            middleware.append(
+                ResilientModelMiddleware(
+                    agent_type=self.agent_type,
+                    fallback=fallback,
+                    primary_model=model,
+                    primary_pool_key=LLMAdmissionScheduler.pool_key(self.provider, self.model_name),
+                    secondary_model=secondary_model,
+                    secondary_pool_key=LLMAdmissionScheduler.pool_key(fallback.provider, fallback.model),
+                )
+            )
+        plan_execute = PlanExecuteMiddleware() if plan_first else None
+        if self.admission_scheduler:
+            middleware.append(
+                LLMAdmissionMiddleware(
+                    scheduler=self.admission_scheduler,
+                    provider=self.provider,
+                    model_name=self.model_name,
+                    priority=priority or self.priority,
+                    user_id=user_id,
+                    model_pools=model_pools,
+                    # The waves of a plan don't call the model, they take no slot
+                    answered_without_model=plan_execute.answers_next_call if plan_execute else None,
+                )
+            )
+        if plan_execute:
+            # Innermost, so that the planning and synthesis calls are admitted like any other model call
+            middleware.append(plan_execute)
+
         return create_agent(
             model=model,
             tools=self.tools,
             response_format=self.response_format,
             system_prompt=system_prompt,
-            middleware=self.middleware,
+            middleware=middleware,
             context_schema=self.runtime_context_schema,
         )
 
@@ -161,8 +277,10 @@ class InvestmentManagerPromptVars(TypedDict):
 
     Attributes:
         client_profile: A dictionary containing the user's investment profile and context.
+        session_context: The notes, reminders, workflows and workflow results prefetched for the turn.
     """
     client_profile: dict[str, Any]
+    session_context: str
 
 
 @dataclass
@@ -171,6 +289,12 @@ class InvestmentManagerRuntimeContext(
     AgentReminderToolsRuntimeContext,
     AgentWorkflowToolsRuntimeContext,
     WorkflowResultsToolRuntimeContext,
+    MarketDataToolsRuntimeContext,
+    ScreenerToolsRuntimeContext,
+    ResearchToolsRuntimeContext,
+    MemorySearchToolsRuntimeContext,
+    ToolPayloadToolsRuntimeContext,
+    SessionToolMemoRuntimeContext,
 ):
     pass
 
@@ -180,10 +304,13 @@ class InvestmentManagerAgent(Agent):
     Agent responsible for providing personalized investment management guidance.
     Note: Callers should use the create method to create an instance of this agent.
     """
+    agent_type = "investment_manager"
+
     def __init__(
         self,
         tools: list[BaseTool],
         middleware: list[AgentMiddleware],
+        admission_scheduler: LLMAdmissionScheduler | None = None,
     ):
         """
         Initializes the Investment Manager Agent with the configured LLM settings.
@@ -191,6 +318,7 @@ class InvestmentManagerAgent(Agent):
         Args:
             tools: List of tools available to the agent.
             middleware: List of middleware to process agent actions and responses.
+            admission_scheduler: Optional shared scheduler that admits the agent's LLM calls.
         """
         super().__init__(
             tools=tools,
@@ -201,6 +329,12 @@ class InvestmentManagerAgent(Agent):
             provider=settings.INVESTMENT_MANAGER_LLM_PROVIDER,
             model_name=settings.INVESTMENT_MANAGER_LLM_MODEL,
             temperature=settings.INVESTMENT_MANAGER_TEMPERATURE,
+            priority=RequestPriority.INTERACTIVE,
+            admission_scheduler=admission_scheduler,
+            fast_tier=(
+                (settings.MODEL_ROUTER_FAST_LLM_PROVIDER, settings.MODEL_ROUTER_FAST_LLM_MODEL)
+                if settings.MODEL_ROUTER_ENABLED else None
+            ),
         )
 
     async def generate_response(
@@ -208,6 +342,7 @@ class InvestmentManagerAgent(Agent):
         conversation: list[Message],
         runtime_context: InvestmentManagerRuntimeContext,
         system_prompt_placeholder_values: InvestmentManagerPromptVars | None = None,
+        user_id: str | None = None,
     ) -> InvestmentManagerAgentResponse:
         """
         Generates a response using the Investment Manager's specific prompt requirements.
@@ -216,6 +351,7 @@ class InvestmentManagerAgent(Agent):
             conversation=conversation,
             runtime_context=runtime_context,
             system_prompt_placeholder_values=system_prompt_placeholder_values,
+            user_id=user_id,
         )
 
     @classmethod
@@ -223,10 +359,12 @@ class InvestmentManagerAgent(Agent):
         cls,
         mcp_client: MultiServerMCPClient,
         middleware: list[AgentMiddleware],
+        admission_scheduler: LLMAdmissionScheduler | None = None,
     ):
         tools = [
             get_current_datetime,
             get_user_conversation_notes,
+            search_user_memory,
             create_agent_reminder,
             get_agent_reminders,
             update_agent_reminder,
@@ -236,26 +374,34 @@ class InvestmentManagerAgent(Agent):
             update_agent_workflow,
             delete_agent_workflow,
             get_workflow_results,
+            get_workflow_result,
+            search_workflow_results,
             get_skill_names,
+            get_skill_table_of_contents,
             get_skill,
-            add,
-            subtract,
-            multiply,
-            divide,
+            get_full_tool_result,
+            calculate,
+            calculate_dcf_valuation,
+            analyze_portfolio_risk,
+            compare_peers,
+            get_financial_ratios,
+            compute_technical_indicators,
+            screen_stocks,
+            delegate_research,
         ]
         if settings.MARKET_DATA_MCP_SERVER_URL:
             market_data_tools = await mcp_client.get_tools(server_name=settings.MARKET_DATA_MCP_SERVER_NAME)
-            tools.extend(market_data_tools)
+            tools.extend(tool_schema_minifier.minify_all(market_data_tools))
 
-        if settings.ALPACA_MCP_SERVER_URL:
+        if settings.ALPACA_MCP_SERVER_NAME in mcp_client.connections:
             alpaca_tools = await mcp_client.get_tools(server_name=settings.ALPACA_MCP_SERVER_NAME)
-            tools.extend(alpaca_tools)
+            tools.extend(tool_schema_minifier.minify_all(alpaca_tools))
         
-        if settings.COINBASE_MCP_SERVER_URL:
+        if settings.COINBASE_MCP_SERVER_NAME in mcp_client.connections:
             coinbase_tools = await mcp_client.get_tools(server_name=settings.COINBASE_MCP_SERVER_NAME)
-            tools.extend(coinbase_tools)
+            tools.extend(tool_schema_minifier.minify_all(coinbase_tools))
 
-        return cls(tools=tools, middleware=middleware)
+        return cls(tools=tools, middleware=middleware, admission_scheduler=admission_scheduler)
 
 
 class UserContextMemoryManagerAgentResponse(BaseModel):
@@ -284,9 +430,12 @@ class UserContextMemoryManagerAgent(Agent):
     """
     Agent responsible for managing the user context memory.
     """
+    agent_type = "user_context_memory_manager"
+
     def __init__(
         self,
         middleware: list[AgentMiddleware],
+        admission_scheduler: LLMAdmissionScheduler | None = None,
     ):
         tools = [
             update_user_context,
@@ -304,6 +453,8 @@ class UserContextMemoryManagerAgent(Agent):
             provider=settings.USER_CONTEXT_MEMORY_MANAGER_LLM_PROVIDER,
             model_name=settings.USER_CONTEXT_MEMORY_MANAGER_LLM_MODEL,
             temperature=settings.USER_CONTEXT_MEMORY_MANAGER_TEMPERATURE,
+            priority=RequestPriority.MEMORY,
+            admission_scheduler=admission_scheduler,
         )
 
     async def generate_response(
@@ -311,11 +462,13 @@ class UserContextMemoryManagerAgent(Agent):
         conversation: list[Message],
         runtime_context: UserContextManagerRuntimeContext,
         system_prompt_placeholder_values: UserContextMemoryManagerPromptVars | None = None,
+        user_id: str | None = None,
     ) -> UserContextMemoryManagerAgentResponse:
         return await super().generate_response(
             conversation=conversation,
             runtime_context=runtime_context,
             system_prompt_placeholder_values=system_prompt_placeholder_values,
+            user_id=user_id,
         )
 
 
@@ -331,6 +484,11 @@ class WorkflowExecutionPromptVars(TypedDict):
 class WorkflowExecutionAgentRuntimeContext(
     UserContextToolsRuntimeContext,
     WorkflowResultsToolRuntimeContext,
+    MarketDataToolsRuntimeContext,
+    ScreenerToolsRuntimeContext,
+    ResearchToolsRuntimeContext,
+    MemorySearchToolsRuntimeContext,
+    ToolPayloadToolsRuntimeContext,
 ):
     pass
 
@@ -340,11 +498,13 @@ class WorkflowExecutionAgent(Agent):
     Non-conversational agent that executes scheduled workflows autonomously.
     Note: Callers should use the create classmethod to instantiate.
     """
+    agent_type = "workflow_execution"
 
     def __init__(
         self,
         tools: list[BaseTool],
         middleware: list[AgentMiddleware],
+        admission_scheduler: LLMAdmissionScheduler | None = None,
     ):
         super().__init__(
             tools=tools,
@@ -355,6 +515,8 @@ class WorkflowExecutionAgent(Agent):
             provider=settings.WORKFLOW_EXECUTION_AGENT_LLM_PROVIDER,
             model_name=settings.WORKFLOW_EXECUTION_AGENT_LLM_MODEL,
             temperature=settings.WORKFLOW_EXECUTION_AGENT_TEMPERATURE,
+            priority=RequestPriority.WORKFLOW,
+            admission_scheduler=admission_scheduler,
         )
 
     async def generate_response(
@@ -362,11 +524,15 @@ class WorkflowExecutionAgent(Agent):
         conversation: list[Message],
         runtime_context: WorkflowExecutionAgentRuntimeContext,
         system_prompt_placeholder_values: WorkflowExecutionPromptVars | None = None,
+        user_id: str | None = None,
+        plan_first: bool = False,
     ) -> WorkflowExecutionAgentResponse:
         return await super().generate_response(
             conversation=conversation,
             runtime_context=runtime_context,
             system_prompt_placeholder_values=system_prompt_placeholder_values,
+            user_id=user_id,
+            plan_first=plan_first,
         )
 
     @classmethod
@@ -374,28 +540,165 @@ class WorkflowExecutionAgent(Agent):
         cls,
         mcp_client: MultiServerMCPClient,
         middleware: list[AgentMiddleware],
+        admission_scheduler: LLMAdmissionScheduler | None = None,
     ) -> "WorkflowExecutionAgent":
         tools = [
             get_current_datetime,
             get_user_conversation_notes,
+            search_user_memory,
             get_workflow_results,
+            get_workflow_result,
+            search_workflow_results,
             get_skill_names,
+            get_skill_table_of_contents,
             get_skill,
-            add,
-            subtract,
-            multiply,
-            divide,
+            get_full_tool_result,
+            calculate,
+            calculate_dcf_valuation,
+            analyze_portfolio_risk,
+            compare_peers,
+            get_financial_ratios,
+            compute_technical_indicators,
+            screen_stocks,
+            delegate_research,
         ]
         if settings.MARKET_DATA_MCP_SERVER_URL:
             market_data_tools = await mcp_client.get_tools(server_name=settings.MARKET_DATA_MCP_SERVER_NAME)
-            tools.extend(market_data_tools)
+            tools.extend(tool_schema_minifier.minify_all(market_data_tools))
 
-        if settings.ALPACA_MCP_SERVER_URL:
+        if settings.ALPACA_MCP_SERVER_NAME in mcp_client.connections:
             alpaca_tools = await mcp_client.get_tools(server_name=settings.ALPACA_MCP_SERVER_NAME)
-            tools.extend(alpaca_tools)
+            tools.extend(tool_schema_minifier.minify_all(alpaca_tools))
 
-        if settings.COINBASE_MCP_SERVER_URL:
+        if settings.COINBASE_MCP_SERVER_NAME in mcp_client.connections:
             coinbase_tools = await mcp_client.get_tools(server_name=settings.COINBASE_MCP_SERVER_NAME)
-            tools.extend(coinbase_tools)
+            tools.extend(tool_schema_minifier.minify_all(coinbase_tools))
+
+        return cls(tools=tools, middleware=middleware, admission_scheduler=admission_scheduler)
+
+
+class WorkflowResultSummarizerAgentResponse(BaseModel):
+    """
+    Schema for the structured response of the workflow result summarizer.
+    """
+    summary: str
+    highlights: WorkflowResultHighlights
+
+
+class WorkflowResultSummarizerPromptVars(TypedDict):
+    workflow_name: str
+
+
+class WorkflowResultSummarizerAgent(Agent):
+    """
+    Agent summarizing the report of a workflow run into a short summary and structured
+    highlights, after the result is saved. It has no tools and runs on a cheap model.
+    """
+    agent_type = "workflow_result_summarizer"
+
+    def __init__(
+        self,
+        middleware: list[AgentMiddleware],
+        admission_scheduler: LLMAdmissionScheduler | None = None,
+    ):
+        super().__init__(
+            tools=[],
+            response_format=WorkflowResultSummarizerAgentResponse,
+            system_prompt=WORKFLOW_RESULT_SUMMARIZER_PROMPT,
+            middleware=middleware,
+            provider=settings.WORKFLOW_RESULT_SUMMARIZER_LLM_PROVIDER,
+            model_name=settings.WORKFLOW_RESULT_SUMMARIZER_LLM_MODEL,
+            temperature=settings.WORKFLOW_RESULT_SUMMARIZER_TEMPERATURE,
+            priority=RequestPriority.WORKFLOW,
+            admission_scheduler=admission_scheduler,
+        )
+
+    async def generate_response(
+        self,
+        conversation: list[Message],
+        system_prompt_placeholder_values: WorkflowResultSummarizerPromptVars,
+        user_id: str | None = None,
+    ) -> WorkflowResultSummarizerAgentResponse:
+        return await super().generate_response(
+            conversation=conversation,
+            system_prompt_placeholder_values=system_prompt_placeholder_values,
+            user_id=user_id,
+        )
+
+
+class ResearchSubAgentPromptVars(TypedDict):
+    subject: str
+
+
+@dataclass
+class ResearchSubAgentRuntimeContext(MarketDataToolsRuntimeContext, ToolPayloadToolsRuntimeContext):
+    pass
+
+
+class ResearchSubAgent(Agent):
+    """
+    Lightweight agent researching a single subject (usually one ticker) for the
+    ResearchCoordinator. It gets a short prompt, the analytics tools and a few
+    market-data tools only, and returns a structured summary.
+    Note: Callers should use the create classmethod to instantiate.
+    """
+    agent_type = "research_sub_agent"
+
+    def __init__(
+        self,
+        tools: list[BaseTool],
+        middleware: list[AgentMiddleware],
+        admission_scheduler: LLMAdmissionScheduler | None = None,
+    ):
+        super().__init__(
+            tools=tools,
+            response_format=ResearchSubAgentResponse,
+            system_prompt=RESEARCH_SUB_AGENT_PROMPT,
+            middleware=middleware,
+            runtime_context_schema=ResearchSubAgentRuntimeContext,
+            provider=settings.RESEARCH_SUB_AGENT_LLM_PROVIDER,
+            model_name=settings.RESEARCH_SUB_AGENT_LLM_MODEL,
+            temperature=settings.RESEARCH_SUB_AGENT_TEMPERATURE,
+            priority=RequestPriority.INTERACTIVE,
+            admission_scheduler=admission_scheduler,
+        )
+
+    async def generate_response(
+        self,
+        conversation: list[Message],
+        runtime_context: ResearchSubAgentRuntimeContext,
+        system_prompt_placeholder_values: ResearchSubAgentPromptVars | None = None,
+        user_id: str | None = None,
+        priority: RequestPriority | None = None,
+    ) -> ResearchSubAgentResponse:
+        return await super().generate_response(
+            conversation=conversation,
+            runtime_context=runtime_context,
+            system_prompt_placeholder_values=system_prompt_placeholder_values,
+            user_id=user_id,
+            priority=priority,
+        )
+
+    @classmethod
+    async def create(
+        cls,
+        mcp_client: MultiServerMCPClient,
+        middleware: list[AgentMiddleware],
+        admission_scheduler: LLMAdmissionScheduler | None = None,
+    ) -> "ResearchSubAgent":
+        tools = [
+            get_full_tool_result,
+            calculate,
+            calculate_dcf_valuation,
+            get_financial_ratios,
+            compute_technical_indicators,
+        ]
+        if settings.MARKET_DATA_MCP_SERVER_URL:
+            market_data_tools = await mcp_client.get_tools(server_name=settings.MARKET_DATA_MCP_SERVER_NAME)
+            tools.extend(tool_schema_minifier.minify_all([
+                market_data_tool
+                for market_data_tool in market_data_tools
+                if market_data_tool.name in settings.RESEARCH_SUB_AGENT_MARKET_DATA_TOOLS
+            ]))
 
-        return cls(tools=tools, middleware=middleware)
+        return cls(tools=tools, middleware=middleware, admission_scheduler=admission_scheduler)
@@ -0,0 +1,220 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import datetime as dt
+import json
+import time
+from typing import Any
+import uuid
+
+from pydantic import BaseModel
+from pymongo import AsyncMongoClient
+
+from config import settings
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def _compact_table(rows: list[dict], max_list_items: int, float_digits: int) -> dict:
+    """
+    Turns a list of records into a column/row table. Columns that are empty in every
+    row are dropped and columns with the same value in every row are hoisted into
+    `common`, so repeated keys and constant values are sent once.
+    """
+    columns: list[str] = []
+    for row in rows:
+        for column in row:
+            if column not in columns:
+                columns.append(column)
+
+    common = {}
+    table_columns = []
+    for column in columns:
+        values = [row.get(column) for row in rows]
+        if all(_is_empty(value) for value in values):
+            continue
+        if len(rows) > 1 and all(value == values[0] for value in values):
+            common[column] = _compact(values[0], max_list_items, float_digits)
+            continue
+        table_columns.append(column)
+
+    table: dict[str, Any] = {}
+    if common:
+        table["common"] = common
+    table["columns"] = table_columns
+    table["rows"] = [
+        [_compact(row.get(column), max_list_items, float_digits) for column in table_columns]
+        for row in rows[:max_list_items]
+    ]
+    if len(rows) > max_list_items:
+        table["omitted_rows"] = len(rows) - max_list_items
+    return table
+
+
+def _compact(value: Any, max_list_items: int, float_digits: int) -> Any:
+    if isinstance(value, float):
+        return round(value, float_digits)
+
+    if isinstance(value, dict):
+        return {
+            key: _compact(item, max_list_items, float_digits)
+            for key, item in value.items()
+            if not _is_empty(item)
+        }
+
+    if isinstance(value, list):
+        if len(value) > 1 and all(isinstance(item, dict) for item in value):
+            return _compact_table(value, max_list_items, float_digits)
+
+        items = [_compact(item, max_list_items, float_digits) for item in value[:max_list_items]]
+        if len(value) > max_list_items:
+            items.append(f"... {len(value) - max_list_items} more items")
+        return items
+
+    return value
+
+
+def compact_json_text(
+    text: str,
+    max_list_items: int = settings.TOOL_OUTPUT_COMPACTION_MAX_LIST_ITEMS,
+    float_digits: int = settings.TOOL_OUTPUT_COMPACTION_FLOAT_DIGITS,
+) -> str | None:
+    """
+    Compacts a JSON tool payload: arrays of records become tables, empty and constant
+    fields are dropped, floats are rounded and long lists are capped.
+
+    Returns:
+        The compacted JSON text, or None if the text is not JSON.
+    """
+    try:
+        payload = json.loads(text)
+    except (TypeError, ValueError):
+        return None
+
+    return json.dumps(_compact(payload, max_list_items, float_digits), separators=(",", ":"), default=str)
+
+
+def compact_tool_content(content: str | list) -> str | list:
+    """
+    Compacts every JSON text of a tool message content, leaving anything else as is.
+    """
+    if isinstance(content, str):
+        return compact_json_text(content) or content
+
+    compacted = []
+    for block in content:
+        if isinstance(block, dict) and block.get("type") == "text":
+            compacted_text = compact_json_text(block.get("text", ""))
+            if compacted_text is not None:
+                block = {**block, "text": compacted_text}
+        compacted.append(block)
+    return compacted
+
+
+def content_size(content: str | list) -> int:
+    if isinstance(content, str):
+        return len(content)
+    return len(json.dumps(content, default=str))
+
+
+class ToolPayloadStore(ABC):
+    """
+    Keeps the full payloads of compacted tool results for a while so that the agent
+    can still read them, by handle, through the getFullToolResult tool.
+    """
+
+    @staticmethod
+    def _new_handle() -> str:
+        return uuid.uuid4().hex[:12]
+
+    @staticmethod
+    def _text(content: str | list) -> str:
+        return content if isinstance(content, str) else json.dumps(content, default=str)
+
+    @abstractmethod
+    async def put(self, content: str | list) -> str:
+        """Stores a payload and returns its handle."""
+        pass
+
+    @abstractmethod
+    async def get(self, handle: str) -> str | None:
+        """The payload of a handle, None when it is unknown or expired."""
+        pass
+
+
+class InMemoryToolPayloadStore(ToolPayloadStore):
+    """
+    Payload store local to the current process, evicting the oldest payloads. Handles
+    are unknown to the other workers and lost on restart.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = settings.TOOL_PAYLOAD_STORE_TTL_SECONDS,
+        max_entries: int = settings.TOOL_PAYLOAD_STORE_MAX_ENTRIES,
+    ):
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        self._payloads: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    async def put(self, content: str | list) -> str:
+        handle = self._new_handle()
+        self._payloads[handle] = (time.monotonic() + self._ttl_seconds, self._text(content))
+        while len(self._payloads) > self._max_entries:
+            self._payloads.popitem(last=False)
+        return handle
+
+    async def get(self, handle: str) -> str | None:
+        entry = self._payloads.get(handle)
+        if entry is None:
+            return None
+
+        expires_at, text = entry
+        if expires_at <= time.monotonic():
+            del self._payloads[handle]
+            return None
+        return text
+
+
+class ToolPayloadMongoDoc(BaseModel):
+    handle: str
+    text: str
+    expires_at: dt.datetime
+
+
+class MongoDBToolPayloadStore(ToolPayloadStore):
+    """Payload store shared by every worker, stored in a TTL collection."""
+    _indexes_created: bool = False
+
+    def __init__(self, mongo_client: AsyncMongoClient, ttl_seconds: int = settings.TOOL_PAYLOAD_STORE_TTL_SECONDS):
+        self.db = mongo_client[settings.MONGO_DB_NAME]
+        self._ttl_seconds = ttl_seconds
+
+    async def _ensure_indexes(self) -> None:
+        if MongoDBToolPayloadStore._indexes_created:
+            return
+        collection = self.db[settings.TOOL_PAYLOAD_STORE_COLLECTION_NAME]
+        await collection.create_index("handle", unique=True)
+        await collection.create_index("expires_at", expireAfterSeconds=0)
+        MongoDBToolPayloadStore._indexes_created = True
+
+    async def put(self, content: str | list) -> str:
+        await self._ensure_indexes()
+        collection = self.db[settings.TOOL_PAYLOAD_STORE_COLLECTION_NAME]
+        doc = ToolPayloadMongoDoc(
+            handle=self._new_handle(),
+            text=self._text(content),
+            expires_at=dt.datetime.now(dt.timezone.utc) + dt.timedelta(seconds=self._ttl_seconds),
+        )
+        await collection.insert_one(doc.model_dump())
+        return doc.handle
+
+    async def get(self, handle: str) -> str | None:
+        collection = self.db[settings.TOOL_PAYLOAD_STORE_COLLECTION_NAME]
+        # The TTL monitor only runs periodically, so expired documents may still be around
+        doc = await collection.find_one({
+            "handle": handle,
+            "expires_at": {"$gt": dt.datetime.now(dt.timezone.utc)},
+        })
+        return ToolPayloadMongoDoc.model_validate(doc).text if doc else None
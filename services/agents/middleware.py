@@ -1,14 +1,55 @@
 import asyncio
-from collections.abc import Callable
+from collections import OrderedDict
+from collections.abc import (
+    Awaitable,
+    Callable,
+)
+import json
 import logging
 
-from langchain.agents.middleware import AgentMiddleware
-from langchain.messages import ToolMessage
+from langchain.agents.middleware import (
+    AgentMiddleware,
+    ModelRequest,
+    ModelResponse,
+)
+from langchain.messages import (
+    AIMessage,
+    AnyMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
 from langchain.tools.tool_node import ToolCallRequest
 from langgraph.types import Command
 
 
-from config import settings
+from config import (
+    settings,
+    LLMProvider,
+)
+from services.rate_limiter import TokenBucketRateLimiter
+from services.agents.compaction import (
+    ToolPayloadStore,
+    compact_tool_content,
+    content_size,
+)
+from services.agents.tool_cache import (
+    CachedToolResult,
+    ToolResultCache,
+    tool_cache_key,
+)
+from services.agents.planning import PLANNED_WAVE_METADATA_KEY
+from services.agents.scheduler import (
+    LLMAdmissionScheduler,
+    RequestPriority,
+)
+from services.agents.skill_router import (
+    SkillRoute,
+    SkillRouter,
+    skill_router,
+    skill_router_metrics,
+)
+from services.agents.skill_registry import skill_registry
 
 logger = logging.getLogger(__name__)
 
@@ -52,12 +93,166 @@ class ToolTokenRateLimitMiddleware(AgentMiddleware):
     this middleware is to delay the tool execution of the tools that
     consume a big amount of tokens to avoid getting rate limited.
 
-    A class-level lock serialises all token-intensive calls so that when
-    the LLM requests multiple such tools in one response (LangGraph runs
-    them concurrently via asyncio.gather), they still execute one at a
-    time with the full cooldown between them.
+    Every tool call pays for itself from a single token bucket, with
+    token-intensive tools paying more. The bucket lives in the rate
+    limiter's store, so with a shared store the pacing holds for all
+    workers and scheduler nodes together instead of per process.
+
+    The calls of a plan wave (see PlanExecuteMiddleware) pay once together,
+    the cost of the wave's most expensive call: their results reach the
+    model in a single call, and paying per call would run them one by one.
+    """
+    _BUCKET_KEY = "tool_calls"
+    _MAX_TRACKED_WAVES = 256
+
+    def __init__(self, rate_limiter: TokenBucketRateLimiter):
+        super().__init__()
+        self._rate_limiter = rate_limiter
+        # Payment of the recent plan waves, by wave message id
+        self._wave_payments: OrderedDict[str, asyncio.Future] = OrderedDict()
+
+    @staticmethod
+    def _cost(tool_name: str) -> float:
+        if tool_name in settings.TOKEN_INTENSIVE_TOOLS:
+            return settings.TOKEN_INTENSIVE_TOOL_RATE_LIMIT_COST
+        return settings.TOOL_RATE_LIMIT_COST
+
+    async def _pay(self, cost: float) -> None:
+        await self._rate_limiter.acquire(
+            key=self._BUCKET_KEY,
+            tokens=cost,
+            capacity=settings.TOOL_RATE_LIMIT_BUCKET_CAPACITY,
+            refill_rate=settings.TOOL_RATE_LIMIT_REFILL_PER_SECOND,
+        )
+
+    @staticmethod
+    def _planned_wave(request: ToolCallRequest) -> AIMessage | None:
+        """The plan wave the tool call belongs to, None for a call made by the model."""
+        messages = request.state.get("messages", []) if isinstance(request.state, dict) else []
+        for message in reversed(messages):
+            if isinstance(message, AIMessage):
+                return message if message.id and message.response_metadata.get(PLANNED_WAVE_METADATA_KEY) else None
+        return None
+
+    async def awrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], ToolMessage | Command],
+    ) -> ToolMessage | Command:
+        wave = self._planned_wave(request)
+        if wave is None:
+            await self._pay(self._cost(request.tool_call["name"]))
+            return await handler(request)
+
+        payment = self._wave_payments.get(wave.id)
+        if payment is None:
+            payment = asyncio.ensure_future(self._pay(max(self._cost(tool_call["name"]) for tool_call in wave.tool_calls)))
+            self._wave_payments[wave.id] = payment
+            if len(self._wave_payments) > self._MAX_TRACKED_WAVES:
+                self._wave_payments.popitem(last=False)
+        # Shielded, a cancelled call mustn't cancel the payment of the other calls of its wave
+        await asyncio.shield(payment)
+        return await handler(request)
+
+
+class ToolResultCacheMiddleware(AgentMiddleware):
+    """
+    Serves repeated market-data tool calls from a cache shared across requests.
+
+    Only tools with a TTL in settings.TOOL_RESULT_CACHE_TTLS are cached, and calls
+    scoped to a user are never cached. Identical calls that arrive while the first
+    one is still running wait for its result instead of hitting the MCP server again
+    (see ToolResultCache.get_or_compute).
+    """
+    def __init__(self, cache: ToolResultCache):
+        super().__init__()
+        self._cache = cache
+
+    async def awrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], ToolMessage | Command],
+    ) -> ToolMessage | Command:
+        tool_name = request.tool_call["name"]
+        tool_args = request.tool_call["args"]
+        ttl_seconds = settings.TOOL_RESULT_CACHE_TTLS.get(tool_name)
+        if not ttl_seconds or "user_id" in tool_args:
+            return await handler(request)
+
+        def to_cached_result(result: ToolMessage | Command, latency_seconds: float) -> CachedToolResult | None:
+            if not isinstance(result, ToolMessage) or result.status == "error":
+                return None
+            return CachedToolResult(
+                tool_name=tool_name,
+                content=result.content,
+                size_bytes=len(json.dumps(result.content, default=str).encode()),
+                latency_seconds=latency_seconds,
+            )
+
+        result = await self._cache.get_or_compute(
+            tool_name,
+            tool_cache_key(tool_name, tool_args),
+            ttl_seconds,
+            compute=lambda: handler(request),
+            to_cached_result=to_cached_result,
+        )
+        if isinstance(result, CachedToolResult):
+            return ToolMessage(
+                content=result.content,
+                tool_call_id=request.tool_call["id"],
+                name=tool_name,
+            )
+        return result
+
+
+class SessionToolMemoMiddleware(AgentMiddleware):
+    """
+    Answers tool calls already made earlier in the chat session from the session's
+    tool memo (see SessionToolMemo) and records new results into it. Runs are
+    passed through untouched when the runtime context carries no memo.
+    """
+    async def awrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], ToolMessage | Command],
+    ) -> ToolMessage | Command:
+        session_tool_memo = getattr(request.runtime.context, "session_tool_memo", None)
+        if session_tool_memo is None:
+            return await handler(request)
+
+        tool_name = request.tool_call["name"]
+        tool_args = request.tool_call["args"]
+        entry = session_tool_memo.lookup(tool_name, tool_args)
+        if entry:
+            note = f"[Result recorded earlier in this conversation at {entry.recorded_at}"
+            note += ", abridged. Call the tool again for the full result.]" if entry.is_digest else ".]"
+            content = entry.content
+            if isinstance(content, str):
+                content = [{"type": "text", "text": content}]
+            return ToolMessage(
+                content=[{"type": "text", "text": note}, *content],
+                tool_call_id=request.tool_call["id"],
+                name=tool_name,
+            )
+
+        result = await handler(request)
+        if isinstance(result, ToolMessage) and result.status != "error":
+            session_tool_memo.record(tool_name, tool_args, result.content)
+        return result
+
+
+class ToolOutputCompactionMiddleware(AgentMiddleware):
+    """
+    Compacts the JSON output of token-intensive tools before it reaches the model
+    (see compact_tool_content). The full payload stays available to the agent
+    through the getFullToolResult tool with the handle appended to the output.
+
+    Calls scoped to a user (notes, workflow reports) are never compacted: handles
+    aren't tied to a user, so their payloads must never be stored behind one.
     """
-    _lock: asyncio.Lock = asyncio.Lock()
+    def __init__(self, payload_store: ToolPayloadStore):
+        super().__init__()
+        self._payload_store = payload_store
 
     async def awrap_tool_call(
         self,
@@ -65,10 +260,148 @@ class ToolTokenRateLimitMiddleware(AgentMiddleware):
         handler: Callable[[ToolCallRequest], ToolMessage | Command],
     ) -> ToolMessage | Command:
         tool_name = request.tool_call["name"]
-        async with ToolTokenRateLimitMiddleware._lock:
-            if tool_name in settings.TOKEN_INTENSIVE_TOOLS:
-                await asyncio.sleep(125)
-            else:
-                await asyncio.sleep(90)
+        result = await handler(request)
+        if (
+            tool_name not in settings.TOKEN_INTENSIVE_TOOLS
+            or "user_id" in request.tool_call["args"]
+            or not isinstance(result, ToolMessage)
+            or result.status == "error"
+        ):
+            return result
+
+        original_size = content_size(result.content)
+        if original_size < settings.TOOL_OUTPUT_COMPACTION_MIN_CHARS:
+            return result
+
+        compacted_content = compact_tool_content(result.content)
+        compacted_size = content_size(compacted_content)
+        logger.info(
+            "TOOL [%s] OUTPUT COMPACTED FROM %d TO %d CHARS (ratio %.2f)",
+            tool_name,
+            original_size,
+            compacted_size,
+            compacted_size / original_size,
+        )
+        if compacted_size >= original_size:
+            return result
+
+        handle = await self._payload_store.put(result.content)
+        note = (
+            f"[Compacted output ({compacted_size} of {original_size} chars). "
+            f"Full payload: getFullToolResult(handle=\"{handle}\")]"
+        )
+        if isinstance(compacted_content, str):
+            compacted_content = [{"type": "text", "text": compacted_content}]
+
+        return ToolMessage(
+            content=[*compacted_content, {"type": "text", "text": note}],
+            tool_call_id=result.tool_call_id,
+            name=result.name,
+            artifact=result.artifact,
+        )
+
+
+class LLMAdmissionMiddleware(AgentMiddleware):
+    """
+    Routes every model call of an agent run through the shared LLMAdmissionScheduler
+    so that chat, memory and workflow agents don't compete blindly for provider quota.
+
+    Calls to another model than the agent's own (see ModelRoutingMiddleware) are
+    admitted in the pool of that model, given in model_pools by model object id.
+    Calls for which answered_without_model returns True, e.g. the waves of a plan
+    (see PlanExecuteMiddleware), go through without taking a slot.
+    """
+    def __init__(
+        self,
+        scheduler: LLMAdmissionScheduler,
+        provider: LLMProvider,
+        model_name: str,
+        priority: RequestPriority,
+        user_id: str | None = None,
+        model_pools: dict[int, tuple[LLMProvider, str]] | None = None,
+        answered_without_model: Callable[[], bool] | None = None,
+    ):
+        super().__init__()
+        self._scheduler = scheduler
+        self._provider = provider
+        self._model_name = model_name
+        self._priority = priority
+        self._user_id = user_id
+        self._model_pools = model_pools or {}
+        self._answered_without_model = answered_without_model
 
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelResponse:
+        if self._answered_without_model and self._answered_without_model():
+            return await handler(request)
+
+        provider, model_name = self._model_pools.get(id(request.model), (self._provider, self._model_name))
+        async with self._scheduler.admit(
+            provider=provider,
+            model_name=model_name,
+            priority=self._priority,
+            user_id=self._user_id,
+        ):
+            return await handler(request)
+
+
+class SkillInjectionMiddleware(AgentMiddleware):
+    """
+    Injects the skill best matching the user's last message into the system prompt (see
+    SkillRouter), saving the getSkillNames and getSkill round trips. The routing is
+    deterministic, so every model call of a run injects the same skill; it is recorded
+    in the skill router metrics once per user message, and the getSkill calls the agent
+    still makes afterwards are recorded as feedback on the routing decision.
+    """
+    def __init__(self, router: SkillRouter = skill_router):
+        super().__init__()
+        self._router = router
+
+    def _route(self, messages: list[AnyMessage], log: bool = False) -> SkillRoute | None:
+        last_human_message = next((message for message in reversed(messages) if isinstance(message, HumanMessage)), None)
+        if last_human_message is None or not last_human_message.text:
+            return None
+        return self._router.route(last_human_message.text, log=log)
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelResponse:
+        if not settings.SKILL_ROUTER_ENABLED:
+            return await handler(request)
+
+        # The first model call for a user message is the one right after it
+        first_call = bool(request.messages) and isinstance(request.messages[-1], HumanMessage)
+        route = self._route(request.messages, log=first_call)
+        if first_call:
+            skill_router_metrics.record_route(route)
+        if route is None:
+            return await handler(request)
+
+        omitted = [
+            section.section_id for section in skill_registry.get(route.skill_name).sections
+            if section.section_id and section.section_id not in route.section_ids
+        ]
+        note = f"The `{route.skill_name.value}` skill matches the user's request and is included below, no need to fetch it with getSkill."
+        if omitted:
+            note += f" Only its relevant sections are included; fetch the omitted ones with getSkill if needed: {', '.join(omitted)}."
+        system_prompt = request.system_message.text if request.system_message else ""
+        return await handler(request.override(
+            system_message=SystemMessage(f"{system_prompt}\n\n## Skill: {route.skill_name.value}\n{note}\n\n{route.text}"),
+        ))
+
+    async def awrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], ToolMessage | Command],
+    ) -> ToolMessage | Command:
+        if settings.SKILL_ROUTER_ENABLED and request.tool_call["name"] == "getSkill":
+            skill_router_metrics.record_skill_fetch(
+                self._route(request.state.get("messages", []) if isinstance(request.state, dict) else []),
+                request.tool_call["args"].get("skill_name", ""),
+            )
         return await handler(request)
@@ -0,0 +1,275 @@
+from collections.abc import (
+    Awaitable,
+    Callable,
+)
+from contextlib import nullcontext
+from dataclasses import (
+    dataclass,
+    field,
+)
+from enum import Enum
+import logging
+import re
+import time
+from typing import Literal
+
+from langchain.agents.middleware import (
+    AgentMiddleware,
+    ModelRequest,
+    ModelResponse,
+)
+from langchain.messages import (
+    AIMessage,
+    HumanMessage,
+    SystemMessage,
+)
+from langchain_core.language_models import BaseChatModel
+from pydantic import (
+    BaseModel,
+    Field,
+)
+
+from config import (
+    settings,
+    LLMProvider,
+)
+from services.agents.prompts import MODEL_ROUTER_CLASSIFIER_PROMPT
+from services.agents.scheduler import (
+    LLMAdmissionScheduler,
+    RequestPriority,
+)
+from services.text_search import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+class ModelTier(str, Enum):
+    FAST = "fast"
+    HEAVY = "heavy"
+
+
+class TurnClassification(BaseModel):
+    tier: Literal["fast", "heavy"] = Field(description="The model tier the turn needs")
+
+
+_SMALL_TALK_TOKENS = frozenset({
+    "thank", "thanks", "thx", "ok", "okay", "great", "cool", "nice", "perfect", "awesome", "got", "hi", "hello",
+    "hey", "bye", "goodbye", "good", "morning", "afternoon", "evening", "night", "yes", "yep", "no", "nope",
+    "sure", "much", "lot", "appreciate", "welcome", "sound", "sounds", "fine",
+})
+# Reminders and workflows: creating, listing or changing them is a single tool call, whatever they are about
+_SCHEDULING_PREFIXES = ("remind", "schedul", "workflow")
+_SIMPLE_ACTION_PREFIXES = ("pause", "resum", "cancel", "delete", "list")
+# Words of the requests that need analysis or judgement
+_HEAVY_PREFIXES = (
+    "analy", "valu", "dcf", "intrinsic", "compar", "risk", "portfolio", "allocat", "rebalanc", "diversif",
+    "research", "earning", "financ", "forecast", "strateg", "recommend", "advi", "should", "buy", "sell",
+    "trade", "order", "screen", "moat", "undervalu", "overvalu", "outlook", "why", "explain",
+)
+_TICKER_PATTERN = re.compile(r"\b[A-Z]{2,5}(?:\.[A-Z])?\b")
+
+
+def classify_turn(message: str) -> ModelTier | None:
+    """
+    The tier a user message needs according to the heuristics, None when they can't tell.
+    Reminder and workflow housekeeping and small talk need the fast model; long messages,
+    messages about several tickers and messages with analysis words the heavy one.
+    """
+    if len(message) > settings.MODEL_ROUTER_FAST_MAX_CHARS:
+        return ModelTier.HEAVY
+    tokens = tokenize(message)
+    if any(token.startswith(_SCHEDULING_PREFIXES) for token in tokens):
+        return ModelTier.FAST
+    if len(set(_TICKER_PATTERN.findall(message))) > 1:
+        return ModelTier.HEAVY
+    if any(token.startswith(_HEAVY_PREFIXES) for token in tokens):
+        return ModelTier.HEAVY
+    if all(token in _SMALL_TALK_TOKENS for token in tokens):
+        return ModelTier.FAST
+    if any(token.startswith(_SIMPLE_ACTION_PREFIXES) for token in tokens):
+        return ModelTier.FAST
+    return None
+
+
+@dataclass
+class TierStats:
+    turns: int = 0
+    model_calls: int = 0
+    seconds: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "turns": self.turns,
+            "model_calls": self.model_calls,
+            "avg_call_seconds": round(self.seconds / self.model_calls, 3) if self.model_calls else None,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cost_usd": round(self.cost_usd, 4),
+            "avg_turn_cost_usd": round(self.cost_usd / self.turns, 5) if self.turns else None,
+        }
+
+
+@dataclass
+class ModelRouterMetrics:
+    tiers: dict[ModelTier, TierStats] = field(default_factory=lambda: {tier: TierStats() for tier in ModelTier})
+    classified_by: dict[str, int] = field(default_factory=dict)    # heuristics, classifier or default
+    escalations: dict[str, int] = field(default_factory=dict)      # By reason
+
+    def record_turn(self, tier: ModelTier, classified_by: str) -> None:
+        self.tiers[tier].turns += 1
+        self.classified_by[classified_by] = self.classified_by.get(classified_by, 0) + 1
+
+    def record_escalation(self, reason: str) -> None:
+        self.escalations[reason] = self.escalations.get(reason, 0) + 1
+        # The turn is charged to the heavy tier from now on
+        self.tiers[ModelTier.FAST].turns -= 1
+        self.tiers[ModelTier.HEAVY].turns += 1
+
+    def record_call(self, tier: ModelTier, pool_key: str, seconds: float, response: ModelResponse | None) -> None:
+        stats = self.tiers[tier]
+        stats.model_calls += 1
+        stats.seconds += seconds
+        if response is None:
+            return
+        for message in response.result:
+            usage = message.usage_metadata if isinstance(message, AIMessage) else None
+            if not usage:
+                continue
+            stats.input_tokens += usage.get("input_tokens", 0)
+            stats.output_tokens += usage.get("output_tokens", 0)
+            input_price, output_price = settings.LLM_PRICES_PER_MILLION_TOKENS.get(pool_key, (0.0, 0.0))
+            stats.cost_usd += (usage.get("input_tokens", 0) * input_price + usage.get("output_tokens", 0) * output_price) / 1e6
+
+    def to_dict(self) -> dict:
+        return {
+            "tiers": {tier.value: stats.to_dict() for tier, stats in self.tiers.items()},
+            "classified_by": self.classified_by,
+            "escalations": self.escalations,
+        }
+
+
+model_router_metrics = ModelRouterMetrics()
+
+
+class ModelRoutingMiddleware(AgentMiddleware):
+    """
+    Runs the simple turns of an agent on a fast model instead of the agent's own (heavy)
+    model. The tier of a turn is decided on its first model call by classify_turn, then,
+    when the heuristics can't tell, by asking the fast model; turns that still can't be
+    told apart go to the heavy model.
+
+    A turn on the fast tier is escalated to the heavy model for the rest of the run when
+    the fast model calls one of MODEL_ROUTER_HEAVY_TOOLS, fails to produce the structured
+    response, or errors. The fast model's response is then discarded and the call is made
+    again on the heavy model, so none of its tool calls run.
+
+    The middleware holds the state of a single run: create one per agent run.
+    """
+    def __init__(
+        self,
+        fast_model: BaseChatModel,
+        fast_provider: LLMProvider,
+        fast_model_name: str,
+        heavy_provider: LLMProvider,
+        heavy_model_name: str,
+        admission_scheduler: LLMAdmissionScheduler | None = None,
+        priority: RequestPriority = RequestPriority.INTERACTIVE,
+        user_id: str | None = None,
+    ):
+        super().__init__()
+        self._fast_model = fast_model
+        self._fast_pool_key = LLMAdmissionScheduler.pool_key(fast_provider, fast_model_name)
+        self._heavy_pool_key = LLMAdmissionScheduler.pool_key(heavy_provider, heavy_model_name)
+        self._fast_provider = fast_provider
+        self._fast_model_name = fast_model_name
+        self._admission_scheduler = admission_scheduler
+        self._priority = priority
+        self._user_id = user_id
+        self._tier: ModelTier | None = None
+
+    async def _classify_with_model(self, request: ModelRequest) -> ModelTier | None:
+        last_messages = request.messages[-3:]
+        admission = (
+            self._admission_scheduler.admit(
+                provider=self._fast_provider,
+                model_name=self._fast_model_name,
+                priority=self._priority,
+                user_id=self._user_id,
+            )
+            if self._admission_scheduler else nullcontext()
+        )
+        try:
+            async with admission:
+                classification = await self._fast_model.with_structured_output(TurnClassification).ainvoke([
+                    SystemMessage(MODEL_ROUTER_CLASSIFIER_PROMPT),
+                    *last_messages,
+                ])
+            return ModelTier(classification.tier)
+        except Exception as e:
+            logger.warning("Failed to classify the turn with the fast model: %s", str(e))
+            return None
+
+    async def _route(self, request: ModelRequest) -> ModelTier:
+        last_human_message = next((message for message in reversed(request.messages) if isinstance(message, HumanMessage)), None)
+        text = last_human_message.text if last_human_message else ""
+        tier, classified_by = classify_turn(text), "heuristics"
+        if tier is None and settings.MODEL_ROUTER_CLASSIFIER_ENABLED:
+            tier, classified_by = await self._classify_with_model(request), "classifier"
+        if tier is None:
+            tier, classified_by = ModelTier.HEAVY, "default"
+        model_router_metrics.record_turn(tier, classified_by)
+        logger.info("MODEL ROUTER: %s tier (by %s)", tier.value, classified_by)
+        return tier
+
+    def _escalation_reason(self, request: ModelRequest, response: ModelResponse) -> str | None:
+        if response.structured_response is not None:
+            return None
+        tool_names = {tool.name if hasattr(tool, "name") else tool.get("name") for tool in request.tools}
+        tool_calls = [
+            tool_call
+            for message in response.result if isinstance(message, AIMessage)
+            for tool_call in message.tool_calls
+            if tool_call["name"] in tool_names
+        ]
+        if not tool_calls:
+            # Neither a structured response nor a tool call: the final answer is malformed
+            return "structured_output"
+        if any(tool_call["name"] in settings.MODEL_ROUTER_HEAVY_TOOLS for tool_call in tool_calls):
+            return "heavy_tool"
+        return None
+
+    async def _call(self, tier: ModelTier, request: ModelRequest, handler: Callable[[ModelRequest], Awaitable[ModelResponse]]) -> ModelResponse:
+        started_at = time.monotonic()
+        response = None
+        try:
+            response = await handler(request)
+            return response
+        finally:
+            pool_key = self._fast_pool_key if tier == ModelTier.FAST else self._heavy_pool_key
+            model_router_metrics.record_call(tier, pool_key, time.monotonic() - started_at, response)
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelResponse:
+        if self._tier is None:
+            self._tier = await self._route(request)
+
+        if self._tier == ModelTier.FAST:
+            try:
+                response = await self._call(ModelTier.FAST, request.override(model=self._fast_model), handler)
+                reason = self._escalation_reason(request, response)
+            except Exception as e:
+                logger.warning("Fast model call failed, escalating to the heavy model: %s", str(e))
+                reason = "error"
+            if reason is None:
+                return response
+            logger.info("MODEL ROUTER: escalating to the heavy tier (%s)", reason)
+            model_router_metrics.record_escalation(reason)
+            self._tier = ModelTier.HEAVY
+
+        return await self._call(ModelTier.HEAVY, request, handler)
@@ -0,0 +1,277 @@
+from collections.abc import (
+    Awaitable,
+    Callable,
+)
+from dataclasses import (
+    dataclass,
+    field,
+)
+import json
+import logging
+import time
+from typing import Any
+import uuid
+
+from langchain.agents.middleware import (
+    AgentMiddleware,
+    ModelRequest,
+    ModelResponse,
+)
+from langchain.messages import (
+    AIMessage,
+    SystemMessage,
+)
+from langchain.tools import BaseTool
+from pydantic import (
+    BaseModel,
+    Field,
+)
+
+from config import settings
+from services.agents.prompts import (
+    PLAN_EXECUTE_PLANNING_PROMPT,
+    PLAN_EXECUTE_SYNTHESIS_PROMPT,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class PlannedToolCall(BaseModel):
+    step_id: str = Field(description="Short unique id of the step, e.g. 's1'")
+    tool: str = Field(description="Name of the tool to call")
+    args: dict[str, Any] = Field(default={}, description="Complete, literal arguments of the tool call")
+    depends_on: list[str] = Field(default=[], description="Ids of the steps that must have run before this one")
+
+
+class ToolPlan(BaseModel):
+    """All the tool calls needed to answer, as a DAG. Independent steps run concurrently."""
+    steps: list[PlannedToolCall] = []
+
+
+def plan_waves(steps: list[PlannedToolCall], tool_names: set[str]) -> tuple[list[list[PlannedToolCall]], dict[str, str]]:
+    """
+    Splits a plan into waves of steps that can run concurrently: every step runs in the
+    wave after the last of its dependencies.
+
+    Returns:
+        The waves, and the skipped steps by id with the reason (unknown tool, unknown or
+        skipped dependency, dependency cycle).
+    """
+    skipped: dict[str, str] = {}
+    steps_by_id: dict[str, PlannedToolCall] = {}
+    for step in steps:
+        if step.step_id in steps_by_id:
+            skipped[step.step_id] = "Duplicate step id"
+        elif step.tool not in tool_names:
+            skipped[step.step_id] = f"Unknown tool {step.tool}"
+        else:
+            steps_by_id[step.step_id] = step
+
+    levels: dict[str, int] = {}
+    pending = dict(steps_by_id)
+    while pending:
+        progressed = False
+        for step_id, step in list(pending.items()):
+            blocked = [dependency for dependency in step.depends_on if dependency not in steps_by_id]
+            if blocked:
+                skipped[step_id] = f"Depends on skipped or unknown steps: {', '.join(blocked)}"
+                steps_by_id.pop(step_id)
+            elif all(dependency in levels for dependency in step.depends_on):
+                levels[step_id] = 1 + max((levels[dependency] for dependency in step.depends_on), default=-1)
+            else:
+                continue
+            del pending[step_id]
+            progressed = True
+        if not progressed:
+            for step_id in pending:
+                skipped[step_id] = "Dependency cycle"
+                steps_by_id.pop(step_id)
+            break
+
+    waves: list[list[PlannedToolCall]] = [[] for _ in range(max(levels.values(), default=-1) + 1)]
+    for step_id, level in levels.items():
+        waves[level].append(steps_by_id[step_id])
+    return waves, skipped
+
+
+def describe_tools(tools: list[BaseTool | dict]) -> str:
+    """One line per tool with its name, description and JSON arguments schema, for the planning prompt."""
+    lines = []
+    for tool in tools:
+        if not isinstance(tool, BaseTool):
+            continue
+        schema = tool.tool_call_schema
+        properties = schema.model_json_schema().get("properties", {}) if isinstance(schema, type) else schema.get("properties", {})
+        lines.append(f"- {tool.name}: {tool.description.strip()} Arguments: {json.dumps(properties, separators=(',', ':'))}")
+    return "\n".join(lines)
+
+
+# Response metadata key of the wave responses, which are answered without calling the model
+PLANNED_WAVE_METADATA_KEY = "plan_execute_wave"
+
+
+def is_planned_wave(response: ModelResponse) -> bool:
+    """Whether a model response is a wave of a plan emitted by PlanExecuteMiddleware, not a model's answer."""
+    return any(
+        isinstance(message, AIMessage) and message.response_metadata.get(PLANNED_WAVE_METADATA_KEY)
+        for message in response.result
+    )
+
+
+@dataclass
+class PlanExecuteMetrics:
+    runs: int = 0
+    fallbacks: int = 0             # Runs whose plan could not be made, answered in ReAct mode
+    planned_steps: int = 0
+    skipped_steps: int = 0
+    waves: int = 0
+    plan_seconds: float = 0.0
+    execute_seconds: float = 0.0
+    synthesis_seconds: float = 0.0
+    last_run: dict = field(default_factory=dict)
+
+    def record(self, timings: dict) -> None:
+        self.runs += 1
+        self.planned_steps += timings["steps"]
+        self.skipped_steps += timings["skipped_steps"]
+        self.waves += timings["waves"]
+        self.plan_seconds += timings["plan_seconds"]
+        self.execute_seconds += timings["execute_seconds"]
+        self.synthesis_seconds += timings["synthesis_seconds"]
+        self.last_run = timings
+
+    def to_dict(self) -> dict:
+        runs = max(self.runs, 1)
+        return {
+            "runs": self.runs,
+            "fallbacks": self.fallbacks,
+            "avg_steps": round(self.planned_steps / runs, 2),
+            "avg_skipped_steps": round(self.skipped_steps / runs, 2),
+            "avg_waves": round(self.waves / runs, 2),
+            "avg_plan_seconds": round(self.plan_seconds / runs, 3),
+            "avg_execute_seconds": round(self.execute_seconds / runs, 3),
+            "avg_synthesis_seconds": round(self.synthesis_seconds / runs, 3),
+            "last_run": self.last_run,
+        }
+
+
+plan_execute_metrics = PlanExecuteMetrics()
+
+
+class PlanExecuteMiddleware(AgentMiddleware):
+    """
+    Runs an agent in plan-then-execute mode instead of the ReAct loop.
+
+    The first model call asks the model for a ToolPlan: every tool call it needs, as a
+    DAG. The following model calls are answered without the LLM by emitting the plan
+    one wave at a time as parallel tool calls, so that the agent's ToolNode runs the
+    independent steps of a wave concurrently, through the whole tool middleware stack.
+    Once every wave has run, the model is called one last time, without tools, to
+    synthesize the answer from the results. A plan that calls one of the
+    PLAN_EXECUTE_REACT_ONLY_TOOLS (orders) is dropped and the run goes on as a ReAct loop.
+
+    The middleware holds the state of a single run: create one per agent run.
+    """
+    def __init__(self, max_steps: int = settings.PLAN_EXECUTE_MAX_STEPS):
+        super().__init__()
+        self._max_steps = max_steps
+        self._waves: list[list[PlannedToolCall]] | None = None
+        self._next_wave = 0
+        self._skipped: dict[str, str] = {}
+        self._fallback = False
+        self._started_at = time.monotonic()
+        self._execute_started_at = self._started_at
+        self.timings: dict[str, Any] = {}
+
+    async def _make_plan(self, request: ModelRequest) -> None:
+        system_prompt = request.system_message.text if request.system_message else ""
+        planning_prompt = PLAN_EXECUTE_PLANNING_PROMPT.format(
+            tool_catalog=describe_tools(request.tools),
+            max_steps=self._max_steps,
+        )
+        planner = request.model.with_structured_output(ToolPlan)
+        plan = await planner.ainvoke([
+            SystemMessage(f"{system_prompt}\n\n{planning_prompt}"),
+            *request.messages,
+        ])
+        # Their arguments (e.g. an order's size) must not be decided before any result is seen
+        react_only_tools = sorted({step.tool for step in plan.steps} & set(settings.PLAN_EXECUTE_REACT_ONLY_TOOLS))
+        if react_only_tools:
+            raise ValueError(f"The plan calls {', '.join(react_only_tools)}, which only run in the ReAct loop")
+        steps = plan.steps[:self._max_steps]
+        tool_names = {tool.name for tool in request.tools if isinstance(tool, BaseTool)}
+        self._waves, self._skipped = plan_waves(steps, tool_names)
+        self.timings["plan_seconds"] = round(time.monotonic() - self._started_at, 3)
+        self.timings["steps"] = sum(len(wave) for wave in self._waves)
+        self.timings["skipped_steps"] = len(self._skipped)
+        self.timings["waves"] = len(self._waves)
+        self._execute_started_at = time.monotonic()
+
+    def answers_next_call(self) -> bool:
+        """Whether the next model call will be answered with a wave of the plan, without calling the model."""
+        return not self._fallback and self._waves is not None and self._next_wave < len(self._waves)
+
+    def _wave_response(self, wave: list[PlannedToolCall]) -> ModelResponse:
+        tool_calls = [
+            {"name": step.tool, "args": step.args, "id": f"call_{uuid.uuid4().hex[:16]}", "type": "tool_call"}
+            for step in wave
+        ]
+        return ModelResponse(result=[
+            AIMessage(
+                content="",
+                tool_calls=tool_calls,
+                id=f"wave_{uuid.uuid4().hex}",
+                response_metadata={PLANNED_WAVE_METADATA_KEY: True},
+            ),
+        ])
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelResponse:
+        if self._fallback:
+            return await handler(request)
+
+        if self._waves is None:
+            try:
+                await self._make_plan(request)
+            except Exception as e:
+                # Without a plan, the run goes on as a regular ReAct loop
+                logger.warning("Failed to plan the tool calls, falling back to the ReAct loop: %s", str(e))
+                self._fallback = True
+                plan_execute_metrics.fallbacks += 1
+                return await handler(request)
+
+        if self._next_wave < len(self._waves):
+            wave = self._waves[self._next_wave]
+            self._next_wave += 1
+            return self._wave_response(wave)
+
+        synthesis_started_at = time.monotonic()
+        if "execute_seconds" not in self.timings:
+            self.timings["execute_seconds"] = round(synthesis_started_at - self._execute_started_at, 3)
+
+        system_prompt = request.system_message.text if request.system_message else ""
+        synthesis_prompt = PLAN_EXECUTE_SYNTHESIS_PROMPT.format(
+            skipped_steps="\n".join(f"- {step_id}: {reason}" for step_id, reason in self._skipped.items()) or "None",
+        )
+        response = await handler(request.override(
+            system_message=SystemMessage(f"{system_prompt}\n\n{synthesis_prompt}"),
+            tools=[],
+        ))
+
+        if "synthesis_seconds" not in self.timings:
+            self.timings["synthesis_seconds"] = round(time.monotonic() - synthesis_started_at, 3)
+            self.timings["total_seconds"] = round(time.monotonic() - self._started_at, 3)
+            plan_execute_metrics.record(self.timings)
+            logger.info(
+                "PLAN-EXECUTE RUN: plan %.2fs, execute %.2fs (%d steps in %d waves, %d skipped), synthesis %.2fs",
+                self.timings["plan_seconds"],
+                self.timings["execute_seconds"],
+                self.timings["steps"],
+                self.timings["waves"],
+                self.timings["skipped_steps"],
+                self.timings["synthesis_seconds"],
+            )
+        return response
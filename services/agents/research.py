@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Literal,
+)
+
+from pydantic import (
+    BaseModel,
+    Field,
+)
+
+from config import settings
+from models.session import (
+    Message,
+    MessageRole,
+)
+from services.analytics.formatting import round_values
+from services.agents.scheduler import RequestPriority
+
+if TYPE_CHECKING:
+    from services.agents.agent import ResearchSubAgent
+
+logger = logging.getLogger(__name__)
+
+
+class ResearchTask(BaseModel):
+    subject: str = Field(description="The ticker or topic to research, e.g. 'AAPL'")
+    question: str = Field(description="What to find out about the subject, e.g. 'Assess the valuation, balance sheet strength and recent news'")
+
+
+class ResearchSubAgentResponse(BaseModel):
+    """
+    Schema for the structured response of a research sub-agent.
+    """
+    summary: str
+    key_metrics: dict[str, float | str | None] = {}
+    positives: list[str] = []
+    risks: list[str] = []
+    verdict: Literal["positive", "neutral", "negative"] = "neutral"
+
+
+def merge_research_summaries(
+    tasks: list[ResearchTask],
+    outcomes: list[ResearchSubAgentResponse | BaseException],
+    durations: list[float],
+) -> dict[str, Any]:
+    """
+    Reduces the sub-agent summaries of a fan-out into one result.
+
+    The key metrics of every subject are merged into a single compact table (one row
+    per task, one column per metric reported by any sub-agent), the subjects are
+    grouped by verdict and failed tasks are reported with their error.
+    """
+    succeeded = [(task, outcome) for task, outcome in zip(tasks, outcomes) if isinstance(outcome, ResearchSubAgentResponse)]
+    metric_names = list(dict.fromkeys(name for _, outcome in succeeded for name in outcome.key_metrics))
+
+    results = []
+    verdicts: dict[str, list[str]] = {"positive": [], "neutral": [], "negative": []}
+    for task, outcome in succeeded:
+        results.append({
+            "subject": task.subject,
+            "summary": outcome.summary,
+            "positives": outcome.positives,
+            "risks": outcome.risks,
+            "verdict": outcome.verdict,
+        })
+        verdicts[outcome.verdict].append(task.subject)
+
+    merged: dict[str, Any] = {
+        "results": results,
+        "key_metrics": {
+            "columns": ["subject"] + metric_names,
+            "rows": [
+                [task.subject] + [round_values(outcome.key_metrics.get(name), 4) for name in metric_names]
+                for task, outcome in succeeded
+            ],
+        },
+        "verdicts": verdicts,
+    }
+    failed = {
+        task.subject: str(outcome) or type(outcome).__name__
+        for task, outcome in zip(tasks, outcomes)
+        if not isinstance(outcome, ResearchSubAgentResponse)
+    }
+    if failed:
+        merged["failed"] = failed
+    merged["timings"] = {
+        "slowest_task_seconds": round(max(durations, default=0.0), 2),
+        "sum_of_task_seconds": round(sum(durations), 2),
+    }
+    return merged
+
+
+class ResearchCoordinator:
+    """
+    Fans a list of research tasks out to concurrent research sub-agent runs and
+    reduces their structured summaries into one result.
+
+    Every task is a separate, short agent run with a trimmed toolset, so a review of
+    N holdings takes about as long as the slowest holding instead of the sum, while at
+    most max_concurrency runs are in flight at once. The model calls of the runs are
+    still admitted by the shared LLM admission scheduler with the coordinator's priority,
+    and the sub-agent of workflows pays for its tool calls from the workflows' token bucket.
+    """
+
+    def __init__(
+        self,
+        sub_agent: "ResearchSubAgent",
+        runtime_context: Any,
+        priority: RequestPriority = RequestPriority.INTERACTIVE,
+        user_id: str | None = None,
+        max_concurrency: int = settings.RESEARCH_SUB_AGENT_MAX_CONCURRENCY,
+        timeout_seconds: float = settings.RESEARCH_SUB_AGENT_TIMEOUT_SECONDS,
+    ):
+        """
+        Args:
+            sub_agent: The agent every task is run with.
+            runtime_context: The runtime context of the sub-agent's tools.
+            priority: The admission priority of the sub-agents' model calls.
+            user_id: The user the research is made for.
+            max_concurrency: Maximum number of sub-agent runs in flight.
+            timeout_seconds: Timeout of a single sub-agent run.
+        """
+        self._sub_agent = sub_agent
+        self._runtime_context = runtime_context
+        self._priority = priority
+        self._user_id = user_id
+        self._max_concurrency = max(1, max_concurrency)
+        self._timeout_seconds = timeout_seconds
+
+    async def _run_task(
+        self,
+        task: ResearchTask,
+        semaphore: asyncio.Semaphore,
+        durations: list[float],
+        index: int,
+    ) -> ResearchSubAgentResponse:
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                return await asyncio.wait_for(
+                    self._sub_agent.generate_response(
+                        conversation=[Message(role=MessageRole.USER, content=task.question)],
+                        runtime_context=self._runtime_context,
+                        system_prompt_placeholder_values={"subject": task.subject},
+                        user_id=self._user_id,
+                        priority=self._priority,
+                    ),
+                    timeout=self._timeout_seconds,
+                )
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"Research timed out after {self._timeout_seconds:g}s")
+            finally:
+                durations[index] = time.monotonic() - start
+
+    async def run(self, tasks: list[ResearchTask]) -> dict[str, Any]:
+        """
+        Runs the tasks concurrently and merges their summaries.
+
+        A failed or timed out task doesn't fail the others: it is reported under "failed".
+        """
+        start = time.monotonic()
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        durations = [0.0] * len(tasks)
+        outcomes = await asyncio.gather(
+            *(self._run_task(task, semaphore, durations, i) for i, task in enumerate(tasks)),
+            return_exceptions=True,
+        )
+        for task, outcome in zip(tasks, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.warning("Research sub-agent failed for %s: %s", task.subject, str(outcome))
+
+        merged = merge_research_summaries(tasks, outcomes, durations)
+        merged["timings"]["total_seconds"] = round(time.monotonic() - start, 2)
+        return merged
@@ -0,0 +1,286 @@
+import asyncio
+from collections import deque
+from collections.abc import (
+    Awaitable,
+    Callable,
+)
+from dataclasses import (
+    dataclass,
+    field,
+)
+import logging
+import time
+
+from langchain.agents.middleware import (
+    AgentMiddleware,
+    ModelRequest,
+    ModelResponse,
+)
+from langchain_core.language_models import BaseChatModel
+import numpy as np
+
+from config import (
+    settings,
+    LLMFallbackSettings,
+)
+from services.agents.planning import is_planned_wave
+
+logger = logging.getLogger(__name__)
+
+
+# Error class names of the provider SDKs for requests that never got a response
+_TRANSIENT_ERROR_NAMES = frozenset({"APIConnectionError", "APITimeoutError", "ServiceUnavailable", "DeadlineExceeded"})
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Rate limits (429), server errors (5xx), timeouts and connection errors: worth retrying elsewhere."""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status is None and isinstance(getattr(error, "code", None), int):
+        status = error.code
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return isinstance(error, (TimeoutError, ConnectionError)) or type(error).__name__ in _TRANSIENT_ERROR_NAMES
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures: the model is skipped for
+    cooldown_seconds, after which a single call is let through to probe it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, cooldown_seconds: float):
+        self._name = name
+        self._failure_threshold = failure_threshold
+        self._cooldown_seconds = cooldown_seconds
+        self._failures = 0
+        self._opened_at: float | None = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None and time.monotonic() - self._opened_at < self._cooldown_seconds
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        if time.monotonic() - self._opened_at < self._cooldown_seconds:
+            return False
+        # Half-open: let this call probe the model, and reopen on failure
+        self._opened_at = time.monotonic()
+        return True
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._failures >= self._failure_threshold:
+            if self._opened_at is None:
+                logger.warning("Circuit breaker of %s opened after %d consecutive failures", self._name, self._failures)
+            self._opened_at = time.monotonic()
+
+
+@dataclass
+class ModelHealth:
+    """The recent latencies and the circuit breaker of a provider/model, shared by all the runs of the process."""
+    breaker: CircuitBreaker
+    latencies: deque[float] = field(default_factory=lambda: deque(maxlen=settings.LLM_LATENCY_WINDOW))
+
+    def hedge_delay(self, fallback: LLMFallbackSettings) -> float:
+        if len(self.latencies) < settings.LLM_LATENCY_MIN_SAMPLES:
+            return fallback.hedge_initial_seconds
+        return max(fallback.hedge_min_seconds, float(np.percentile(self.latencies, fallback.hedge_percentile * 100)))
+
+    def expected_latency_beyond(self, seconds: float) -> float | None:
+        """The mean of the recent latencies longer than seconds, None when there is none."""
+        slower = [latency for latency in self.latencies if latency > seconds]
+        return sum(slower) / len(slower) if slower else None
+
+
+_model_health: dict[str, ModelHealth] = {}
+
+
+def model_health(pool_key: str, fallback: LLMFallbackSettings) -> ModelHealth:
+    if pool_key not in _model_health:
+        _model_health[pool_key] = ModelHealth(
+            breaker=CircuitBreaker(pool_key, fallback.breaker_failures, fallback.breaker_cooldown_seconds),
+        )
+    return _model_health[pool_key]
+
+
+@dataclass
+class ResilienceStats:
+    calls: int = 0
+    hedged: int = 0             # Calls a duplicate request was sent for
+    hedge_wins: int = 0         # Hedged calls answered by the secondary model first
+    failovers: int = 0          # Calls retried on the secondary model after a primary error
+    breaker_skips: int = 0      # Calls sent straight to the secondary model, the breaker being open
+    latency_saved_seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "hedge_rate": round(self.hedged / self.calls, 4) if self.calls else None,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "breaker_skips": self.breaker_skips,
+            "latency_saved_seconds": round(self.latency_saved_seconds, 2),
+        }
+
+
+@dataclass
+class ResilienceMetrics:
+    per_agent_type: dict[str, ResilienceStats] = field(default_factory=dict)
+
+    def stats(self, agent_type: str) -> ResilienceStats:
+        return self.per_agent_type.setdefault(agent_type, ResilienceStats())
+
+    def to_dict(self) -> dict:
+        return {
+            "per_agent_type": {agent_type: stats.to_dict() for agent_type, stats in self.per_agent_type.items()},
+            "open_breakers": sorted(key for key, health in _model_health.items() if health.breaker.is_open),
+        }
+
+
+resilience_metrics = ResilienceMetrics()
+
+
+class ResilientModelMiddleware(AgentMiddleware):
+    """
+    Protects the model calls of an agent against a slow or failing provider with a
+    secondary model, configured per agent type in LLM_FALLBACKS.
+
+    - Hedging: when the primary model hasn't answered after the hedge_percentile of its
+      recent latencies, the same request is sent to the secondary model; the first answer
+      wins and the other request is cancelled.
+    - Failover: a call that fails with a rate limit, server, timeout or connection error
+      is retried on the secondary model.
+    - Circuit breaker: after breaker_failures consecutive such errors, calls go straight
+      to the secondary model for breaker_cooldown_seconds.
+
+    Only the calls to the agent's own model are protected; calls routed to another model
+    (see ModelRoutingMiddleware) go through as they are. A model call has no side effect,
+    the tool calls of the losing response never run. The waves of a plan, answered by
+    PlanExecuteMiddleware without calling the model, are neither counted nor timed.
+
+    The latency saved by a hedge win is estimated, conservatively, as the mean of the
+    primary model's recent latencies longer than the time the hedged call took, minus
+    that time.
+    """
+
+    def __init__(
+        self,
+        agent_type: str,
+        fallback: LLMFallbackSettings,
+        primary_model: BaseChatModel,
+        primary_pool_key: str,
+        secondary_model: BaseChatModel,
+        secondary_pool_key: str,
+    ):
+        super().__init__()
+        self._agent_type = agent_type
+        self._fallback = fallback
+        self._primary_model = primary_model
+        self._primary_pool_key = primary_pool_key
+        self._secondary_model = secondary_model
+        self._secondary_pool_key = secondary_pool_key
+
+    async def _call_primary(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+        health: ModelHealth,
+    ) -> ModelResponse:
+        started_at = time.monotonic()
+        try:
+            response = await handler(request)
+        except Exception as e:
+            if is_transient_error(e):
+                health.breaker.record_failure()
+            raise
+        if not is_planned_wave(response):
+            health.breaker.record_success()
+            health.latencies.append(time.monotonic() - started_at)
+        return response
+
+    async def _hedged_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+        health: ModelHealth,
+        stats: ResilienceStats,
+    ) -> ModelResponse:
+        started_at = time.monotonic()
+        primary = asyncio.create_task(self._call_primary(request, handler, health))
+        tasks = [primary]
+        try:
+            if not self._fallback.hedge:
+                return await primary
+
+            delay = health.hedge_delay(self._fallback)
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return primary.result()
+
+            stats.hedged += 1
+            logger.info(
+                "LLM HEDGE: %s didn't answer in %.1fs, sending the request to %s",
+                self._primary_pool_key, delay, self._secondary_pool_key,
+            )
+            expected_latency = health.expected_latency_beyond(delay)
+            secondary = asyncio.create_task(handler(request.override(model=self._secondary_model)))
+            tasks.append(secondary)
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        # The other request may still succeed
+                        if not pending:
+                            raise task.exception()
+                        continue
+                    if task is secondary:
+                        stats.hedge_wins += 1
+                        elapsed = time.monotonic() - started_at
+                        if expected_latency is not None:
+                            stats.latency_saved_seconds += max(0.0, expected_latency - elapsed)
+                    return task.result()
+            raise RuntimeError("Hedged model call ended without a response")
+        finally:
+            # The loser of a hedge, or every request when the run itself is cancelled, e.g. on a timeout
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelResponse:
+        if request.model is not self._primary_model:
+            return await handler(request)
+
+        stats = resilience_metrics.stats(self._agent_type)
+        health = model_health(self._primary_pool_key, self._fallback)
+        if not health.breaker.allow():
+            response = await handler(request.override(model=self._secondary_model))
+            if not is_planned_wave(response):
+                stats.calls += 1
+                stats.breaker_skips += 1
+            return response
+
+        try:
+            response = await self._hedged_call(request, handler, health, stats)
+        except Exception as e:
+            stats.calls += 1
+            if not self._fallback.failover or not is_transient_error(e):
+                raise
+            stats.failovers += 1
+            logger.warning(
+                "LLM FAILOVER: %s failed (%s), retrying on %s",
+                self._primary_pool_key, str(e), self._secondary_pool_key,
+            )
+            return await handler(request.override(model=self._secondary_model))
+        if not is_planned_wave(response):
+            stats.calls += 1
+        return response
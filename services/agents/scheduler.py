@@ -0,0 +1,264 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import (
+    dataclass,
+    field,
+)
+from enum import IntEnum
+import heapq
+import itertools
+import logging
+import time
+
+from config import (
+    settings,
+    LLMProvider,
+)
+from services.rate_limiter import TokenBucketRateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class RequestPriority(IntEnum):
+    """
+    Priority classes for LLM calls. Lower values are admitted first.
+    """
+    INTERACTIVE = 0
+    MEMORY = 1
+    WORKFLOW = 2
+
+
+@dataclass
+class _Waiter:
+    future: asyncio.Future
+    priority: RequestPriority
+    user_id: str | None
+    enqueued_at: float
+
+
+@dataclass
+class _PriorityStats:
+    admitted: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    recent_waits: deque = field(default_factory=lambda: deque(maxlen=500))
+
+    def record(self, wait_seconds: float) -> None:
+        self.admitted += 1
+        self.total_wait_seconds += wait_seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+        self.recent_waits.append(wait_seconds)
+
+    def to_dict(self) -> dict:
+        recent = sorted(self.recent_waits)
+        return {
+            "admitted": self.admitted,
+            "avg_wait_seconds": self.total_wait_seconds / self.admitted if self.admitted else 0.0,
+            "p95_wait_seconds": recent[int(0.95 * (len(recent) - 1))] if recent else 0.0,
+            "max_wait_seconds": self.max_wait_seconds,
+        }
+
+
+class _ModelPool:
+    """
+    Admission state for a single provider/model pair.
+
+    Waiters are ordered by priority class first and by their start-time fair
+    queueing tag second, so that within a class every user gets a share of the
+    pool proportional to its weight no matter how many calls it enqueues.
+    """
+    def __init__(self, capacity: int, interactive_reserved_slots: int):
+        self.capacity = capacity
+        # Background classes can never take the slots reserved for interactive traffic. They always
+        # keep one slot though, so a pool no larger than the reservation has no reserved slot at all.
+        self.background_capacity = max(1, capacity - interactive_reserved_slots)
+        self.active = 0
+        self.waiters: list[tuple[int, float, int, _Waiter]] = []
+        self.virtual_time: dict[RequestPriority, float] = {priority: 0.0 for priority in RequestPriority}
+        self.last_finish_tags: dict[tuple[RequestPriority, str | None], float] = {}
+        self.stats: dict[RequestPriority, _PriorityStats] = {priority: _PriorityStats() for priority in RequestPriority}
+        self.max_queue_depth = 0
+
+    def start_tag(self, priority: RequestPriority, user_id: str | None, weight: float) -> float:
+        start = max(self.virtual_time[priority], self.last_finish_tags.get((priority, user_id), 0.0))
+        self.last_finish_tags[(priority, user_id)] = start + 1.0 / weight
+        return start
+
+    def can_admit(self, priority: RequestPriority) -> bool:
+        if priority == RequestPriority.INTERACTIVE:
+            return self.active < self.capacity
+        return self.active < self.background_capacity
+
+    def queue_depths(self) -> dict[str, int]:
+        depths = {priority.name.lower(): 0 for priority in RequestPriority}
+        for _, _, _, waiter in self.waiters:
+            if not waiter.future.done():
+                depths[waiter.priority.name.lower()] += 1
+        return depths
+
+
+class LLMAdmissionScheduler:
+    """
+    Central admission control for LLM calls shared by every agent in the process.
+
+    Each provider/model pair gets a pool with a configurable concurrency limit.
+    Calls that can't be admitted immediately wait in a queue that is strictly
+    ordered by priority class (interactive > memory > workflow) and fairly
+    shared between users inside each class.
+
+    When a rate limiter is given, admitted calls are additionally paced by the
+    per provider/model requests-per-minute budgets in settings.LLM_REQUESTS_PER_MINUTE.
+    Concurrency is limited per process, while the request budgets hold for
+    every process that shares the rate limiter's store.
+    """
+    def __init__(
+        self,
+        default_concurrency_limit: int = settings.LLM_DEFAULT_CONCURRENCY_LIMIT,
+        concurrency_limits: dict[str, int] | None = None,
+        interactive_reserved_slots: int = settings.LLM_INTERACTIVE_RESERVED_SLOTS,
+        rate_limiter: TokenBucketRateLimiter | None = None,
+        requests_per_minute: dict[str, int] | None = None,
+    ):
+        self._default_concurrency_limit = default_concurrency_limit
+        self._concurrency_limits = concurrency_limits if concurrency_limits is not None else settings.LLM_CONCURRENCY_LIMITS
+        self._interactive_reserved_slots = interactive_reserved_slots
+        self._rate_limiter = rate_limiter
+        self._requests_per_minute = requests_per_minute if requests_per_minute is not None else settings.LLM_REQUESTS_PER_MINUTE
+        self._pools: dict[str, _ModelPool] = {}
+        self._sequence = itertools.count()
+
+    @staticmethod
+    def pool_key(provider: LLMProvider, model_name: str) -> str:
+        return f"{LLMProvider(provider).value}/{model_name}"
+
+    def _get_pool(self, key: str) -> _ModelPool:
+        pool = self._pools.get(key)
+        if pool is None:
+            capacity = self._concurrency_limits.get(key, self._default_concurrency_limit)
+            if self._interactive_reserved_slots > 0 and capacity <= self._interactive_reserved_slots:
+                logger.warning(
+                    "LLM pool %s has %d slot(s), no more than the %d reserved for interactive calls: "
+                    "background calls share them and nothing is reserved",
+                    key,
+                    capacity,
+                    self._interactive_reserved_slots,
+                )
+            pool = _ModelPool(capacity=capacity, interactive_reserved_slots=self._interactive_reserved_slots)
+            self._pools[key] = pool
+        return pool
+
+    @asynccontextmanager
+    async def admit(
+        self,
+        provider: LLMProvider,
+        model_name: str,
+        priority: RequestPriority,
+        user_id: str | None = None,
+        weight: float = 1.0,
+    ):
+        """
+        Wait for a slot in the provider/model pool and hold it for the duration of the block.
+
+        Args:
+            provider: The LLM provider the call goes to.
+            model_name: The model the call goes to.
+            priority: The priority class of the caller.
+            user_id: The user the call is made for. Used for per-user fair queueing.
+            weight: The relative share of the user inside its priority class.
+        """
+        key = self.pool_key(provider, model_name)
+        pool = self._get_pool(key)
+        enqueued_at = time.monotonic()
+
+        if not pool.waiters and pool.can_admit(priority):
+            pool.active += 1
+        else:
+            waiter = _Waiter(
+                future=asyncio.get_running_loop().create_future(),
+                priority=priority,
+                user_id=user_id,
+                enqueued_at=enqueued_at,
+            )
+            start_tag = pool.start_tag(priority, user_id, weight)
+            heapq.heappush(pool.waiters, (priority, start_tag, next(self._sequence), waiter))
+            pool.max_queue_depth = max(pool.max_queue_depth, len(pool.waiters))
+            # Queued background work must not hold back a call that fits in the reserved slots
+            self._dispatch(pool)
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                if waiter.future.done() and not waiter.future.cancelled():
+                    # The slot was handed over right before the cancellation, give it back
+                    self._release(pool)
+                raise
+
+        wait_seconds = time.monotonic() - enqueued_at
+        pool.stats[priority].record(wait_seconds)
+        if wait_seconds > settings.LLM_ADMISSION_WAIT_WARNING_SECONDS:
+            logger.warning(
+                "LLM call for %s (priority=%s, user=%s) waited %.2fs for admission",
+                key,
+                priority.name,
+                user_id,
+                wait_seconds,
+            )
+
+        try:
+            requests_per_minute = self._requests_per_minute.get(key)
+            if self._rate_limiter and requests_per_minute:
+                await self._rate_limiter.acquire(
+                    key=f"llm:{key}",
+                    tokens=1,
+                    capacity=requests_per_minute,
+                    refill_rate=requests_per_minute / 60,
+                )
+            yield
+        finally:
+            self._release(pool)
+
+    def _release(self, pool: _ModelPool) -> None:
+        pool.active -= 1
+        self._dispatch(pool)
+
+    def _dispatch(self, pool: _ModelPool) -> None:
+        while pool.waiters:
+            priority, start_tag, _, waiter = pool.waiters[0]
+            if waiter.future.done():
+                # Cancelled while waiting
+                heapq.heappop(pool.waiters)
+                continue
+
+            if not pool.can_admit(priority):
+                break
+
+            heapq.heappop(pool.waiters)
+            pool.virtual_time[priority] = max(pool.virtual_time[priority], start_tag)
+            pool.active += 1
+            waiter.future.set_result(None)
+
+        if not pool.waiters:
+            # Finish tags behind the virtual clock carry no information anymore
+            pool.last_finish_tags = {
+                tag_key: finish_tag
+                for tag_key, finish_tag in pool.last_finish_tags.items()
+                if finish_tag > pool.virtual_time[tag_key[0]]
+            }
+
+    def get_metrics(self) -> dict:
+        """
+        Returns the queue depth, active calls and wait time statistics of every pool.
+        """
+        return {
+            key: {
+                "capacity": pool.capacity,
+                "active": pool.active,
+                "queue_depth": pool.queue_depths(),
+                "max_queue_depth": pool.max_queue_depth,
+                "wait_times": {
+                    priority.name.lower(): stats.to_dict()
+                    for priority, stats in pool.stats.items()
+                },
+            }
+            for key, pool in self._pools.items()
+        }
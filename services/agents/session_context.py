@@ -0,0 +1,95 @@
+import datetime as dt
+import json
+
+from config import settings
+from models.agent_reminder import AgentReminder
+from models.agent_workflow import (
+    AgentWorkflow,
+    WorkflowResultSummary,
+    WorkflowStatus,
+)
+from models.user_context import UserConversationNotes
+
+
+UNAVAILABLE = "Unavailable right now."
+
+
+def truncate_text(text: str, max_chars: int, hint: str) -> str:
+    """Cuts text to max_chars, telling the agent how to get the rest."""
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars].rstrip()}... [truncated, {hint}]"
+
+
+def render_notes(notes: list[UserConversationNotes]) -> str:
+    if not notes:
+        return "None."
+    text = "\n".join(
+        f"- {entry.period or entry.date}: {json.dumps(entry.notes, ensure_ascii=False, separators=(',', ':'))}"
+        for entry in notes
+    )
+    return truncate_text(text, settings.PREFETCH_NOTES_MAX_CHARS, "call getUserConversationNotes for the full notes")
+
+
+def render_reminders(reminders: list[AgentReminder]) -> str:
+    if not reminders:
+        return "None."
+    # Reminders without a due date come last
+    reminders = sorted(reminders, key=lambda reminder: (reminder.due_date is None, reminder.due_date or ""))
+    lines = [
+        f"- [{reminder.reminder_id}] {reminder.reminder_description}"
+        + (f" (due {reminder.due_date})" if reminder.due_date else "")
+        for reminder in reminders[:settings.PREFETCH_REMINDERS_LIMIT]
+    ]
+    if len(reminders) > settings.PREFETCH_REMINDERS_LIMIT:
+        lines.append(f"- ... {len(reminders) - settings.PREFETCH_REMINDERS_LIMIT} more, call getAgentReminders to list them")
+    return "\n".join(lines)
+
+
+def render_workflows(workflows: list[AgentWorkflow]) -> str:
+    workflows = [workflow for workflow in workflows if workflow.status != WorkflowStatus.PAUSED]
+    if not workflows:
+        return "None."
+    lines = [
+        f"- [{workflow.workflow_id}] {workflow.name} (schedule `{workflow.schedule}`, next run {workflow.next_run_at or 'unknown'})"
+        for workflow in workflows[:settings.PREFETCH_WORKFLOWS_LIMIT]
+    ]
+    if len(workflows) > settings.PREFETCH_WORKFLOWS_LIMIT:
+        lines.append(f"- ... {len(workflows) - settings.PREFETCH_WORKFLOWS_LIMIT} more, call getAgentWorkflows to list them")
+    return "\n".join(lines)
+
+
+def render_workflow_results(results: list[WorkflowResultSummary]) -> str:
+    if not results:
+        return "None."
+    return "\n".join(
+        f"- [{result.result_id}] {result.workflow_name} ({result.ran_at}): "
+        + truncate_text(result.summary, settings.PREFETCH_WORKFLOW_RESULT_MAX_CHARS, "call getWorkflowResult for the full report")
+        + (f" Tickers: {', '.join(result.highlights.tickers)}." if result.highlights and result.highlights.tickers else "")
+        for result in results
+    )
+
+
+def render_session_context(
+    now: dt.datetime,
+    notes: list[UserConversationNotes] | BaseException,
+    reminders: list[AgentReminder] | BaseException,
+    workflows: list[AgentWorkflow] | BaseException,
+    workflow_results: list[WorkflowResultSummary] | BaseException,
+) -> str:
+    """
+    Renders the data prefetched at the start of a chat turn as the session context
+    section of the investment manager's prompt. Every section has its own size budget;
+    a section whose fetch failed is marked as unavailable.
+    """
+    sections = [
+        ("Current datetime", now.isoformat(timespec="seconds")),
+        ("Recent conversation notes (most recent first)", UNAVAILABLE if isinstance(notes, BaseException) else render_notes(notes)),
+        ("Pending reminders", UNAVAILABLE if isinstance(reminders, BaseException) else render_reminders(reminders)),
+        ("Active workflows", UNAVAILABLE if isinstance(workflows, BaseException) else render_workflows(workflows)),
+        (
+            "Latest workflow results (most recent first)",
+            UNAVAILABLE if isinstance(workflow_results, BaseException) else render_workflow_results(workflow_results),
+        ),
+    ]
+    return "\n\n".join(f"### {title}\n{text}" for title, text in sections)
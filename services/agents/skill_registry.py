@@ -0,0 +1,159 @@
+from dataclasses import dataclass
+import hashlib
+import math
+import re
+
+from services.agents.skills import (
+    SkillName,
+    skills,
+)
+
+
+# Token counts are estimates: the agents run on models of several providers, each with its own tokenizer
+CHARS_PER_TOKEN = 4
+
+_HEADING_PATTERN = re.compile(r"^(#{2,3})\s+(.+?)\s*$", re.MULTILINE)
+_SLUG_PATTERN = re.compile(r"[^a-z0-9]+")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def slugify(title: str) -> str:
+    return _SLUG_PATTERN.sub("-", title.lower()).strip("-")
+
+
+@dataclass
+class SkillSection:
+    skill_name: SkillName
+    section_id: str     # "parent-slug/child-slug" for ### sections, "" for the text before the first heading
+    heading: str        # "PARENT > Child" for ### sections
+    text: str           # Including the heading line
+    tokens: int
+
+    @property
+    def parent_id(self) -> str | None:
+        return self.section_id.rsplit("/", 1)[0] if "/" in self.section_id else None
+
+
+@dataclass
+class SkillEntry:
+    name: SkillName
+    text: str
+    sections: list[SkillSection]
+    tokens: int
+    etag: str           # Changes whenever the skill's text does
+
+
+def split_sections(skill_name: SkillName, text: str) -> list[SkillSection]:
+    """Splits a skill's markdown on its ## and ### headings (#### headings stay in their section)."""
+    sections = []
+    matches = list(_HEADING_PATTERN.finditer(text))
+    preamble = text[:matches[0].start()].strip() if matches else text.strip()
+    if preamble:
+        sections.append(SkillSection(skill_name, "", "", preamble, estimate_tokens(preamble)))
+
+    parent_id, parent_title = "", ""
+    seen_ids: set[str] = set()
+    for i, match in enumerate(matches):
+        level, title = match.groups()
+        if level == "##":
+            parent_id, parent_title = slugify(title), title
+            section_id, heading = parent_id, title
+        else:
+            section_id = f"{parent_id}/{slugify(title)}" if parent_id else slugify(title)
+            heading = f"{parent_title} > {title}" if parent_title else title
+        # Headings repeated under the same parent get a numeric suffix
+        base_id, suffix = section_id, 2
+        while section_id in seen_ids:
+            section_id, suffix = f"{base_id}-{suffix}", suffix + 1
+        seen_ids.add(section_id)
+
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        section_text = text[match.start():end].strip()
+        sections.append(SkillSection(skill_name, section_id, heading, section_text, estimate_tokens(section_text)))
+    return sections
+
+
+class SkillRegistry:
+    """
+    The analytical skills, parsed at import time into sections that can be fetched on
+    their own, with their estimated token counts.
+
+    A section is addressed by its id, the slug of its heading prefixed with the slug of
+    its ## parent for ### sections (e.g. "element-2-earnings-power-value/step-2b-determine-cost-of-capital").
+    Requesting a ## section returns its ### subsections with it.
+    """
+
+    def __init__(self, skill_texts: dict[SkillName, str]):
+        self._entries: dict[SkillName, SkillEntry] = {}
+        for name, text in skill_texts.items():
+            text = text.strip()
+            self._entries[name] = SkillEntry(
+                name=name,
+                text=text,
+                sections=split_sections(name, text),
+                tokens=estimate_tokens(text),
+                etag=hashlib.sha256(text.encode()).hexdigest()[:16],
+            )
+
+    @property
+    def names(self) -> list[SkillName]:
+        return list(self._entries)
+
+    def get(self, skill_name: str | SkillName) -> SkillEntry:
+        """Raises ValueError for an unknown skill."""
+        return self._entries[SkillName(skill_name)]
+
+    def table_of_contents(self, skill_name: str | SkillName) -> list[dict]:
+        return [
+            {"id": section.section_id, "heading": section.heading, "tokens": section.tokens}
+            for section in self.get(skill_name).sections
+            if section.section_id
+        ]
+
+    def select_sections(self, skill_name: str | SkillName, section_ids: list[str]) -> tuple[list[SkillSection], list[str]]:
+        """
+        The sections with the given ids, plus the subsections of the requested ## sections,
+        in document order. Ids are also matched against the headings, case-insensitively.
+
+        Returns:
+            The selected sections, and the ids that matched no section.
+        """
+        sections = self.get(skill_name).sections
+        by_key = {}
+        for section in sections:
+            if section.section_id:
+                by_key[section.section_id] = section.section_id
+                by_key[section.heading.lower()] = section.section_id
+        requested, unknown = set(), []
+        for section_id in section_ids:
+            key = section_id.strip().strip("/")
+            resolved = by_key.get(key) or by_key.get(key.lower())
+            if resolved is None:
+                unknown.append(section_id)
+            else:
+                requested.add(resolved)
+        selected = [section for section in sections if section.section_id in requested or section.parent_id in requested]
+        return selected, unknown
+
+    def render(self, skill_name: str | SkillName, section_ids: list[str] | None = None) -> str:
+        """
+        The whole skill, or only the requested sections with a note on what was left out.
+        Raises ValueError for an unknown skill.
+        """
+        entry = self.get(skill_name)
+        if not section_ids:
+            return entry.text
+
+        selected, unknown = self.select_sections(entry.name, section_ids)
+        tokens = sum(section.tokens for section in selected)
+        note = f"[Sections of the {entry.name.value} skill: {tokens} of its ~{entry.tokens} tokens."
+        if unknown:
+            note += f" Unknown sections: {', '.join(unknown)}."
+        note += " Call getSkillTableOfContents for the other sections.]"
+        return "\n\n".join([note, *(section.text for section in selected)])
+
+
+skill_registry = SkillRegistry(skills)
@@ -0,0 +1,186 @@
+from dataclasses import (
+    dataclass,
+    field,
+)
+import logging
+
+import numpy as np
+
+from config import settings
+from services.agents.skill_registry import (
+    SkillRegistry,
+    skill_registry,
+)
+from services.agents.skills import SkillName
+from services.text_search import (
+    BM25Index,
+    tokenize,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Sections injected first with every routed skill, whatever their score, as far as the
+# token budget allows: the data gathering steps and the expected output
+ALWAYS_INCLUDED_SECTIONS = ("Step ", "ANALYST VERDICT")
+# Verbs every skill name starts with, which say nothing about the skill's subject
+_GENERIC_NAME_TOKENS = frozenset({"analyze", "apply", "assess", "calculate", "compare", "evaluate"})
+
+
+@dataclass
+class SkillRoute:
+    skill_name: SkillName
+    score: float
+    runner_up_score: float
+    section_ids: list[str]  # Ids of the injected sections, all of them when the whole skill is injected
+    text: str
+    tokens: int
+
+
+@dataclass
+class SkillRouterMetrics:
+    routed: int = 0
+    injected: int = 0
+    # Feedback from the getSkill calls the agent still made after a routing decision
+    refetched: int = 0      # The injected skill itself: the injected sections weren't enough
+    other_skill: int = 0    # Another skill: the injected skill was the wrong one
+    missed: int = 0         # Nothing was injected but the agent needed a skill
+    per_skill: dict[str, int] = field(default_factory=dict)
+
+    def record_route(self, route: SkillRoute | None) -> None:
+        self.routed += 1
+        if route:
+            self.injected += 1
+            self.per_skill[route.skill_name.value] = self.per_skill.get(route.skill_name.value, 0) + 1
+
+    def record_skill_fetch(self, route: SkillRoute | None, skill_name: str) -> None:
+        if route is None:
+            self.missed += 1
+        elif route.skill_name.value == skill_name:
+            self.refetched += 1
+        else:
+            self.other_skill += 1
+
+    def to_dict(self) -> dict:
+        return {
+            "routed": self.routed,
+            "injected": self.injected,
+            "refetched": self.refetched,
+            "other_skill": self.other_skill,
+            "missed": self.missed,
+            # Share of injections the agent didn't replace with another skill
+            "precision": round(1 - self.other_skill / self.injected, 3) if self.injected else None,
+            "per_skill": self.per_skill,
+        }
+
+
+class SkillRouter:
+    """
+    Matches a user message against the skills with a BM25 index over their sections,
+    so that the best matching skill can be injected into the prompt up front instead
+    of being looked up with getSkillNames and getSkill.
+
+    The score of a skill is the score of its best section, plus name_weight times the
+    share of its name's subject words ("balance sheet", "competitive moat") found in the
+    message. A skill is routed when it scores at least min_score and beats any other
+    skill by a factor of min_margin. It is injected whole when it fits in
+    max_tokens, otherwise only the sections that fit in max_tokens are, in their original
+    order: ALWAYS_INCLUDED_SECTIONS first, then the best matching ones. Nothing is
+    injected when not even one section fits.
+    """
+
+    def __init__(
+        self,
+        registry: SkillRegistry = skill_registry,
+        min_score: float = settings.SKILL_ROUTER_MIN_SCORE,
+        min_margin: float = settings.SKILL_ROUTER_MIN_MARGIN,
+        max_tokens: int = settings.SKILL_ROUTER_MAX_TOKENS,
+        name_weight: float = 5.0,
+    ):
+        self._registry = registry
+        self._min_score = min_score
+        self._min_margin = min_margin
+        self._max_tokens = max_tokens
+        self._name_weight = name_weight
+        self._name_tokens = {
+            name: {token for token in tokenize(name.value.replace("_", " ")) if token not in _GENERIC_NAME_TOKENS}
+            for name in registry.names
+        }
+        self._sections = [section for name in registry.names for section in registry.get(name).sections]
+        # The skill name words are part of every section: "balance sheet" should match all of analyze_balance_sheet
+        self._index = BM25Index([
+            tokenize(f"{section.skill_name.value.replace('_', ' ')} {section.text}")
+            for section in self._sections
+        ])
+        self._section_skills = np.array([registry.names.index(section.skill_name) for section in self._sections])
+
+    def scores(self, message: str) -> dict[SkillName, float]:
+        """The score of every skill: the score of its best matching section plus its name match."""
+        tokens = tokenize(message)
+        section_scores = self._index.score(tokens)
+        skill_scores = np.zeros(len(self._registry.names), dtype=np.float32)
+        np.maximum.at(skill_scores, self._section_skills, section_scores)
+        return {
+            name: float(score) + self._name_weight * len(self._name_tokens[name].intersection(tokens)) / max(len(self._name_tokens[name]), 1)
+            for name, score in zip(self._registry.names, skill_scores)
+        }
+
+    def route(self, message: str, log: bool = False) -> SkillRoute | None:
+        """The skill to inject for the message, None when no skill is a clear enough match."""
+        scores = self.scores(message)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        (skill_name, score), runner_up_score = ranked[0], (ranked[1][1] if len(ranked) > 1 else 0.0)
+        route = None
+        if score >= self._min_score and score >= runner_up_score * self._min_margin:
+            route = self._build_route(skill_name, message, score, runner_up_score)
+
+        if log:
+            logger.info(
+                "SKILL ROUTER: %s (top %s)",
+                f"injected {route.skill_name.value} (~{route.tokens} tokens)" if route else "no skill injected",
+                ", ".join(f"{name.value}={value:.2f}" for name, value in ranked[:3]),
+            )
+        return route
+
+    def _build_route(self, skill_name: SkillName, message: str, score: float, runner_up_score: float) -> SkillRoute | None:
+        entry = self._registry.get(skill_name)
+        positions = [i for i, section in enumerate(self._sections) if section.skill_name == skill_name]
+        if entry.tokens <= self._max_tokens:
+            return SkillRoute(
+                skill_name=skill_name,
+                score=score,
+                runner_up_score=runner_up_score,
+                section_ids=[self._sections[i].section_id for i in positions],
+                text=entry.text,
+                tokens=entry.tokens,
+            )
+
+        section_scores = self._index.score(tokenize(message))
+        always_included = {
+            i for i in positions
+            if self._sections[i].heading.split(" > ")[-1].startswith(ALWAYS_INCLUDED_SECTIONS)
+        }
+        selected, tokens = set(), 0
+        for i in sorted(positions, key=lambda i: (i in always_included, section_scores[i]), reverse=True):
+            if section_scores[i] <= 0 and i not in always_included:
+                continue
+            if tokens + self._sections[i].tokens > self._max_tokens:
+                continue
+            selected.add(i)
+            tokens += self._sections[i].tokens
+        if not selected:
+            return None
+
+        selected = sorted(selected)
+        return SkillRoute(
+            skill_name=skill_name,
+            score=score,
+            runner_up_score=runner_up_score,
+            section_ids=[self._sections[i].section_id for i in selected],
+            text="\n\n".join(self._sections[i].text for i in selected),
+            tokens=tokens,
+        )
+
+
+skill_router = SkillRouter()
+skill_router_metrics = SkillRouterMetrics()
@@ -11,6 +11,13 @@ Map industry into one of the following behavior profiles:
 * inventory_driven → retail
 * default → other
 
+### Step 0b: Get the Ratios
+
+Call `getFinancialRatios` with `ratio_sets=["balance_sheet"]` (add `periods=8` for
+longer trends). It returns the liquidity, leverage and return ratios below for the
+most recent periods, computed from the normalized statements -- interpret these
+numbers rather than recomputing them from raw `getStockFinancials` payloads.
+
 ---
 
 ## SECTOR-SPECIFIC RULES
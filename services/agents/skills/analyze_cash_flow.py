@@ -9,6 +9,14 @@ analyze_cash_flow_skill = """
 * inventory_driven → retail
 * default → other
 
+### Step 0b: Get the Ratios
+
+Call `getFinancialRatios` with `ratio_sets=["cash_flow"]`. It returns OCF, capex, FCF,
+cash margins, capex intensity, FCF conversion and shareholder returns for the most
+recent periods. Interpret these numbers rather than recomputing them from raw
+`getStockFinancials` payloads; fetch the statements only for what the ratios don't
+cover (e.g. net fixed assets for the capital intensity method).
+
 ---
 
 ## SECTOR-SPECIFIC RULES
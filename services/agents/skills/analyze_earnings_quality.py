@@ -13,6 +13,11 @@ Collect for the most recent 2–4 reporting periods:
 
 Goal: Determine whether reported earnings reflect true economic performance or are inflated/distorted.
 
+Call `getFinancialRatios` with `ratio_sets=["earnings_quality", "income_statement"]`
+first. It returns the accruals ratio, OCF and FCF to net income, DSO, days inventory,
+receivables vs revenue growth and the margins for the most recent periods, so the
+cash conversion and revenue quality checks below start from ready-made numbers.
+
 ---
 
 ## EARNINGS QUALITY DIMENSIONS
@@ -9,6 +9,14 @@ analyze_income_statement_skill = """
 * inventory_driven → retail
 * default → other
 
+### Step 0b: Get the Ratios
+
+Call `getFinancialRatios` with `ratio_sets=["income_statement"]`. It returns revenue,
+growth, margins, interest coverage and the effective tax rate on a trailing twelve
+months basis for the most recent periods (`basis="quarterly"` for quarter-by-quarter
+trends). Interpret these numbers rather than recomputing them from raw
+`getStockFinancials` payloads.
+
 ---
 
 ## SECTOR-SPECIFIC RULES
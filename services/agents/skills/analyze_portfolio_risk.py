@@ -67,6 +67,19 @@ Compute:
 * Total portfolio value
 * Weight of each position (position value / total value x 100)
 
+Then call the `analyzePortfolioRisk` tool once with all the holdings (ticker plus
+market value or quantity, and sector when known). It fetches the price history of
+every holding and returns, in a single call: portfolio volatility, beta, historical
+and parametric VaR / CVaR, max drawdown, each position's share of portfolio risk,
+the correlation matrix and concentration metrics (Herfindahl index, effective number
+of positions, sector weights). Use these numbers as the quantitative base of the
+review -- but remember that volatility is a symptom, not the risk itself.
+
+For the business-level view of the holdings (valuation, balance sheet, recent news),
+call `delegateResearch` once with one task per stock holding instead of researching
+the companies one after the other. The holdings are researched in parallel and come
+back as short summaries with their key metrics merged into one table.
+
 ---
 
 ## RISK DIMENSIONS
@@ -235,6 +248,11 @@ Stress-test correlation: in past crises, has this style of holding moved
 toward correlation 1 with other holdings in the portfolio? If yes, the
 nominal diversification overstates real diversification.
 
+The correlation matrix and weighted average correlation from `analyzePortfolioRisk`
+show the historical co-movement; a diversification ratio close to 1 means the
+holdings mostly move together. Historical correlations understate crisis
+correlations, so treat them as a floor.
+
 Failure of imagination is the most common analytical error in portfolio
 construction. Allow explicitly for outcomes outside the recent historical
 range, including:
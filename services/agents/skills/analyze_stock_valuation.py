@@ -268,6 +268,12 @@ possible:
 * Sector ETF outflows triggering proportional sales
 * Tax-loss selling at year-end
 
+To see whether technical pressure is showing up in the price, call
+`computeTechnicalIndicators` for the stock (and its sector ETF): a close far
+below its 200-day average, an oversold RSI or a fresh death cross next to
+intact fundamentals can flag forced selling; the opposite readings can flag
+flow-driven buying.
+
 Bargains created by technical pressure are typically transient. The reverse
 applies to forced buying: assets bid up by mandate or flow are usually fully
 priced or worse. Be cautious about buying into a market where the marginal
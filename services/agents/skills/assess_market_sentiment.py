@@ -163,6 +163,12 @@ narrative alone:
 * **Capital markets behavior**: M&A multiples, buyout leverage ratios, private
   market valuations
 * **Sentiment indicators**: VIX, put/call ratio, fear & greed indices
+* **Price trends**: call `computeTechnicalIndicators` once with the broad index
+  and sector ETFs (e.g. SPY, QQQ, IWM, XLF) to see how far prices stand above or
+  below their 50 / 200-day averages, RSI extremes, distance from 52-week highs
+  and recent moving average crossovers. Broad overbought readings and prices far
+  above long-term averages fit a pendulum swinging toward greed; washed-out RSI
+  and deep drawdowns from highs fit fear
 * **Anecdotal**: cocktail-party investing, "everyone is a genius," "everyone is
   a doomer"
 
@@ -173,6 +173,13 @@ ranges too wide to be useful. The qualitative risk categorization above is more
 
 Note: "Excess" cash = total cash minus ~0,25-0,50% of revenue (operational cash needs)
 
+**Computation:** use the `calculateDcfValuation` tool instead of step by step arithmetic.
+Pass the earnings power as `base_cash_flow`, `growth_rates: []`, the cost of capital as
+`discount_rate` and debt minus excess cash as `net_debt`; it returns the enterprise and
+equity EPV in one call. Add a `discount_rate_grid` (e.g. cost of capital ±1-2%) to see how
+sensitive EPV is to the risk category, and `shares_outstanding` / `current_price` to get
+per-share values and margin of safety bands at the same time.
+
 ---
 
 ## ELEMENT 3: GROWTH VALUE (Least Reliable -- Franchise Businesses Only)
@@ -248,6 +255,8 @@ Margin of Safety = (Intrinsic Value - Market Price) / Intrinsic Value
 
 * Target: >33% (Graham's minimum); ideally ~50%
 * Intrinsic value = triangulated AV/EPV estimate
+* `calculateDcfValuation` returns the current margin of safety, the buy-below prices for
+  the 20/33/50% margins and the share of the sensitivity grid valued above the market price
 
 **For franchise businesses (Case C):**
 
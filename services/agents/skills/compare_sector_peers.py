@@ -14,6 +14,21 @@ Aim for 3–6 meaningful peers. More is not better — quality of comparability
 
 Note limitations: Flag when peer selection is difficult (e.g., unique business models, niche markets).
 
+### Step 0b: Build the Peer Matrix
+
+Call the `comparePeers` tool once with the target and its peers (`target` set to the
+target company). It fetches the financial statements and overview of every company and
+returns, in a single call, the peer ratio matrix (valuation, profitability, growth and
+leverage metrics on a trailing twelve months basis), each company's percentile rank and
+z-score per metric, the peer medians and the target's position per category. Ranks and
+z-scores are oriented so that higher is always better (a lower P/E ranks higher).
+
+Use these numbers as the quantitative base of the four categories below, then fetch
+only what the matrix doesn't cover (3-year CAGRs, ROIC, segment data, qualitative
+context). Companies listed under `missing` could not be compared -- say so. When
+qualitative context is needed for several peers (moat, management, recent news), call
+`delegateResearch` once with one task per peer rather than researching them in turn.
+
 ---
 
 ## COMPARISON FRAMEWORK
@@ -36,6 +51,7 @@ Interpretation:
 
 Assign relative ranking:
 * "Above peers", "In-line with peers", "Below peers"
+* The `target_summary` of `comparePeers` gives a starting point for each category (average percentile rank ≥ 0.67 above, ≤ 0.33 below); adjust it with the context the numbers miss
 
 ---
 
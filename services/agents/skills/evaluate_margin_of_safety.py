@@ -50,6 +50,11 @@ For non-franchise businesses (Case A and B in the G&D framework):
 * Above 50%: generous. Required for cyclical, leveraged, or controversial
   positions.
 
+Compute it with the `calculateDcfValuation` tool rather than by hand: with
+`shares_outstanding` and `current_price` it returns the margin of safety of every
+growth scenario, the buy-below prices for the required margins and the range of
+values across the discount rate / terminal growth sensitivity grid in a single call.
+
 For franchise businesses (Case C):
 
 `Margin of Safety = Benchmark Return - Cost of Capital - Fade Rate`
@@ -0,0 +1,244 @@
+from abc import ABC, abstractmethod
+import asyncio
+from collections import OrderedDict
+from collections.abc import (
+    Awaitable,
+    Callable,
+)
+from dataclasses import (
+    dataclass,
+    field,
+)
+import datetime as dt
+import hashlib
+import json
+import logging
+import time
+from typing import (
+    Any,
+    TypeVar,
+)
+
+from pydantic import BaseModel
+from pymongo import AsyncMongoClient
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def tool_cache_key(tool_name: str, args: dict[str, Any]) -> str:
+    """
+    Builds a cache key from the tool name and its canonicalized arguments, so that
+    argument order and omitted optional arguments don't produce different keys.
+    """
+    canonical_args = json.dumps(
+        {k: v for k, v in args.items() if v is not None},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return f"{tool_name}:{hashlib.sha256(canonical_args.encode()).hexdigest()}"
+
+
+class CachedToolResult(BaseModel):
+    tool_name: str
+    content: str | list
+    size_bytes: int
+    latency_seconds: float  # How long the original call took
+
+
+@dataclass
+class _ToolCacheStats:
+    hits: int = 0
+    misses: int = 0
+    deduplicated: int = 0
+    bytes_saved: int = 0
+    latency_saved_seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        lookups = self.hits + self.misses + self.deduplicated
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "deduplicated": self.deduplicated,
+            "hit_rate": (self.hits + self.deduplicated) / lookups if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "latency_saved_seconds": round(self.latency_saved_seconds, 3),
+        }
+
+
+@dataclass
+class ToolResultCacheMetrics:
+    total: _ToolCacheStats = field(default_factory=_ToolCacheStats)
+    per_tool: dict[str, _ToolCacheStats] = field(default_factory=dict)
+
+    def _stats(self, tool_name: str) -> list[_ToolCacheStats]:
+        return [self.total, self.per_tool.setdefault(tool_name, _ToolCacheStats())]
+
+    def record_miss(self, tool_name: str) -> None:
+        for stats in self._stats(tool_name):
+            stats.misses += 1
+
+    def record_hit(self, result: CachedToolResult, deduplicated: bool = False) -> None:
+        for stats in self._stats(result.tool_name):
+            if deduplicated:
+                stats.deduplicated += 1
+            else:
+                stats.hits += 1
+            stats.bytes_saved += result.size_bytes
+            stats.latency_saved_seconds += result.latency_seconds
+
+    def to_dict(self) -> dict:
+        return {
+            **self.total.to_dict(),
+            "per_tool": {tool_name: stats.to_dict() for tool_name, stats in self.per_tool.items()},
+        }
+
+
+class ToolResultCache(ABC):
+    # Calls in flight in this process, by cache key, shared by every cache user so that
+    # identical calls made by the agents and by the analytics tools are deduplicated
+    _in_flight: dict[str, asyncio.Future] = {}
+
+    def __init__(self):
+        self.metrics = ToolResultCacheMetrics()
+
+    async def get_or_compute(
+        self,
+        tool_name: str,
+        key: str,
+        ttl_seconds: int,
+        compute: Callable[[], Awaitable[T]],
+        to_cached_result: Callable[[T, float], CachedToolResult | None],
+    ) -> T | CachedToolResult:
+        """
+        Returns the cached result of a tool call, or the result of an identical call already
+        in flight, or makes the call with compute and caches it for ttl_seconds.
+
+        Args:
+            to_cached_result: Builds the result to cache from the result of compute and its
+                latency in seconds, None when it must not be cached (e.g. an error).
+
+        Returns:
+            A CachedToolResult when the result was shared, otherwise the result of compute.
+        """
+        cached_result = await self.get(key)
+        if cached_result:
+            self.metrics.record_hit(cached_result)
+            return cached_result
+
+        in_flight = ToolResultCache._in_flight.get(key)
+        if in_flight:
+            shared_result = await asyncio.shield(in_flight)
+            if shared_result:
+                self.metrics.record_hit(shared_result, deduplicated=True)
+                return shared_result
+            # The first call failed, make our own attempt
+            return await compute()
+
+        self.metrics.record_miss(tool_name)
+        future = asyncio.get_running_loop().create_future()
+        ToolResultCache._in_flight[key] = future
+        cached_result = None
+        try:
+            start = time.monotonic()
+            result = await compute()
+            cached_result = to_cached_result(result, time.monotonic() - start)
+            if cached_result:
+                try:
+                    await self.set(key, cached_result, ttl_seconds)
+                except Exception as e:
+                    logger.warning("Failed to cache result of tool [%s]: %s", tool_name, str(e))
+            return result
+        finally:
+            future.set_result(cached_result)
+            ToolResultCache._in_flight.pop(key, None)
+
+    @abstractmethod
+    async def get(self, key: str) -> CachedToolResult | None:
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, result: CachedToolResult, ttl_seconds: int) -> None:
+        pass
+
+
+class InMemoryToolResultCache(ToolResultCache):
+    """Tool result cache local to the current process, evicting the least recently used entries."""
+
+    def __init__(self, max_entries: int = settings.TOOL_RESULT_CACHE_MAX_ENTRIES):
+        super().__init__()
+        self._max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, CachedToolResult]] = OrderedDict()
+
+    async def get(self, key: str) -> CachedToolResult | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, result = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return result
+
+    async def set(self, key: str, result: CachedToolResult, ttl_seconds: int) -> None:
+        self._entries[key] = (time.monotonic() + ttl_seconds, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+
+class ToolResultCacheMongoDoc(CachedToolResult):
+    key: str
+    expires_at: dt.datetime
+
+
+class MongoDBToolResultCache(ToolResultCache):
+    """Tool result cache shared by every worker, stored in a TTL collection."""
+    _indexes_created: bool = False
+
+    def __init__(self, mongo_client: AsyncMongoClient):
+        super().__init__()
+        self.db = mongo_client[settings.MONGO_DB_NAME]
+
+    async def _ensure_indexes(self) -> None:
+        if MongoDBToolResultCache._indexes_created:
+            return
+        collection = self.db[settings.TOOL_RESULT_CACHE_COLLECTION_NAME]
+        await collection.create_index("key", unique=True)
+        await collection.create_index("expires_at", expireAfterSeconds=0)
+        MongoDBToolResultCache._indexes_created = True
+
+    async def get(self, key: str) -> CachedToolResult | None:
+        collection = self.db[settings.TOOL_RESULT_CACHE_COLLECTION_NAME]
+        # The TTL monitor only runs periodically, so expired documents may still be around
+        doc = await collection.find_one({
+            "key": key,
+            "expires_at": {"$gt": dt.datetime.now(dt.timezone.utc)},
+        })
+        if not doc:
+            return None
+
+        mongo_doc = ToolResultCacheMongoDoc.model_validate(doc)
+        return CachedToolResult(
+            tool_name=mongo_doc.tool_name,
+            content=mongo_doc.content,
+            size_bytes=mongo_doc.size_bytes,
+            latency_seconds=mongo_doc.latency_seconds,
+        )
+
+    async def set(self, key: str, result: CachedToolResult, ttl_seconds: int) -> None:
+        await self._ensure_indexes()
+        collection = self.db[settings.TOOL_RESULT_CACHE_COLLECTION_NAME]
+        doc = ToolResultCacheMongoDoc(
+            key=key,
+            expires_at=dt.datetime.now(dt.timezone.utc) + dt.timedelta(seconds=ttl_seconds),
+            **result.model_dump(),
+        )
+        await collection.replace_one({"key": key}, doc.model_dump(), upsert=True)
@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+import datetime as dt
+import json
+from typing import Any
+
+from config import settings
+from models.session import ToolMemoEntry
+from services.agents.tool_cache import tool_cache_key
+
+
+def _staleness_seconds(tool_name: str) -> int | None:
+    if tool_name in settings.SESSION_TOOL_MEMO_TTLS:
+        return settings.SESSION_TOOL_MEMO_TTLS[tool_name]
+    return settings.TOOL_RESULT_CACHE_TTLS.get(tool_name)
+
+
+def _content_size(content: str | list) -> int:
+    if isinstance(content, str):
+        return len(content)
+    return len(json.dumps(content, default=str))
+
+
+def _digest(content: str | list) -> str:
+    text = content if isinstance(content, str) else json.dumps(content, default=str)
+    return text[:settings.SESSION_TOOL_MEMO_DIGEST_CHARS]
+
+
+class SessionToolMemo:
+    """
+    Tool calls and their results recorded during a chat session.
+
+    Follow-up turns usually ask about the same stocks again, so read-only market-data
+    calls already made earlier in the session are answered from the memo instead of
+    the MCP server as long as they are not stale. Results that are too big to keep
+    whole are stored as a digest; a digest is served once per turn and a repeated
+    identical call in the same turn goes to the MCP server for the full payload.
+    """
+
+    def __init__(self, entries: list[ToolMemoEntry] | None = None):
+        self._entries: dict[str, ToolMemoEntry] = {entry.key: entry for entry in entries or []}
+        self._digests_served: set[str] = set()
+        self.dirty = False
+
+    def lookup(self, tool_name: str, args: dict[str, Any]) -> ToolMemoEntry | None:
+        staleness_seconds = _staleness_seconds(tool_name)
+        if not staleness_seconds or "user_id" in args:
+            return None
+
+        key = tool_cache_key(tool_name, args)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        recorded_at = dt.datetime.fromisoformat(entry.recorded_at)
+        if dt.datetime.now(dt.timezone.utc) - recorded_at > dt.timedelta(seconds=staleness_seconds):
+            return None
+
+        if entry.is_digest:
+            if key in self._digests_served:
+                return None
+            self._digests_served.add(key)
+
+        return entry
+
+    def record(self, tool_name: str, args: dict[str, Any], content: str | list) -> None:
+        if not _staleness_seconds(tool_name) or "user_id" in args:
+            return
+
+        is_digest = _content_size(content) > settings.SESSION_TOOL_MEMO_MAX_ENTRY_CHARS
+        key = tool_cache_key(tool_name, args)
+        self._entries[key] = ToolMemoEntry(
+            key=key,
+            tool_name=tool_name,
+            args=args,
+            content=_digest(content) if is_digest else content,
+            is_digest=is_digest,
+            recorded_at=dt.datetime.now(dt.timezone.utc).isoformat(),
+        )
+        self.dirty = True
+
+    def to_entries(self) -> list[ToolMemoEntry]:
+        """
+        Returns the entries to persist: stale entries are dropped and only the most
+        recent settings.SESSION_TOOL_MEMO_MAX_ENTRIES are kept.
+        """
+        now = dt.datetime.now(dt.timezone.utc)
+        fresh_entries = [
+            entry
+            for entry in self._entries.values()
+            if now - dt.datetime.fromisoformat(entry.recorded_at) <= dt.timedelta(seconds=_staleness_seconds(entry.tool_name) or 0)
+        ]
+        fresh_entries.sort(key=lambda entry: entry.recorded_at, reverse=True)
+        return fresh_entries[:settings.SESSION_TOOL_MEMO_MAX_ENTRIES]
+
+
+@dataclass
+class SessionToolMemoRuntimeContext:
+    session_tool_memo: SessionToolMemo | None
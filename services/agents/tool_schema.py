@@ -0,0 +1,164 @@
+from dataclasses import (
+    dataclass,
+    field,
+)
+import hashlib
+import json
+import logging
+import re
+from typing import Any
+
+from langchain.tools import BaseTool
+
+from config import settings
+from services.agents.skill_registry import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+# Schema keywords that only document the schema, and are not needed to call the tool
+STRIPPED_SCHEMA_KEYWORDS = frozenset({"title", "default", "examples", "example", "$schema", "$comment"})
+# Keywords holding a mapping of names to schemas, e.g. the properties of an object
+_SCHEMA_MAP_KEYWORDS = frozenset({"properties", "patternProperties", "$defs", "definitions", "dependentSchemas"})
+# Keywords holding a schema, or a list of schemas
+_SCHEMA_KEYWORDS = frozenset({"items", "additionalProperties", "not", "contains", "if", "then", "else"})
+_SCHEMA_LIST_KEYWORDS = frozenset({"anyOf", "oneOf", "allOf", "prefixItems"})
+
+_SENTENCE_END_PATTERN = re.compile(r"(?<=[.!?])\s")
+
+
+def trim_description(text: str, max_chars: int) -> str:
+    """
+    Cuts a description to max_chars, at the end of its last whole sentence when there
+    is one, otherwise at a word boundary.
+    """
+    text = " ".join(text.split())
+    if len(text) <= max_chars:
+        return text
+    sentence_ends = [match.start() for match in _SENTENCE_END_PATTERN.finditer(text[:max_chars + 1])]
+    if sentence_ends:
+        return text[:sentence_ends[-1]]
+    cut = text.rfind(" ", 0, max_chars)
+    return text[:cut if cut > 0 else max_chars].rstrip(" ,;:") + "..."
+
+
+def minify_schema(schema: Any, description_max_chars: int) -> Any:
+    """
+    A copy of a JSON schema without its STRIPPED_SCHEMA_KEYWORDS and with its
+    descriptions trimmed. Property names are never stripped, even "title" or "default".
+    """
+    if not isinstance(schema, dict):
+        return schema
+    minified = {}
+    for key, value in schema.items():
+        if key in STRIPPED_SCHEMA_KEYWORDS:
+            continue
+        if key in _SCHEMA_MAP_KEYWORDS and isinstance(value, dict):
+            minified[key] = {name: minify_schema(subschema, description_max_chars) for name, subschema in value.items()}
+        elif key in _SCHEMA_KEYWORDS:
+            minified[key] = minify_schema(value, description_max_chars)
+        elif key in _SCHEMA_LIST_KEYWORDS and isinstance(value, list):
+            minified[key] = [minify_schema(subschema, description_max_chars) for subschema in value]
+        elif key == "description" and isinstance(value, str):
+            minified[key] = trim_description(value, description_max_chars)
+        else:
+            minified[key] = value
+    return minified
+
+
+def tool_schema(tool: BaseTool) -> dict:
+    """The arguments schema of a tool, without the tool description some schemas repeat."""
+    schema = tool.args_schema if isinstance(tool.args_schema, dict) else tool.tool_call_schema
+    schema = schema.model_json_schema() if isinstance(schema, type) else schema
+    return {key: value for key, value in schema.items() if key != "description"}
+
+
+def tool_schema_tokens(tool: BaseTool | dict) -> int:
+    """Estimated tokens of the name, description and arguments schema of a tool, as sent to the model."""
+    if isinstance(tool, dict):
+        return estimate_tokens(json.dumps(tool, separators=(",", ":")))
+    return estimate_tokens(tool.name + tool.description + json.dumps(tool_schema(tool), separators=(",", ":")))
+
+
+@dataclass
+class ToolSchemaMetrics:
+    # Per tool, the estimated schema tokens as served by its MCP server and as sent to the model
+    per_tool: dict[str, dict[str, int]] = field(default_factory=dict)
+
+    def record(self, tool_name: str, original_tokens: int, minified_tokens: int) -> None:
+        self.per_tool[tool_name] = {"original_tokens": original_tokens, "minified_tokens": minified_tokens}
+
+    def to_dict(self) -> dict:
+        original = sum(tokens["original_tokens"] for tokens in self.per_tool.values())
+        minified = sum(tokens["minified_tokens"] for tokens in self.per_tool.values())
+        return {
+            "tools": len(self.per_tool),
+            "original_tokens": original,
+            "minified_tokens": minified,
+            "per_tool": dict(sorted(self.per_tool.items(), key=lambda item: item[1]["minified_tokens"], reverse=True)),
+        }
+
+
+tool_schema_metrics = ToolSchemaMetrics()
+
+
+class ToolSchemaMinifier:
+    """
+    Shrinks the tools loaded from the MCP servers before they are given to an agent: the
+    tool description is trimmed to description_max_chars, the parameter descriptions to
+    parameter_description_max_chars, and the schema metadata the model doesn't need to
+    call the tool (titles, defaults, examples) is stripped.
+
+    overrides replaces, per tool name, the description ("description") and parameter
+    descriptions ("parameters", by parameter name) served by the MCP server; they are
+    used as is, without trimming.
+
+    Agents load their MCP tools on every request, so minified tools are memoized by the
+    tool name and a hash of its definition: a tool is only minified again when its server
+    changes it.
+    """
+
+    def __init__(
+        self,
+        description_max_chars: int = settings.TOOL_DESCRIPTION_MAX_CHARS,
+        parameter_description_max_chars: int = settings.TOOL_PARAMETER_DESCRIPTION_MAX_CHARS,
+        overrides: dict[str, dict[str, Any]] | None = None,
+    ):
+        self._description_max_chars = description_max_chars
+        self._parameter_description_max_chars = parameter_description_max_chars
+        self._overrides = overrides if overrides is not None else settings.TOOL_SCHEMA_OVERRIDES
+        self._minified: dict[tuple[str, str], tuple[str, dict]] = {}
+
+    def _minify_definition(self, name: str, description: str, schema: dict) -> tuple[str, dict]:
+        override = self._overrides.get(name, {})
+        description = override.get("description") or trim_description(description, self._description_max_chars)
+        schema = minify_schema(schema, self._parameter_description_max_chars)
+        for parameter, parameter_description in override.get("parameters", {}).items():
+            if parameter in schema.get("properties", {}):
+                schema["properties"][parameter] = {**schema["properties"][parameter], "description": parameter_description}
+            else:
+                logger.warning("Tool schema override for unknown parameter %s of tool %s", parameter, name)
+        return description, schema
+
+    def minify(self, tool: BaseTool) -> BaseTool:
+        schema = tool_schema(tool)
+        definition = json.dumps([tool.description, schema], sort_keys=True)
+        key = (tool.name, hashlib.sha256(definition.encode()).hexdigest())
+        if key not in self._minified:
+            self._minified[key] = self._minify_definition(tool.name, tool.description, schema)
+            description, minified_schema = self._minified[key]
+            tool_schema_metrics.record(
+                tool.name,
+                original_tokens=tool_schema_tokens(tool),
+                minified_tokens=estimate_tokens(tool.name + description + json.dumps(minified_schema, separators=(",", ":"))),
+            )
+        description, minified_schema = self._minified[key]
+        return tool.model_copy(update={"description": description, "args_schema": minified_schema})
+
+    def minify_all(self, tools: list[BaseTool]) -> list[BaseTool]:
+        if not settings.TOOL_SCHEMA_MINIFY_ENABLED:
+            return tools
+        return [self.minify(tool) for tool in tools]
+
+
+tool_schema_minifier = ToolSchemaMinifier()
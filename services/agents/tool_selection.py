@@ -0,0 +1,195 @@
+from collections.abc import (
+    Awaitable,
+    Callable,
+)
+from dataclasses import (
+    dataclass,
+    field,
+)
+import logging
+import re
+
+from langchain.agents.middleware import (
+    AgentMiddleware,
+    ModelRequest,
+    ModelResponse,
+)
+from langchain.messages import (
+    AIMessage,
+    AnyMessage,
+    HumanMessage,
+)
+from langchain.tools import BaseTool
+
+from config import settings
+from services.agents.tool_schema import tool_schema_tokens
+from services.text_search import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Toolset:
+    """
+    A group of tools only offered to the model when the conversation calls for them.
+    A tool belongs to the toolset when its name is in tool_names or contains one of
+    name_markers; the toolset is needed when a recent user message has a word starting
+    with one of intent_prefixes, or mentions a ticker when on_ticker is set.
+    """
+    name: str
+    intent_prefixes: tuple[str, ...]
+    tool_names: frozenset[str] = frozenset()
+    name_markers: tuple[str, ...] = ()
+    on_ticker: bool = False
+
+    def contains(self, tool_name: str) -> bool:
+        return tool_name in self.tool_names or any(marker in tool_name for marker in self.name_markers)
+
+
+# Upper case words such as "NVDA" or "BRK.B", written as such by the user
+_TICKER_PATTERN = re.compile(r"\b[A-Z]{2,5}(?:\.[A-Z])?\b")
+
+# Words of a request about the user's own holdings or trades, on any venue
+_PORTFOLIO_PREFIXES = (
+    "account", "allocat", "balance", "buy", "cash", "exposure", "holding", "order", "own", "portfolio",
+    "position", "purchas", "rebalanc", "sell", "sold", "trade", "trading",
+)
+
+TOOLSETS = (
+    Toolset(
+        name="broker",
+        # Advice on any stock is checked against the user's positions
+        intent_prefixes=(*_PORTFOLIO_PREFIXES, "alpaca", "stock", "share", "equit", "etf", "invest"),
+        name_markers=("Alpaca",),
+        on_ticker=True,
+    ),
+    Toolset(
+        name="crypto",
+        intent_prefixes=(
+            *_PORTFOLIO_PREFIXES, "coinbase", "crypto", "bitcoin", "btc", "eth", "solana", "coin",
+            "token", "stablecoin", "usdc", "wallet",
+        ),
+        name_markers=("Coinbase",),
+    ),
+    Toolset(
+        name="scheduling",
+        intent_prefixes=(
+            "remind", "schedul", "workflow", "automat", "recurr", "every", "daily", "weekly", "monthly", "alert",
+            "notif", "monitor", "track", "later", "tomorrow", "cancel", "pause", "resum",
+        ),
+        tool_names=frozenset({
+            "createAgentReminder",
+            "getAgentReminders",
+            "updateAgentReminder",
+            "deleteAgentReminder",
+            "createAgentWorkflow",
+            "getAgentWorkflows",
+            "updateAgentWorkflow",
+            "deleteAgentWorkflow",
+        }),
+    ),
+)
+
+
+def toolset_of(tool_name: str) -> Toolset | None:
+    """The toolset of a tool, None for the core tools that are always offered."""
+    return next((toolset for toolset in TOOLSETS if toolset.contains(tool_name)), None)
+
+
+@dataclass
+class ToolSelectionMetrics:
+    model_calls: int = 0
+    offered_tools: int = 0
+    dropped_tools: int = 0
+    dropped_schema_tokens: int = 0
+    per_toolset: dict[str, int] = field(default_factory=dict)   # Model calls each toolset was offered to
+
+    def record(self, offered: list[BaseTool | dict], dropped_tokens: int, dropped: int, toolsets: set[str]) -> None:
+        self.model_calls += 1
+        self.offered_tools += len(offered)
+        self.dropped_tools += dropped
+        self.dropped_schema_tokens += dropped_tokens
+        for name in toolsets:
+            self.per_toolset[name] = self.per_toolset.get(name, 0) + 1
+
+    def to_dict(self) -> dict:
+        calls = max(self.model_calls, 1)
+        return {
+            "model_calls": self.model_calls,
+            "avg_offered_tools": round(self.offered_tools / calls, 2),
+            "avg_dropped_tools": round(self.dropped_tools / calls, 2),
+            "avg_dropped_schema_tokens": round(self.dropped_schema_tokens / calls, 1),
+            "per_toolset": self.per_toolset,
+        }
+
+
+tool_selection_metrics = ToolSelectionMetrics()
+
+
+class ToolSelectionMiddleware(AgentMiddleware):
+    """
+    Offers the model, on every call, only the tools the turn can need: the core tools
+    always, and the toolsets of TOOLSETS (broker, crypto, scheduling) when one of the
+    last history_messages user messages shows the intent for them (the broker toolset
+    whenever a stock is discussed, for portfolio-aware advice), or when the run already
+    called one of their tools. The tools stay registered with the agent, so a
+    call to a tool that wasn't offered still runs.
+
+    The broker and crypto toolsets are only loaded at all when the user's credentials
+    headers are sent (see get_mcp_client).
+    """
+    def __init__(self, history_messages: int = settings.TOOL_SELECTION_HISTORY_MESSAGES):
+        super().__init__()
+        self._history_messages = history_messages
+        self._schema_tokens: dict[str, int] = {}
+
+    def _needed_toolsets(self, messages: list[AnyMessage]) -> set[str]:
+        human_messages = [message for message in messages if isinstance(message, HumanMessage)][-self._history_messages:]
+        tokens = {token for message in human_messages for token in tokenize(message.text)}
+        mentions_ticker = any(_TICKER_PATTERN.search(message.text) for message in human_messages)
+        needed = {
+            toolset.name for toolset in TOOLSETS
+            if (toolset.on_ticker and mentions_ticker) or any(token.startswith(toolset.intent_prefixes) for token in tokens)
+        }
+        for message in messages:
+            if isinstance(message, AIMessage):
+                for tool_call in message.tool_calls:
+                    toolset = toolset_of(tool_call["name"])
+                    if toolset is not None:
+                        needed.add(toolset.name)
+        return needed
+
+    def _tokens(self, tool: BaseTool | dict) -> int:
+        name = tool.name if isinstance(tool, BaseTool) else str(tool.get("name"))
+        if name not in self._schema_tokens:
+            self._schema_tokens[name] = tool_schema_tokens(tool)
+        return self._schema_tokens[name]
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelResponse:
+        if not settings.TOOL_SELECTION_BY_INTENT_ENABLED or not request.tools:
+            return await handler(request)
+
+        needed = self._needed_toolsets(request.messages)
+        offered, dropped, offered_toolsets = [], [], set()
+        for tool in request.tools:
+            toolset = toolset_of(tool.name) if isinstance(tool, BaseTool) else None
+            if toolset is None or toolset.name in needed:
+                offered.append(tool)
+                if toolset is not None:
+                    offered_toolsets.add(toolset.name)
+            else:
+                dropped.append(tool)
+
+        tool_selection_metrics.record(offered, sum(self._tokens(tool) for tool in dropped), len(dropped), offered_toolsets)
+        if not dropped:
+            return await handler(request)
+        if request.messages and isinstance(request.messages[-1], HumanMessage):
+            logger.info(
+                "TOOL SELECTION: offering %d of %d tools (toolsets: %s)",
+                len(offered), len(request.tools), ", ".join(sorted(offered_toolsets)) or "core only",
+            )
+        return await handler(request.override(tools=offered))
@@ -1,6 +1,8 @@
 from dataclasses import dataclass
 import datetime as dt
 
+import numpy as np
+
 
 from pydantic import (
     BaseModel,
@@ -11,17 +13,50 @@ from langchain.tools import (
     ToolRuntime,
 )
 
+from config import settings
 from models.user_context import (
     UserContext,
     UserConversationNotes,
 )
 from models.agent_reminder import AgentReminder
-from models.agent_workflow import AgentWorkflow, WorkflowResult, WorkflowStatus
+from models.agent_workflow import (
+    AgentWorkflow,
+    WorkflowExecutionMode,
+    WorkflowResult,
+    WorkflowResultSummary,
+    WorkflowStatus,
+)
+from models.memory import MemorySnippet, MemorySource
 from services.user_context import UserContextService
 from services.agent_reminder import AgentReminderService
 from services.agent_workflows.workflow import AgentWorkflowService
 from services.agent_workflows.results import WorkflowResultService
-from services.agents.skills import SkillName, skills
+from services.agents.skill_registry import skill_registry
+from services.agents.compaction import ToolPayloadStore
+from services.analytics.expressions import (
+    ExpressionError,
+    NamedExpression,
+    evaluate_expressions,
+)
+from services.analytics.valuation import run_dcf_valuation
+from services.analytics.risk import compute_portfolio_risk
+from services.analytics.peers import build_peer_comparison, compute_peer_metrics
+from services.analytics.technicals import TRADING_DAYS_PER_YEAR, summarize_indicators
+from services.analytics.statements import (
+    RatioBasis,
+    RatioSet,
+    build_ratio_tables,
+    financial_ratio_cache,
+    normalize_statements,
+)
+from services.market_data import MarketDataError, MarketDataService
+from services.agents.research import ResearchCoordinator, ResearchTask
+from services.memory_search import MemorySearchService
+from services.screener import (
+    SCREENER_FIELDS,
+    ScreenerError,
+    ScreenerService,
+)
 
 
 @dataclass
@@ -44,6 +79,31 @@ class WorkflowResultsToolRuntimeContext:
     workflow_result_service: WorkflowResultService
 
 
+@dataclass
+class MarketDataToolsRuntimeContext:
+    market_data_service: MarketDataService
+
+
+@dataclass
+class ScreenerToolsRuntimeContext:
+    screener_service: ScreenerService
+
+
+@dataclass
+class ResearchToolsRuntimeContext:
+    research_coordinator: ResearchCoordinator
+
+
+@dataclass
+class MemorySearchToolsRuntimeContext:
+    memory_search_service: MemorySearchService
+
+
+@dataclass
+class ToolPayloadToolsRuntimeContext:
+    tool_payload_store: ToolPayloadStore
+
+
 class UpdateUserContextToolInput(BaseModel):
     user_id: str = Field(description="The id of the user to update the context for")
     user_profile: dict = Field(description="General information about the user. Must provide the complete user profile as it will replace the existing one.")
@@ -101,7 +161,8 @@ class GetUserConversationNotesToolInput(BaseModel):
     args_schema=GetUserConversationNotesToolInput,
     description=(
         "Retrieve conversation notes for a user, ordered by most recent date first. "
-        "Allows recalling specific details from past conversations."
+        "Allows recalling specific details from past conversations. Older notes are merged into "
+        "weekly or monthly digests, with their period (e.g. 2026-W19 or 2026-05) set."
     ),
 )
 async def get_user_conversation_notes(
@@ -151,6 +212,34 @@ async def update_user_conversation_notes(
     )
 
 
+class SearchMemoryToolInput(BaseModel):
+    user_id: str = Field(description="The id of the user to search for")
+    query: str = Field(description="What to look for, in a few keywords, e.g. 'NVDA position sizing' or 'dividend preferences'")
+    k: int = Field(default=5, ge=1, le=20, description="Maximum number of snippets to return. Defaults to 5.")
+
+
+@tool(
+    "searchUserMemory",
+    args_schema=SearchMemoryToolInput,
+    description=(
+        "Search all the conversation notes of a user, however old, and return only the notes most relevant "
+        "to the query with their date. Prefer this over getUserConversationNotes to recall a specific detail."
+    ),
+)
+async def search_user_memory(
+    runtime: ToolRuntime[MemorySearchToolsRuntimeContext],
+    user_id: str,
+    query: str,
+    k: int = 5,
+) -> list[MemorySnippet]:
+    return await runtime.context.memory_search_service.search(
+        user_id=user_id,
+        source=MemorySource.CONVERSATION_NOTES,
+        query=query,
+        k=k,
+    )
+
+
 class CreateAgentReminderToolInput(BaseModel):
     user_id: str = Field(description="The id of the user to create the reminder for")
     reminder_description: str = Field(description="The description of the reminder")
@@ -255,48 +344,507 @@ async def get_skill_names() -> list[str]:
     such as analyzing a company's balance sheet.
     """
     return [
-        skill_name.value for skill_name in skills.keys()
+        skill_name.value for skill_name in skill_registry.names
     ]
 
 
-@tool("getSkill")
-async def get_skill(skill_name: str) -> str:
+@tool("getSkillTableOfContents")
+async def get_skill_table_of_contents(skill_name: str) -> dict | str:
     """
-    Returns the instructions for a specific skill. Use getSkillNames to retrieve the list of available skill names.
+    Returns the sections of a skill with their ids and estimated token counts, to fetch only
+    the sections needed with getSkill.
     """
     try:
-        skill_enum = SkillName(skill_name)
+        entry = skill_registry.get(skill_name)
     except ValueError:
         return f"Skill '{skill_name}' not found. Use getSkillNames to see available skills."
 
-    return skills[skill_enum]
+    return {
+        "skill_name": entry.name.value,
+        "tokens": entry.tokens,
+        "sections": skill_registry.table_of_contents(entry.name),
+    }
 
 
-class MathOperationToolInput(BaseModel):
-    a: float = Field(description="The first operand")
-    b: float = Field(description="The second operand")
+class GetSkillToolInput(BaseModel):
+    skill_name: str = Field(description="The name of the skill")
+    sections: list[str] | None = Field(
+        default=None,
+        description=(
+            "Ids of the sections to return, from getSkillTableOfContents. A top-level section comes with its "
+            "subsections. Omit to get the whole skill."
+        ),
+    )
 
 
-@tool("add", args_schema=MathOperationToolInput, description="Add two numbers together.")
-async def add(a: float, b: float) -> float:
-    return a + b
+@tool(
+    "getSkill",
+    args_schema=GetSkillToolInput,
+    description=(
+        "Returns the instructions for a specific skill, or only some of its sections. "
+        "Use getSkillNames to retrieve the list of available skill names and getSkillTableOfContents "
+        "to list the sections of a large skill."
+    ),
+)
+async def get_skill(skill_name: str, sections: list[str] | None = None) -> str:
+    try:
+        return skill_registry.render(skill_name, sections)
+    except ValueError:
+        return f"Skill '{skill_name}' not found. Use getSkillNames to see available skills."
+
+
+class GetFullToolResultToolInput(BaseModel):
+    handle: str = Field(description="The handle of the compacted tool result")
+    offset: int = Field(default=0, ge=0, description="Character offset to start reading from. Defaults to 0.")
+    max_chars: int = Field(default=20_000, gt=0, description="Maximum number of characters to return. Defaults to 20000.")
+
+
+@tool(
+    "getFullToolResult",
+    args_schema=GetFullToolResultToolInput,
+    description=(
+        "Large tool results are compacted before you see them and carry a handle. "
+        "Use this to read the full, uncompacted payload of such a result, page by page, "
+        "only when the compacted version is missing data you need."
+    ),
+)
+async def get_full_tool_result(
+    runtime: ToolRuntime[ToolPayloadToolsRuntimeContext],
+    handle: str,
+    offset: int = 0,
+    max_chars: int = 20_000,
+) -> str:
+    if offset < 0 or max_chars <= 0:
+        return "Error: offset must be 0 or more and max_chars more than 0."
+
+    payload = await runtime.context.tool_payload_store.get(handle)
+    if payload is None:
+        return f"No tool result found for handle '{handle}'. It may have expired, call the original tool again."
+
+    page = payload[offset:offset + max_chars]
+    if offset + max_chars < len(payload):
+        page += f"\n[{len(payload) - offset - max_chars} more characters, continue with offset={offset + max_chars}]"
+    return page
+
+
+class CalculateToolInput(BaseModel):
+    expressions: list[NamedExpression] = Field(description="The expressions to evaluate. They can refer to the variables and to each other by name, in any order.")
+    variables: dict[str, float] = Field(default_factory=dict, description="Input values by name, e.g. {\"revenue\": 383.3, \"gross_profit\": 169.1}")
+
+
+@tool(
+    "calculate",
+    args_schema=CalculateToolInput,
+    description=(
+        "Evaluate a batch of named math expressions in a single call, e.g. all the ratios, margins, growth rates "
+        "and averages of an analysis at once. Supports + - * / // % **, comparisons, and/or/not, "
+        "'x if condition else y' and the functions abs, sqrt, log, log10, exp, round(x, digits), min, max, sum, "
+        "avg, mean (of arguments or of a [list]), pow, cagr(start, end, years), pct_change(old, new) and weighted_average([values], [weights]). "
+        "Returns the results by name plus an error message for every expression that failed."
+    ),
+)
+async def calculate(expressions: list[NamedExpression], variables: dict[str, float] | None = None) -> dict:
+    return evaluate_expressions(
+        expressions={expression.name: expression.expression for expression in expressions},
+        variables=variables,
+    )
 
 
-@tool("subtract", args_schema=MathOperationToolInput, description="Subtract b from a.")
-async def subtract(a: float, b: float) -> float:
-    return a - b
+class CalculateDcfValuationToolInput(BaseModel):
+    base_cash_flow: float = Field(description="Cash flow of the base year, e.g. trailing free cash flow or normalized earnings power")
+    growth_rates: list[float] = Field(description="Growth rate of every projected year as decimals, e.g. [0.10, 0.08, 0.06, 0.05, 0.04]. Pass [] for an earnings power value (no growth perpetuity).")
+    discount_rate: float = Field(description="Discount rate (cost of capital) as a decimal, e.g. 0.09")
+    terminal_growth_rate: float | None = Field(default=None, description="Perpetual growth rate after the projection, as a decimal. Ignored if terminal_multiple is given.")
+    terminal_multiple: float | None = Field(default=None, description="Exit multiple applied to the last projected cash flow, instead of a terminal growth rate")
+    net_debt: float = Field(default=0.0, description="Total debt minus excess cash, subtracted from the enterprise value. Defaults to 0.")
+    shares_outstanding: float | None = Field(default=None, description="Diluted shares outstanding, to report values per share")
+    current_price: float | None = Field(default=None, description="Current share price, to report margins of safety (requires shares_outstanding)")
+    mid_year_convention: bool = Field(default=False, description="Discount cash flows from the middle of each year. Defaults to false.")
+    scenarios: dict[str, list[float]] | None = Field(default=None, description="Additional named growth paths with as many years as growth_rates, e.g. {\"bear\": [...], \"bull\": [...]}")
+    discount_rate_grid: list[float] | None = Field(default=None, description="Discount rates for the sensitivity matrix, e.g. [0.08, 0.09, 0.10, 0.11]")
+    terminal_growth_rate_grid: list[float] | None = Field(default=None, description="Terminal growth rates for the sensitivity matrix, e.g. [0.02, 0.025, 0.03]")
+    margin_of_safety_levels: list[float] | None = Field(default=None, description="Required margins of safety for the buy-below prices. Defaults to [0.2, 0.33, 0.5].")
+
+
+@tool(
+    "calculateDcfValuation",
+    args_schema=CalculateDcfValuationToolInput,
+    description=(
+        "Run a complete discounted cash flow valuation in a single call: the year by year DCF table, "
+        "terminal value, enterprise and equity value, values per share for every growth scenario, "
+        "a discount rate x terminal growth sensitivity matrix and margin of safety bands against the current price. "
+        "Use this for intrinsic value and margin of safety calculations instead of step by step arithmetic."
+    ),
+)
+async def calculate_dcf_valuation(
+    base_cash_flow: float,
+    growth_rates: list[float],
+    discount_rate: float,
+    terminal_growth_rate: float | None = None,
+    terminal_multiple: float | None = None,
+    net_debt: float = 0.0,
+    shares_outstanding: float | None = None,
+    current_price: float | None = None,
+    mid_year_convention: bool = False,
+    scenarios: dict[str, list[float]] | None = None,
+    discount_rate_grid: list[float] | None = None,
+    terminal_growth_rate_grid: list[float] | None = None,
+    margin_of_safety_levels: list[float] | None = None,
+) -> dict | str:
+    try:
+        return run_dcf_valuation(
+            base_cash_flow=base_cash_flow,
+            growth_rates=growth_rates,
+            discount_rate=discount_rate,
+            terminal_growth_rate=terminal_growth_rate,
+            terminal_multiple=terminal_multiple,
+            net_debt=net_debt,
+            shares_outstanding=shares_outstanding,
+            current_price=current_price,
+            mid_year_convention=mid_year_convention,
+            scenarios=scenarios,
+            discount_rate_grid=discount_rate_grid,
+            terminal_growth_rate_grid=terminal_growth_rate_grid,
+            margin_of_safety_levels=margin_of_safety_levels,
+        )
+    except ValueError as e:
+        return f"Error: {e}"
 
 
-@tool("multiply", args_schema=MathOperationToolInput, description="Multiply two numbers together.")
-async def multiply(a: float, b: float) -> float:
-    return a * b
+class PortfolioHolding(BaseModel):
+    ticker: str = Field(description="The ticker of the holding")
+    market_value: float | None = Field(default=None, description="Current market value of the position, long positions only. Either market_value or quantity is required.")
+    quantity: float | None = Field(default=None, description="Number of shares/units held, valued at the last close when market_value is not given")
+    sector: str | None = Field(default=None, description="Sector of the holding, for sector concentration")
 
 
-@tool("divide", args_schema=MathOperationToolInput, description="Divide a by b. Returns an error if b is zero.")
-async def divide(a: float, b: float) -> float | str:
-    if b == 0:
-        return "Error: division by zero"
-    return a / b
+class AnalyzePortfolioRiskToolInput(BaseModel):
+    holdings: list[PortfolioHolding] = Field(description="The holdings of the portfolio, excluding cash")
+    lookback_days: int = Field(default=settings.RISK_LOOKBACK_DAYS, description=f"Calendar days of price history to use. Defaults to {settings.RISK_LOOKBACK_DAYS}.")
+    confidence_level: float = Field(default=0.95, description="Confidence level of VaR and CVaR. Defaults to 0.95.")
+    horizon_days: int = Field(default=1, description="VaR and CVaR horizon in trading days. Defaults to 1.")
+    benchmark: str | None = Field(default=settings.RISK_BENCHMARK_TICKER, description=f"Benchmark ticker for betas. Defaults to {settings.RISK_BENCHMARK_TICKER}.")
+
+
+@tool(
+    "analyzePortfolioRisk",
+    args_schema=AnalyzePortfolioRiskToolInput,
+    description=(
+        "Compute the quantitative risk profile of a portfolio in a single call from the daily price history of its holdings: "
+        "annualized volatility, beta, historical and parametric VaR / CVaR, max drawdown, per position risk contributions, "
+        "the correlation matrix and concentration metrics (Herfindahl index, effective number of positions, sector weights). "
+        "Returns compact tables. Use it for portfolio risk reviews instead of fetching prices and computing by hand."
+    ),
+)
+async def analyze_portfolio_risk(
+    runtime: ToolRuntime[MarketDataToolsRuntimeContext],
+    holdings: list[PortfolioHolding],
+    lookback_days: int = settings.RISK_LOOKBACK_DAYS,
+    confidence_level: float = 0.95,
+    horizon_days: int = 1,
+    benchmark: str | None = settings.RISK_BENCHMARK_TICKER,
+) -> dict | str:
+    market_data_service = runtime.context.market_data_service
+    if not holdings:
+        return "Error: no holdings given"
+
+    end_date = dt.date.today()
+    start_date = end_date - dt.timedelta(days=lookback_days)
+    tickers = list(dict.fromkeys(holding.ticker.upper() for holding in holdings))
+    price_histories, errors = await market_data_service.get_price_histories(
+        tickers=list(dict.fromkeys(tickers + [benchmark.upper()])) if benchmark else tickers,
+        start_date=start_date,
+        end_date=end_date,
+    )
+    # The benchmark may also be one of the holdings, whose history must stay in price_histories
+    benchmark_history = price_histories.get(benchmark.upper()) if benchmark else None
+
+    # Merge duplicate tickers and value the positions
+    positions: dict[str, tuple[float, str | None]] = {}
+    for holding in holdings:
+        ticker = holding.ticker.upper()
+        if ticker not in price_histories:
+            continue
+        if holding.market_value is not None:
+            value = holding.market_value
+        elif holding.quantity is not None:
+            value = holding.quantity * float(price_histories[ticker].closes[-1])
+        else:
+            errors[ticker] = "Neither market_value nor quantity given"
+            continue
+        previous_value, sector = positions.get(ticker, (0.0, None))
+        positions[ticker] = (previous_value + value, sector or holding.sector)
+
+    if not positions:
+        return {"error": "No price history available for any holding", "missing": errors}
+
+    position_tickers = list(positions)
+    try:
+        result = compute_portfolio_risk(
+            tickers=position_tickers,
+            values=np.array([positions[ticker][0] for ticker in position_tickers]),
+            dates=[price_histories[ticker].dates for ticker in position_tickers],
+            closes=[price_histories[ticker].closes for ticker in position_tickers],
+            benchmark_dates=benchmark_history.dates if benchmark_history else None,
+            benchmark_closes=benchmark_history.closes if benchmark_history else None,
+            confidence_level=confidence_level,
+            horizon_days=horizon_days,
+            sectors=[positions[ticker][1] for ticker in position_tickers],
+        )
+    except ValueError as e:
+        return f"Error: {e}"
+
+    if errors:
+        # These holdings are left out of every metric
+        result["missing"] = errors
+    return result
+
+
+class ComparePeersToolInput(BaseModel):
+    tickers: list[str] = Field(description=f"The tickers of the peer group, including the target. At most {settings.PEER_COMPARISON_MAX_TICKERS}.")
+    target: str | None = Field(default=None, description="The ticker the comparison is centered on, summarized per category against the peers")
+
+
+@tool(
+    "comparePeers",
+    args_schema=ComparePeersToolInput,
+    description=(
+        "Compare a group of peer companies in a single call. Fetches the financial statements and overview of every ticker "
+        "and computes a peer ratio matrix of valuation (P/E, P/S, EV/EBITDA, FCF yield), profitability (gross, operating, net "
+        "and FCF margins, ROE), growth (YoY TTM revenue and net income) and leverage (debt/equity, net debt/EBITDA, current ratio) "
+        "metrics, with percentile ranks, z-scores and peer medians. Returns compact tables. "
+        "Use it for peer and sector comparisons instead of fetching every company's financials and computing ratios by hand."
+    ),
+)
+async def compare_peers(
+    runtime: ToolRuntime[MarketDataToolsRuntimeContext],
+    tickers: list[str],
+    target: str | None = None,
+) -> dict | str:
+    tickers = list(dict.fromkeys(ticker.upper() for ticker in tickers))
+    target = target.upper() if target else None
+    if target and target not in tickers:
+        tickers.insert(0, target)
+    if len(tickers) < 2:
+        return "Error: at least two tickers are needed for a peer comparison"
+    if len(tickers) > settings.PEER_COMPARISON_MAX_TICKERS:
+        return f"Error: at most {settings.PEER_COMPARISON_MAX_TICKERS} tickers can be compared at once"
+
+    fundamentals, errors = await runtime.context.market_data_service.get_fundamentals(tickers)
+    if not fundamentals:
+        return {"error": "No financial statements available for any ticker", "missing": errors}
+
+    peer_tickers = [ticker for ticker in tickers if ticker in fundamentals]
+    result = build_peer_comparison(
+        tickers=peer_tickers,
+        metrics=[
+            compute_peer_metrics(fundamentals[ticker][0].dates, fundamentals[ticker][0].columns, fundamentals[ticker][1])
+            for ticker in peer_tickers
+        ],
+        target=target,
+    )
+    if errors:
+        # These tickers are left out of the comparison
+        result["missing"] = errors
+    return result
+
+
+class GetFinancialRatiosToolInput(BaseModel):
+    ticker: str = Field(description="The ticker of the company")
+    ratio_sets: list[RatioSet] | None = Field(default=None, description="The ratio sets to return. Defaults to all of them.")
+    basis: RatioBasis = Field(default=RatioBasis.TTM, description="'ttm' (trailing twelve months flows) or 'quarterly' (flows of each reported period). Defaults to 'ttm'.")
+    periods: int = Field(default=4, description="Number of most recent reporting periods to return. Defaults to 4.")
+
+
+@tool(
+    "getFinancialRatios",
+    args_schema=GetFinancialRatiosToolInput,
+    description=(
+        "Get the standard financial statement ratios of a company for its most recent reporting periods, precomputed from "
+        "its normalized financial statements. Ratio sets: balance_sheet (liquidity, leverage, returns), income_statement "
+        "(growth, margins, interest coverage, tax rate), cash_flow (OCF, FCF, capex intensity, shareholder returns) and "
+        "earnings_quality (accruals ratio, cash conversion, DSO, receivables growth). Ratios are fractions (0.25 = 25%), "
+        "amounts are in the reporting currency. Use it instead of reading raw getStockFinancials payloads to compute ratios."
+    ),
+)
+async def get_financial_ratios(
+    runtime: ToolRuntime[MarketDataToolsRuntimeContext],
+    ticker: str,
+    ratio_sets: list[RatioSet] | None = None,
+    basis: RatioBasis = RatioBasis.TTM,
+    periods: int = 4,
+) -> dict | str:
+    ticker = ticker.upper()
+    try:
+        financials = await runtime.context.market_data_service.get_financials(ticker)
+    except MarketDataError as e:
+        return f"Error: {e}"
+
+    statements = normalize_statements(ticker, financials)
+    period_ends, ratios = financial_ratio_cache.get_or_compute(statements, RatioBasis(basis))
+    return {
+        "ticker": ticker,
+        "basis": RatioBasis(basis).value,
+        "ratios": build_ratio_tables(
+            period_ends=period_ends,
+            ratios=ratios,
+            ratio_sets=[RatioSet(ratio_set) for ratio_set in ratio_sets or list(RatioSet)],
+            periods=max(1, periods),
+        ),
+    }
+
+
+class ComputeTechnicalIndicatorsToolInput(BaseModel):
+    tickers: list[str] = Field(description=f"The tickers to compute the indicators of. At most {settings.TECHNICALS_MAX_TICKERS}.")
+    sma_windows: list[int] = Field(default=[20, 50, 200], description="Simple moving average windows in trading days. Defaults to [20, 50, 200].")
+    ema_windows: list[int] = Field(default=[12, 26], description="Exponential moving average spans in trading days. Defaults to [12, 26].")
+    rsi_window: int = Field(default=14, description="RSI window in trading days. Defaults to 14.")
+    bollinger_window: int = Field(default=20, description="Bollinger band window in trading days. Defaults to 20.")
+    bollinger_std: float = Field(default=2.0, description="Bollinger band width in standard deviations. Defaults to 2.")
+
+
+@tool(
+    "computeTechnicalIndicators",
+    args_schema=ComputeTechnicalIndicatorsToolInput,
+    description=(
+        "Compute technical indicators for several tickers in a single call from their daily price history: SMAs and EMAs "
+        "(and the close relative to each SMA), RSI, MACD (12/26/9), Bollinger bands, 1m/3m/6m/1y returns, 52-week high/low "
+        "and annualized volatility, plus the trend signals they imply (moving average and MACD crossovers, overbought / "
+        "oversold). Returns only the latest values as a compact table. Use it to assess price trends and momentum instead "
+        "of fetching raw price histories."
+    ),
+)
+async def compute_technical_indicators(
+    runtime: ToolRuntime[MarketDataToolsRuntimeContext],
+    tickers: list[str],
+    sma_windows: list[int] = [20, 50, 200],
+    ema_windows: list[int] = [12, 26],
+    rsi_window: int = 14,
+    bollinger_window: int = 20,
+    bollinger_std: float = 2.0,
+) -> dict | str:
+    tickers = list(dict.fromkeys(ticker.upper() for ticker in tickers))
+    if not tickers:
+        return "Error: no tickers given"
+    if len(tickers) > settings.TECHNICALS_MAX_TICKERS:
+        return f"Error: at most {settings.TECHNICALS_MAX_TICKERS} tickers can be analyzed at once"
+    windows = list(sma_windows) + list(ema_windows) + [rsi_window, bollinger_window]
+    if min(windows) < 2 or max(windows) > TRADING_DAYS_PER_YEAR * 2:
+        return f"Error: windows must be between 2 and {TRADING_DAYS_PER_YEAR * 2} trading days"
+
+    # Enough calendar days for the longest window (and the 1 year statistics) plus a margin for holidays
+    bars_needed = max(max(windows), TRADING_DAYS_PER_YEAR) + 1
+    end_date = dt.date.today()
+    start_date = end_date - dt.timedelta(days=int(bars_needed * 365 / TRADING_DAYS_PER_YEAR) + 15)
+    price_histories, errors = await runtime.context.market_data_service.get_price_histories(
+        tickers=tickers,
+        start_date=start_date,
+        end_date=end_date,
+    )
+
+    columns, rows, signals, as_of = None, [], {}, {}
+    for ticker in tickers:
+        history = price_histories.get(ticker)
+        if history is None:
+            continue
+        if len(history) < 2:
+            errors[ticker] = "Not enough price history"
+            continue
+        indicators, ticker_signals = summarize_indicators(
+            closes=history.closes,
+            sma_windows=sma_windows,
+            ema_windows=ema_windows,
+            rsi_window=rsi_window,
+            bollinger_window=bollinger_window,
+            bollinger_std=bollinger_std,
+        )
+        columns = columns or ["ticker"] + list(indicators)
+        rows.append([ticker] + list(indicators.values()))
+        signals[ticker] = ticker_signals
+        as_of[ticker] = str(history.dates[-1])
+
+    if not rows:
+        return {"error": "No price history available for any ticker", "missing": errors}
+
+    result = {
+        "as_of": as_of,
+        "indicators": {"columns": columns, "rows": rows},
+        "signals": signals,
+    }
+    if errors:
+        result["missing"] = errors
+    return result
+
+
+class ScreenStocksToolInput(BaseModel):
+    filter_by: str | None = Field(
+        default=None,
+        description=(
+            "Boolean expression the companies must match, e.g. 'pe_ratio < 20 and dividend_yield > 0.03 and debt_to_equity < 1'. "
+            "Ratios are fractions (0.03 = 3%). Companies missing a compared field don't match."
+        ),
+    )
+    rank_by: str | None = Field(default=None, description="Expression to sort the matches by, e.g. 'fcf_yield' or 'revenue_growth_yoy - pe_ratio / 100'")
+    descending: bool = Field(default=True, description="Whether the highest rank_by values come first. Defaults to true.")
+    sectors: list[str] | None = Field(default=None, description="Only keep companies of these sectors")
+    limit: int = Field(default=20, description=f"Maximum number of companies returned, at most {settings.SCREENER_MAX_RESULTS}. Defaults to 20.")
+
+
+@tool(
+    "screenStocks",
+    args_schema=ScreenStocksToolInput,
+    description=(
+        "Screen a universe of large-cap stocks on their fundamentals in a single call, e.g. to find undervalued dividend "
+        "stocks or the fastest growing companies of a sector. Filter and rank expressions use the syntax of `calculate` over "
+        f"these fields: {', '.join(SCREENER_FIELDS)}. "
+        "Flow figures are trailing twelve months. Returns the matching companies as a compact table; use the other tools "
+        "to research the shortlisted companies in depth."
+    ),
+)
+async def screen_stocks(
+    runtime: ToolRuntime[ScreenerToolsRuntimeContext],
+    filter_by: str | None = None,
+    rank_by: str | None = None,
+    descending: bool = True,
+    sectors: list[str] | None = None,
+    limit: int = 20,
+) -> dict | str:
+    try:
+        return await runtime.context.screener_service.screen(
+            filter_by=filter_by,
+            rank_by=rank_by,
+            descending=descending,
+            sectors=sectors,
+            limit=max(1, min(limit, settings.SCREENER_MAX_RESULTS)),
+        )
+    except (ExpressionError, ScreenerError) as e:
+        return f"Error: {e}"
+
+
+class DelegateResearchToolInput(BaseModel):
+    tasks: list[ResearchTask] = Field(description=f"One task per ticker or sub-question, at most {settings.RESEARCH_SUB_AGENT_MAX_TASKS}")
+
+
+@tool(
+    "delegateResearch",
+    args_schema=DelegateResearchToolInput,
+    description=(
+        "Research several tickers or sub-questions in parallel. Every task is handed to a research analyst that fetches "
+        "and analyzes the data of its subject on its own and returns a short structured summary (summary, key metrics, "
+        "positives, risks, verdict). Returns the summaries merged into one result, with the key metrics of all subjects "
+        "as a single compact table. Use it for portfolio reviews and multi-company analyses instead of researching the "
+        "companies one after the other, then combine the results yourself."
+    ),
+)
+async def delegate_research(
+    runtime: ToolRuntime[ResearchToolsRuntimeContext],
+    tasks: list[ResearchTask],
+) -> dict | str:
+    if not tasks:
+        return "Error: no research tasks given"
+    if len(tasks) > settings.RESEARCH_SUB_AGENT_MAX_TASKS:
+        return f"Error: at most {settings.RESEARCH_SUB_AGENT_MAX_TASKS} research tasks can be delegated at once"
+    return await runtime.context.research_coordinator.run(tasks)
 
 
 class CreateAgentWorkflowToolInput(BaseModel):
@@ -304,6 +852,14 @@ class CreateAgentWorkflowToolInput(BaseModel):
     name: str = Field(description="A short human-readable name for the workflow")
     description: str = Field(description="Goal-only description of what the agent should achieve on each run. No tool names, no user data, no implementation steps — just the intent.")
     schedule: str = Field(description="Cron expression for the schedule, e.g. '0 0 1 * *' for monthly on the 1st")
+    execution_mode: WorkflowExecutionMode = Field(
+        default=WorkflowExecutionMode.PLAN_EXECUTE,
+        description=(
+            "'plan_execute' (default): the agent plans all its data requests up front and they run in parallel, best for "
+            "reviews and reports. 'react': the agent decides each step after the previous result, for tasks with "
+            "conditional steps (e.g. 'buy if the price drops below X')."
+        ),
+    )
 
 
 @tool(
@@ -320,12 +876,14 @@ async def create_agent_workflow(
     name: str,
     description: str,
     schedule: str,
+    execution_mode: WorkflowExecutionMode = WorkflowExecutionMode.PLAN_EXECUTE,
 ) -> AgentWorkflow:
     return await runtime.context.agent_workflow_service.create_workflow(
         user_id=user_id,
         name=name,
         description=description,
         schedule=schedule,
+        execution_mode=execution_mode,
     )
 
 
@@ -349,6 +907,7 @@ class UpdateAgentWorkflowToolInput(BaseModel):
     description: str | None = Field(default=None, description="Updated goal-only description. No tool names, no user data, no implementation steps. If omitted, existing description is kept.")
     schedule: str | None = Field(default=None, description="New cron schedule. If omitted, existing schedule is kept.")
     status: WorkflowStatus | None = Field(default=None, description="New status: 'active' or 'paused'. If omitted, existing status is kept.")
+    execution_mode: WorkflowExecutionMode | None = Field(default=None, description="New execution mode: 'plan_execute' or 'react'. If omitted, existing mode is kept.")
 
 
 @tool(
@@ -364,6 +923,7 @@ async def update_agent_workflow(
     description: str | None = None,
     schedule: str | None = None,
     status: WorkflowStatus | None = None,
+    execution_mode: WorkflowExecutionMode | None = None,
 ) -> AgentWorkflow:
     return await runtime.context.agent_workflow_service.update_workflow(
         user_id=user_id,
@@ -372,6 +932,7 @@ async def update_agent_workflow(
         description=description,
         schedule=schedule,
         status=status,
+        execution_mode=execution_mode,
     )
 
 
@@ -407,11 +968,59 @@ class GetWorkflowResultsToolInput(BaseModel):
 @tool(
     "getWorkflowResults",
     args_schema=GetWorkflowResultsToolInput,
-    description="Get the results of all past workflow runs for the user, ordered by most recent first. Use this when the user asks what the agent has done on their behalf since the last conversation.",
+    description=(
+        "Get a summary of all past workflow runs for the user, ordered by most recent first: what was found and done, "
+        "with the tickers, signals and actions of each run. Use this when the user asks what the agent has done on their "
+        "behalf since the last conversation, and getWorkflowResult with a result_id for the full report of a run."
+    ),
 )
 async def get_workflow_results(
     runtime: ToolRuntime[WorkflowResultsToolRuntimeContext],
     user_id: str,
     limit: int | None = 10,
-) -> list[WorkflowResult]:
-    return await runtime.context.workflow_result_service.get_results(user_id=user_id, limit=limit)
+) -> list[WorkflowResultSummary]:
+    return await runtime.context.workflow_result_service.get_result_summaries(user_id=user_id, limit=limit)
+
+
+class GetWorkflowResultToolInput(BaseModel):
+    user_id: str = Field(description="The id of the user the result belongs to")
+    result_id: str = Field(description="The id of the result, from getWorkflowResults or searchWorkflowResults")
+
+
+@tool(
+    "getWorkflowResult",
+    args_schema=GetWorkflowResultToolInput,
+    description="Get the full report of a single workflow run.",
+)
+async def get_workflow_result(
+    runtime: ToolRuntime[WorkflowResultsToolRuntimeContext],
+    user_id: str,
+    result_id: str,
+) -> WorkflowResult | str:
+    result = await runtime.context.workflow_result_service.get_result(user_id=user_id, result_id=result_id)
+    if result is None:
+        return f"Error: no workflow result with id '{result_id}' for this user."
+    return result
+
+
+@tool(
+    "searchWorkflowResults",
+    args_schema=SearchMemoryToolInput,
+    description=(
+        "Search the reports of all past workflow runs of a user and return only the passages most relevant "
+        "to the query, with the workflow name, run date and result_id. Prefer this over getWorkflowResults "
+        "to find what a workflow found about a specific topic."
+    ),
+)
+async def search_workflow_results(
+    runtime: ToolRuntime[MemorySearchToolsRuntimeContext],
+    user_id: str,
+    query: str,
+    k: int = 5,
+) -> list[MemorySnippet]:
+    return await runtime.context.memory_search_service.search(
+        user_id=user_id,
+        source=MemorySource.WORKFLOW_RESULTS,
+        query=query,
+        k=k,
+    )
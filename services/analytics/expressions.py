@@ -0,0 +1,306 @@
+import ast
+from functools import reduce
+import math
+import operator
+from typing import Any, Callable
+
+import numpy as np
+from pydantic import (
+    BaseModel,
+    Field,
+)
+
+
+MAX_EXPRESSION_LENGTH = 2_000
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+class NamedExpression(BaseModel):
+    name: str = Field(description="Name of the result, usable in the other expressions, e.g. 'gross_margin'")
+    expression: str = Field(description="The expression, e.g. 'gross_profit / revenue'")
+
+
+def _cagr(start, end, years):
+    return (end / start) ** (1 / years) - 1
+
+
+def _pct_change(old, new):
+    return (new - old) / np.abs(old)
+
+
+def _weighted_average(values, weights):
+    values = np.asarray(values, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    return np.sum(values * weights, axis=0) / np.sum(weights, axis=0)
+
+
+def _aggregated(args: tuple) -> tuple:
+    """The values of an aggregation, given either as arguments or as a single list: sum(a, b) or sum([a, b])."""
+    if len(args) == 1 and isinstance(args[0], (list, tuple)):
+        args = tuple(args[0])
+    if not args:
+        raise ExpressionError("Aggregation of no values")
+    return args
+
+
+def _average(*args):
+    args = _aggregated(args)
+    return reduce(operator.add, args) / len(args)
+
+
+FUNCTIONS: dict[str, Callable] = {
+    "abs": np.abs,
+    "sqrt": np.sqrt,
+    "log": np.log,
+    "log10": np.log10,
+    "exp": np.exp,
+    "round": lambda x, digits=0: np.round(x, int(digits)),
+    "min": lambda *args: reduce(np.minimum, _aggregated(args)),
+    "max": lambda *args: reduce(np.maximum, _aggregated(args)),
+    "sum": lambda *args: reduce(operator.add, _aggregated(args)),
+    "avg": _average,
+    "mean": _average,
+    "pow": np.power,
+    "cagr": _cagr,
+    "pct_change": _pct_change,
+    "weighted_average": _weighted_average,
+}
+
+_BINARY_OPERATORS: dict[type, Callable] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+
+_UNARY_OPERATORS: dict[type, Callable] = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+    ast.Not: np.logical_not,
+}
+
+_COMPARISON_OPERATORS: dict[type, Callable] = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+}
+
+_BOOLEAN_OPERATORS: dict[type, Callable] = {
+    ast.And: np.logical_and,
+    ast.Or: np.logical_or,
+}
+
+
+def _validate(node: ast.AST) -> None:
+    """Rejects every syntax that is not plain arithmetic, comparisons or a whitelisted function call."""
+    match node:
+        case ast.Expression():
+            _validate(node.body)
+        case ast.Constant():
+            if isinstance(node.value, str) or not isinstance(node.value, (int, float, bool)):
+                raise ExpressionError(f"Unsupported constant {node.value!r}")
+        case ast.Name():
+            pass
+        case ast.BinOp():
+            if type(node.op) not in _BINARY_OPERATORS:
+                raise ExpressionError(f"Unsupported operator {type(node.op).__name__}")
+            _validate(node.left)
+            _validate(node.right)
+        case ast.UnaryOp():
+            if type(node.op) not in _UNARY_OPERATORS:
+                raise ExpressionError(f"Unsupported operator {type(node.op).__name__}")
+            _validate(node.operand)
+        case ast.Compare():
+            for comparison_operator in node.ops:
+                if type(comparison_operator) not in _COMPARISON_OPERATORS:
+                    raise ExpressionError(f"Unsupported comparison {type(comparison_operator).__name__}")
+            _validate(node.left)
+            for comparator in node.comparators:
+                _validate(comparator)
+        case ast.BoolOp():
+            for value in node.values:
+                _validate(value)
+        case ast.IfExp():
+            _validate(node.test)
+            _validate(node.body)
+            _validate(node.orelse)
+        case ast.List() | ast.Tuple():
+            for element in node.elts:
+                _validate(element)
+        case ast.Call():
+            if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+                raise ExpressionError(
+                    f"Unsupported function call. Available functions: {', '.join(FUNCTIONS)}"
+                )
+            if node.keywords:
+                raise ExpressionError("Keyword arguments are not supported")
+            for arg in node.args:
+                _validate(arg)
+        case _:
+            raise ExpressionError(f"Unsupported syntax {type(node).__name__}")
+
+
+def parse_expression(expression: str) -> ast.Expression:
+    """
+    Parses an expression and checks that it only uses the supported syntax: numbers,
+    names, arithmetic, comparisons, `and`/`or`/`not`, `x if cond else y`, lists and
+    the functions in FUNCTIONS.
+
+    Raises:
+        ExpressionError: If the expression is invalid or uses unsupported syntax.
+    """
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise ExpressionError(f"Expression is longer than {MAX_EXPRESSION_LENGTH} characters")
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ExpressionError(f"Invalid syntax: {e.msg}") from e
+
+    _validate(tree)
+    return tree
+
+
+def expression_names(tree: ast.Expression) -> set[str]:
+    """Returns the variable names an expression refers to, excluding function names."""
+    function_nodes = {id(node.func) for node in ast.walk(tree) if isinstance(node, ast.Call)}
+    return {
+        node.id
+        for node in ast.walk(tree)
+        if isinstance(node, ast.Name) and id(node) not in function_nodes
+    }
+
+
+def evaluate_expression(tree: ast.Expression, namespace: dict[str, Any]) -> Any:
+    """
+    Evaluates a parsed expression. Works on plain numbers as well as NumPy arrays,
+    in which case the comparisons and boolean operators are applied element-wise.
+    """
+    def evaluate(node: ast.AST) -> Any:
+        match node:
+            case ast.Expression():
+                return evaluate(node.body)
+            case ast.Constant():
+                # Floats only, so that exponentiation can't build arbitrarily large integers
+                return node.value if isinstance(node.value, bool) else float(node.value)
+            case ast.Name():
+                if node.id not in namespace:
+                    raise ExpressionError(f"Unknown name '{node.id}'")
+                return namespace[node.id]
+            case ast.BinOp():
+                return _BINARY_OPERATORS[type(node.op)](evaluate(node.left), evaluate(node.right))
+            case ast.UnaryOp():
+                return _UNARY_OPERATORS[type(node.op)](evaluate(node.operand))
+            case ast.Compare():
+                left = evaluate(node.left)
+                result = True
+                for comparison_operator, comparator in zip(node.ops, node.comparators):
+                    right = evaluate(comparator)
+                    result = np.logical_and(result, _COMPARISON_OPERATORS[type(comparison_operator)](left, right))
+                    left = right
+                return result
+            case ast.BoolOp():
+                return reduce(_BOOLEAN_OPERATORS[type(node.op)], [evaluate(value) for value in node.values])
+            case ast.IfExp():
+                test = evaluate(node.test)
+                if np.ndim(test) == 0:
+                    # Only evaluate the branch taken, so that e.g. `a / b if b != 0 else 0` works
+                    return evaluate(node.body) if test else evaluate(node.orelse)
+                return np.where(test, evaluate(node.body), evaluate(node.orelse))
+            case ast.List() | ast.Tuple():
+                return [evaluate(element) for element in node.elts]
+            case ast.Call():
+                return FUNCTIONS[node.func.id](*[evaluate(arg) for arg in node.args])
+        raise ExpressionError(f"Unsupported syntax {type(node).__name__}")
+
+    return evaluate(tree)
+
+
+def _to_result(value: Any) -> float | bool:
+    array = np.asarray(value)
+    if array.ndim != 0:
+        raise ExpressionError("Result is a list, not a single number")
+    if np.iscomplexobj(array):
+        raise ExpressionError("Result is not a real number (e.g. fractional power of a negative value)")
+    if array.dtype == bool:
+        return bool(array)
+    result = float(array)
+    if not math.isfinite(result):
+        raise ExpressionError("Result is not a finite number (e.g. log or sqrt of a negative value)")
+    return result
+
+
+def evaluate_expressions(expressions: dict[str, str], variables: dict[str, float] | None = None) -> dict:
+    """
+    Evaluates a batch of named expressions in one go.
+
+    Expressions can refer to the variables and to each other by name, in any order:
+    dependencies are resolved first and circular references are reported. A failing
+    expression doesn't stop the others, only the ones depending on it.
+
+    Args:
+        expressions: Expression name to expression, e.g. {"gross_margin": "gross_profit / revenue"}.
+        variables: Variable name to value, e.g. {"gross_profit": 120, "revenue": 400}.
+
+    Returns:
+        A dict with the `results` of the successful expressions and the `errors` of the failing ones.
+    """
+    variables = variables or {}
+    results: dict[str, float | bool] = {}
+    errors: dict[str, str] = {}
+    trees: dict[str, ast.Expression] = {}
+
+    for name, expression in expressions.items():
+        if name in variables:
+            errors[name] = f"'{name}' is both a variable and an expression name"
+            continue
+        try:
+            trees[name] = parse_expression(expression)
+        except ExpressionError as e:
+            errors[name] = str(e)
+
+    def resolve(name: str, path: list[str]) -> None:
+        if name in results or name in errors:
+            return
+        if name in path:
+            cycle = path[path.index(name):] + [name]
+            for cycle_name in cycle[:-1]:
+                errors[cycle_name] = f"Circular reference: {' -> '.join(cycle)}"
+            return
+
+        tree = trees[name]
+        for dependency in sorted(expression_names(tree) & trees.keys()):
+            resolve(dependency, path + [name])
+            if name in errors:
+                return
+            if dependency in errors:
+                errors[name] = f"Depends on '{dependency}', which failed"
+                return
+
+        namespace = {**variables, **results}
+        try:
+            with np.errstate(all="raise"):
+                results[name] = _to_result(evaluate_expression(tree, namespace))
+        except ExpressionError as e:
+            errors[name] = str(e)
+        except ZeroDivisionError:
+            errors[name] = "Division by zero"
+        except (FloatingPointError, OverflowError, ValueError, TypeError) as e:
+            errors[name] = f"Arithmetic error: {e}"
+
+    for name in trees:
+        resolve(name, [])
+
+    # Keep the order of the request
+    return {
+        "results": {name: results[name] for name in expressions if name in results},
+        "errors": {name: errors[name] for name in expressions if name in errors},
+    }
@@ -0,0 +1,9 @@
+import numpy as np
+
+
+def round_values(values, digits: int = 2):
+    """Rounds a NumPy array (or scalar) and converts it to plain Python values, NaN becoming None."""
+    array = np.round(np.asarray(values, dtype=float), digits)
+    if array.ndim == 0:
+        return None if np.isnan(array) else float(array)
+    return [round_values(value, digits) for value in array]
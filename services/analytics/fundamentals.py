@@ -0,0 +1,107 @@
+from typing import Any
+
+import numpy as np
+
+
+# Canonical field name -> field names used by the common market data APIs.
+# The first alias present in a payload wins.
+FIELD_ALIASES: dict[str, list[str]] = {
+    # Income statement
+    "revenue": ["revenue", "totalRevenue", "total_revenue", "revenues", "sales", "netSales"],
+    "cost_of_revenue": ["costOfRevenue", "cost_of_revenue", "costOfGoodsSold", "costOfGoodsAndServicesSold", "cogs"],
+    "gross_profit": ["grossProfit", "gross_profit"],
+    "operating_income": ["operatingIncome", "operating_income", "ebit", "operatingProfit"],
+    "net_income": ["netIncome", "net_income", "netIncomeCommonStockholders", "netIncomeApplicableToCommonShares"],
+    "interest_expense": ["interestExpense", "interest_expense"],
+    "income_tax_expense": ["incomeTaxExpense", "income_tax_expense", "taxProvision"],
+    "depreciation_and_amortization": ["depreciationAndAmortization", "depreciation_and_amortization", "depreciationDepletionAndAmortization", "depreciation"],
+    "ebitda": ["ebitda", "EBITDA"],
+    "eps_diluted": ["epsDiluted", "eps_diluted", "dilutedEPS", "epsdiluted", "eps"],
+    "shares_diluted": ["weightedAverageShsOutDil", "dilutedAverageShares", "weighted_average_shares_diluted", "sharesOutstanding"],
+    # Balance sheet
+    "cash_and_equivalents": ["cashAndCashEquivalents", "cash_and_equivalents", "cashAndShortTermInvestments", "cash"],
+    "current_assets": ["totalCurrentAssets", "current_assets", "currentAssets"],
+    "current_liabilities": ["totalCurrentLiabilities", "current_liabilities", "currentLiabilities"],
+    "inventory": ["inventory", "inventories"],
+    "receivables": ["netReceivables", "accountsReceivable", "receivables", "currentNetReceivables"],
+    "total_assets": ["totalAssets", "total_assets"],
+    "total_liabilities": ["totalLiabilities", "total_liabilities"],
+    "total_debt": ["totalDebt", "total_debt", "shortLongTermDebtTotal"],
+    "long_term_debt": ["longTermDebt", "long_term_debt"],
+    "short_term_debt": ["shortTermDebt", "short_term_debt", "shortLongTermDebt", "currentDebt"],
+    "total_equity": ["totalStockholdersEquity", "totalShareholderEquity", "stockholdersEquity", "total_equity", "totalEquity"],
+    "goodwill_and_intangibles": ["goodwillAndIntangibleAssets", "goodwill_and_intangibles", "intangibleAssets"],
+    # Cash flow statement
+    "operating_cash_flow": ["operatingCashFlow", "operating_cash_flow", "operatingCashflow", "netCashProvidedByOperatingActivities", "cashFlowFromOperations"],
+    "capital_expenditure": ["capitalExpenditure", "capital_expenditure", "capitalExpenditures", "capex"],
+    "free_cash_flow": ["freeCashFlow", "free_cash_flow"],
+    "dividends_paid": ["dividendsPaid", "dividends_paid", "dividendPayout", "commonDividendsPaid"],
+    "share_repurchases": ["commonStockRepurchased", "share_repurchases", "paymentsForRepurchaseOfCommonStock"],
+    "stock_based_compensation": ["stockBasedCompensation", "stock_based_compensation"],
+    # Market data (stock overview)
+    "market_cap": ["marketCap", "market_cap", "MarketCapitalization", "marketCapitalization", "mktCap"],
+    "price": ["price", "currentPrice", "regularMarketPrice", "lastPrice", "close"],
+    "sector": ["sector", "Sector"],
+}
+
+# Fields that are flows over a period (summed over four quarters for trailing twelve
+# months figures); the others are point-in-time balances.
+FLOW_FIELDS = {
+    "revenue", "cost_of_revenue", "gross_profit", "operating_income", "net_income",
+    "interest_expense", "income_tax_expense", "depreciation_and_amortization", "ebitda",
+    "eps_diluted", "operating_cash_flow", "capital_expenditure", "free_cash_flow",
+    "dividends_paid", "share_repurchases", "stock_based_compensation",
+}
+
+
+def resolve_field(columns: dict[str, Any], canonical_name: str) -> Any | None:
+    """Returns the value of a canonical field from a record or column mapping, or None if absent."""
+    for alias in FIELD_ALIASES.get(canonical_name, [canonical_name]):
+        if alias in columns:
+            return columns[alias]
+    return None
+
+
+def find_field(payload: Any, canonical_name: str) -> Any | None:
+    """Searches a nested payload (e.g. a stock overview) for the first value of a canonical field."""
+    if isinstance(payload, dict):
+        value = resolve_field(payload, canonical_name)
+        if value is not None and not isinstance(value, (dict, list)):
+            return value
+        for nested in payload.values():
+            value = find_field(nested, canonical_name)
+            if value is not None:
+                return value
+    elif isinstance(payload, list):
+        for item in payload:
+            value = find_field(item, canonical_name)
+            if value is not None:
+                return value
+    return None
+
+
+def periods_per_year(dates: np.ndarray) -> int:
+    """Guesses whether reporting periods are quarters or years from their spacing."""
+    if len(dates) < 2:
+        return 4
+    spacing_days = np.median(np.diff(dates.astype("datetime64[D]").astype(np.int64)))
+    return 1 if spacing_days > 200 else 4
+
+
+def trailing_sum(values: np.ndarray, window: int = 4) -> np.ndarray:
+    """Rolling sum over the last `window` periods, NaN until `window` periods are available."""
+    values = np.asarray(values, dtype=float)
+    result = np.full(values.shape, np.nan)
+    if len(values) < window:
+        return result
+    cumulative = np.concatenate([[0.0], np.cumsum(values)])
+    result[window - 1:] = cumulative[window:] - cumulative[:-window]
+    return result
+
+
+def safe_divide(numerator, denominator):
+    """Element-wise division returning NaN where the denominator is zero or missing."""
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator != 0, numerator / denominator, np.nan)
@@ -0,0 +1,195 @@
+from typing import Any
+import warnings
+
+import numpy as np
+
+from services.analytics.formatting import round_values
+from services.analytics.fundamentals import (
+    find_field,
+    periods_per_year,
+    resolve_field,
+    safe_divide,
+    trailing_sum,
+)
+
+
+# Metric name -> (category, whether higher values are better)
+PEER_METRICS: dict[str, tuple[str, bool]] = {
+    "pe_ratio": ("valuation", False),
+    "price_to_sales": ("valuation", False),
+    "ev_to_ebitda": ("valuation", False),
+    "fcf_yield": ("valuation", True),
+    "gross_margin": ("profitability", True),
+    "operating_margin": ("profitability", True),
+    "net_margin": ("profitability", True),
+    "fcf_margin": ("profitability", True),
+    "return_on_equity": ("profitability", True),
+    "revenue_growth_yoy": ("growth", True),
+    "net_income_growth_yoy": ("growth", True),
+    "debt_to_equity": ("leverage", False),
+    "net_debt_to_ebitda": ("leverage", False),
+    "current_ratio": ("leverage", True),
+}
+
+
+def _column(columns: dict[str, np.ndarray], canonical_name: str, length: int) -> np.ndarray:
+    values = resolve_field(columns, canonical_name)
+    return np.asarray(values, dtype=float) if values is not None else np.full(length, np.nan)
+
+
+def compute_peer_metrics(dates: np.ndarray, columns: dict[str, np.ndarray], overview: Any) -> dict[str, float]:
+    """
+    Computes the peer comparison metrics of one company from its financial statement
+    series (one row per reporting period) and its stock overview.
+
+    Flow figures are trailing twelve months, balances are from the latest period.
+    """
+    length = len(dates)
+    if length == 0:
+        return {metric: np.nan for metric in PEER_METRICS}
+
+    window = periods_per_year(dates)
+
+    def ttm(name: str) -> np.ndarray:
+        return trailing_sum(_column(columns, name, length), window)
+
+    def latest(values: np.ndarray) -> float:
+        return float(values[-1])
+
+    def year_ago(values: np.ndarray) -> float:
+        return float(values[-1 - window]) if length > window else np.nan
+
+    revenue = ttm("revenue")
+    net_income = ttm("net_income")
+    operating_income = ttm("operating_income")
+    gross_profit = ttm("gross_profit")
+    if np.isnan(latest(gross_profit)):
+        gross_profit = revenue - ttm("cost_of_revenue")
+    ebitda = ttm("ebitda")
+    if np.isnan(latest(ebitda)):
+        ebitda = operating_income + ttm("depreciation_and_amortization")
+    free_cash_flow = ttm("free_cash_flow")
+    if np.isnan(latest(free_cash_flow)):
+        free_cash_flow = ttm("operating_cash_flow") - np.abs(ttm("capital_expenditure"))
+
+    total_debt = _column(columns, "total_debt", length)
+    if np.isnan(latest(total_debt)):
+        total_debt = np.nan_to_num(_column(columns, "long_term_debt", length)) + np.nan_to_num(_column(columns, "short_term_debt", length))
+    cash = _column(columns, "cash_and_equivalents", length)
+    equity = _column(columns, "total_equity", length)
+    net_debt = latest(total_debt) - np.nan_to_num(latest(cash))
+
+    market_cap = find_field(overview, "market_cap")
+    market_cap = float(market_cap) if isinstance(market_cap, (int, float)) else np.nan
+    enterprise_value = market_cap + net_debt
+
+    metrics = {
+        "pe_ratio": safe_divide(market_cap, latest(net_income)),
+        "price_to_sales": safe_divide(market_cap, latest(revenue)),
+        "ev_to_ebitda": safe_divide(enterprise_value, latest(ebitda)),
+        "fcf_yield": safe_divide(latest(free_cash_flow), market_cap),
+        "gross_margin": safe_divide(latest(gross_profit), latest(revenue)),
+        "operating_margin": safe_divide(latest(operating_income), latest(revenue)),
+        "net_margin": safe_divide(latest(net_income), latest(revenue)),
+        "fcf_margin": safe_divide(latest(free_cash_flow), latest(revenue)),
+        "return_on_equity": safe_divide(latest(net_income), latest(equity)),
+        "revenue_growth_yoy": safe_divide(latest(revenue), year_ago(revenue)) - 1,
+        "net_income_growth_yoy": safe_divide(latest(net_income) - year_ago(net_income), abs(year_ago(net_income))),
+        "debt_to_equity": safe_divide(latest(total_debt), latest(equity)),
+        "net_debt_to_ebitda": safe_divide(net_debt, latest(ebitda)),
+        "current_ratio": safe_divide(
+            latest(_column(columns, "current_assets", length)),
+            latest(_column(columns, "current_liabilities", length)),
+        ),
+    }
+    # Negative earnings make P/E and EV/EBITDA meaningless
+    if latest(net_income) <= 0:
+        metrics["pe_ratio"] = np.nan
+    if latest(ebitda) <= 0:
+        metrics["ev_to_ebitda"] = np.nan
+    return {metric: float(value) for metric, value in metrics.items()}
+
+
+def percentile_ranks(matrix: np.ndarray) -> np.ndarray:
+    """
+    Percentile rank (0 to 1) of every value within its column, ignoring NaNs.
+    Ties get the average rank.
+    """
+    valid = ~np.isnan(matrix)
+    counts = valid.sum(axis=0)
+    # (N, N, M) pairwise comparisons within every column; comparisons with NaN are False
+    below = (matrix[None, :, :] < matrix[:, None, :]).sum(axis=1)
+    at_most = (matrix[None, :, :] <= matrix[:, None, :]).sum(axis=1)
+    ranks = (below + at_most - 1) / 2 / np.maximum(counts - 1, 1)
+    return np.where(valid, ranks, np.nan)
+
+
+def build_peer_comparison(
+    tickers: list[str],
+    metrics: list[dict[str, float]],
+    target: str | None = None,
+) -> dict:
+    """
+    Builds the peer ratio matrix and ranks every company against the group.
+
+    Percentile ranks and z-scores are oriented so that higher is better for every
+    metric (e.g. a low P/E gets a high rank), which makes rows comparable at a glance.
+
+    Args:
+        tickers: The tickers of the peer group.
+        metrics: The metrics of every ticker, as returned by compute_peer_metrics.
+        target: The ticker the comparison is centered on, if any.
+
+    Returns:
+        Compact tables of the values, percentile ranks and z-scores, the peer
+        medians, and a summary of the target's position in every category.
+    """
+    metric_names = list(PEER_METRICS)
+    # (companies, metrics) matrix
+    matrix = np.array([[company.get(name, np.nan) for name in metric_names] for company in metrics], dtype=float)
+    higher_is_better = np.array([PEER_METRICS[name][1] for name in metric_names])
+    # Rounded so that ratios equal up to floating point noise tie instead of being ranked apart
+    oriented = np.round(np.where(higher_is_better, matrix, -matrix), 6)
+
+    # Metrics no peer has data for are all-NaN columns, which NumPy warns about
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)
+        means = np.nanmean(oriented, axis=0)
+        stds = np.nanstd(oriented, axis=0)
+        z_scores = np.where(stds > 0, (oriented - means) / stds, 0.0)
+        medians = np.nanmedian(matrix, axis=0)
+    z_scores = np.where(np.isnan(matrix), np.nan, z_scores)
+    ranks = percentile_ranks(oriented)
+
+    def table(values: np.ndarray, digits: int) -> dict:
+        return {
+            "columns": ["ticker"] + metric_names,
+            "rows": [[ticker] + round_values(row, digits) for ticker, row in zip(tickers, values)],
+        }
+
+    result: dict[str, Any] = {
+        "metric_categories": {name: PEER_METRICS[name][0] for name in metric_names},
+        "values": table(matrix, 4),
+        "percentile_ranks": table(ranks, 2),
+        "z_scores": table(z_scores, 2),
+        "peer_median": dict(zip(metric_names, round_values(medians, 4))),
+        "note": "Percentile ranks and z-scores are oriented so that higher is better (e.g. a lower P/E ranks higher).",
+    }
+
+    if target in tickers:
+        target_index = tickers.index(target)
+        categories = sorted({category for category, _ in PEER_METRICS.values()})
+        result["target_summary"] = {}
+        for category in categories:
+            category_columns = [j for j, name in enumerate(metric_names) if PEER_METRICS[name][0] == category]
+            target_ranks = ranks[target_index, category_columns]
+            if np.all(np.isnan(target_ranks)):
+                continue
+            average_rank = float(np.nanmean(target_ranks))
+            position = "Above peers" if average_rank >= 0.67 else "Below peers" if average_rank <= 0.33 else "In-line with peers"
+            result["target_summary"][category] = {
+                "average_percentile_rank": round_values(average_rank, 2),
+                "position": position,
+            }
+
+    return result
@@ -0,0 +1,194 @@
+from statistics import NormalDist
+
+import numpy as np
+
+from services.analytics.formatting import round_values
+
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def align_prices(dates: list[np.ndarray], closes: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Aligns several close series on the dates they all have in common.
+
+    Returns:
+        The common dates, shape (T,), and the price matrix, shape (T, N).
+    """
+    common_dates = dates[0]
+    for series_dates in dates[1:]:
+        common_dates = np.intersect1d(common_dates, series_dates, assume_unique=True)
+
+    prices = np.column_stack([
+        series_closes[np.searchsorted(series_dates, common_dates)]
+        for series_dates, series_closes in zip(dates, closes)
+    ])
+    return common_dates, prices
+
+
+def max_drawdown(returns: np.ndarray) -> np.ndarray:
+    """Maximum peak-to-trough decline of every column of a (T, N) return matrix, as a positive fraction."""
+    wealth = np.cumprod(1 + returns, axis=0)
+    wealth = np.vstack([np.ones((1,) + wealth.shape[1:]), wealth])
+    peaks = np.maximum.accumulate(wealth, axis=0)
+    return np.max(1 - wealth / peaks, axis=0)
+
+
+def compute_portfolio_risk(
+    tickers: list[str],
+    values: np.ndarray,
+    dates: list[np.ndarray],
+    closes: list[np.ndarray],
+    benchmark_dates: np.ndarray | None = None,
+    benchmark_closes: np.ndarray | None = None,
+    confidence_level: float = 0.95,
+    horizon_days: int = 1,
+    sectors: list[str | None] | None = None,
+) -> dict:
+    """
+    Computes the risk profile of a portfolio from the daily closes of its holdings.
+
+    All statistics are computed on the dates every holding (and the benchmark) has
+    a price for, in a handful of matrix operations over the (T, N) return matrix.
+
+    Args:
+        tickers: The tickers of the holdings.
+        values: The market value of every holding, used as portfolio weights. They must not be
+            negative and their total must be positive.
+        dates: The dates of every holding's close series.
+        closes: The close series of every holding.
+        benchmark_dates: The dates of the benchmark close series, for betas.
+        benchmark_closes: The benchmark close series.
+        confidence_level: Confidence level of VaR and CVaR.
+        horizon_days: Horizon of VaR and CVaR in trading days (square-root-of-time scaling).
+        sectors: Optional sector of every holding, for sector concentration.
+
+    Returns:
+        A dict with portfolio level metrics, a per position table, the correlation
+        matrix, concentration metrics and the data window used.
+
+    Raises:
+        ValueError: On invalid position values or too little overlapping history.
+    """
+    values = np.asarray(values, dtype=float)
+    invalid = [ticker for ticker, value in zip(tickers, values) if not np.isfinite(value) or value < 0]
+    if invalid:
+        raise ValueError(f"Position values must be finite and not negative, short positions aren't supported: {', '.join(invalid)}")
+    if values.sum() <= 0:
+        raise ValueError("The positions have no market value, the portfolio weights can't be computed")
+    weights = values / values.sum()
+
+    has_benchmark = benchmark_dates is not None and benchmark_closes is not None
+    series_dates = dates + [benchmark_dates] if has_benchmark else dates
+    series_closes = closes + [benchmark_closes] if has_benchmark else closes
+    common_dates, prices = align_prices(series_dates, series_closes)
+    if len(common_dates) < 3:
+        raise ValueError("Not enough overlapping price history to compute risk metrics")
+
+    # (T, N) daily simple returns
+    returns = prices[1:] / prices[:-1] - 1
+    benchmark_returns = returns[:, -1] if has_benchmark else None
+    asset_returns = returns[:, :-1] if has_benchmark else returns
+
+    covariance = np.atleast_2d(np.cov(asset_returns, rowvar=False))
+    volatilities = np.sqrt(np.diag(covariance))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        correlation = covariance / np.outer(volatilities, volatilities)
+
+    portfolio_returns = asset_returns @ weights
+    portfolio_variance = weights @ covariance @ weights
+    portfolio_volatility = np.sqrt(portfolio_variance)
+    # Share of the portfolio variance each position is responsible for
+    risk_contributions = weights * (covariance @ weights) / portfolio_variance if portfolio_variance > 0 else np.zeros_like(weights)
+
+    alpha = 1 - confidence_level
+    horizon_scale = np.sqrt(horizon_days)
+    historical_var = -np.percentile(portfolio_returns, 100 * alpha)
+    tail = portfolio_returns[portfolio_returns <= -historical_var]
+    historical_cvar = -tail.mean() if tail.size else historical_var
+    z = NormalDist().inv_cdf(alpha)
+    mean_return = portfolio_returns.mean()
+    parametric_var = -(mean_return + z * portfolio_volatility)
+    parametric_cvar = -(mean_return - portfolio_volatility * NormalDist().pdf(z) / alpha)
+
+    drawdowns = max_drawdown(np.column_stack([asset_returns, portfolio_returns]))
+    annualization = np.sqrt(TRADING_DAYS_PER_YEAR)
+
+    betas = None
+    portfolio_beta = None
+    if has_benchmark:
+        benchmark_variance = benchmark_returns.var(ddof=1)
+        centered_benchmark = benchmark_returns - benchmark_returns.mean()
+        covariances_to_benchmark = (asset_returns - asset_returns.mean(axis=0)).T @ centered_benchmark / (len(benchmark_returns) - 1)
+        betas = covariances_to_benchmark / benchmark_variance
+        portfolio_beta = float(weights @ betas)
+
+    portfolio = {
+        "annualized_volatility": round_values(portfolio_volatility * annualization, 4),
+        "annualized_return": round_values((1 + mean_return) ** TRADING_DAYS_PER_YEAR - 1, 4),
+        "max_drawdown": round_values(drawdowns[-1], 4),
+        "var": {
+            "confidence_level": confidence_level,
+            "horizon_days": horizon_days,
+            "historical": round_values(historical_var * horizon_scale, 4),
+            "parametric": round_values(parametric_var * horizon_scale, 4),
+        },
+        "cvar": {
+            "historical": round_values(historical_cvar * horizon_scale, 4),
+            "parametric": round_values(parametric_cvar * horizon_scale, 4),
+        },
+        "var_amount": round_values(historical_var * horizon_scale * values.sum()),
+    }
+    if portfolio_beta is not None:
+        portfolio["beta"] = round_values(portfolio_beta, 3)
+
+    columns = ["ticker", "weight", "annualized_volatility", "max_drawdown", "risk_contribution"]
+    if betas is not None:
+        columns.append("beta")
+    rows = []
+    for i, ticker in enumerate(tickers):
+        row = [
+            ticker,
+            round_values(weights[i], 4),
+            round_values(volatilities[i] * annualization, 4),
+            round_values(drawdowns[i], 4),
+            round_values(risk_contributions[i], 4),
+        ]
+        if betas is not None:
+            row.append(round_values(betas[i], 3))
+        rows.append(row)
+
+    herfindahl = float(np.sum(weights ** 2))
+    sorted_weights = np.sort(weights)[::-1]
+    concentration = {
+        "herfindahl_index": round_values(herfindahl, 4),
+        "effective_number_of_positions": round_values(1 / herfindahl, 2),
+        "largest_position": tickers[int(np.argmax(weights))],
+        "largest_weight": round_values(sorted_weights[0], 4),
+        "top_5_weight": round_values(sorted_weights[:5].sum(), 4),
+        # Average pairwise correlation, weighted by position size
+        "weighted_avg_correlation": round_values(
+            (weights @ np.nan_to_num(correlation) @ weights - np.sum(weights ** 2)) / (1 - np.sum(weights ** 2)), 3
+        ) if len(tickers) > 1 else None,
+        "diversification_ratio": round_values((weights @ volatilities) / portfolio_volatility, 3) if portfolio_volatility > 0 else None,
+    }
+    if sectors and any(sectors):
+        sector_names = np.array([sector or "Unknown" for sector in sectors])
+        unique_sectors = np.unique(sector_names)
+        sector_weights = np.array([weights[sector_names == sector].sum() for sector in unique_sectors])
+        order = np.argsort(sector_weights)[::-1]
+        concentration["sector_weights"] = {
+            str(unique_sectors[i]): round_values(sector_weights[i], 4) for i in order
+        }
+
+    return {
+        "portfolio": portfolio,
+        "positions": {"columns": columns, "rows": rows},
+        "correlation": {"tickers": tickers, "matrix": round_values(correlation, 2)},
+        "concentration": concentration,
+        "data_window": {
+            "start": str(common_dates[0]),
+            "end": str(common_dates[-1]),
+            "observations": int(len(returns)),
+        },
+    }
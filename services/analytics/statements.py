@@ -0,0 +1,268 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from enum import Enum
+
+import numpy as np
+
+from config import settings
+from services.analytics.formatting import round_values
+from services.analytics.fundamentals import (
+    FIELD_ALIASES,
+    FLOW_FIELDS,
+    periods_per_year,
+    resolve_field,
+    safe_divide,
+    trailing_sum,
+)
+from services.series_store import ColumnarSeries
+
+
+# Market fields of FIELD_ALIASES are not part of the financial statements
+STATEMENT_FIELDS = [field for field in FIELD_ALIASES if field not in {"market_cap", "price", "sector"}]
+# Cash outflows that APIs report with either sign, normalized to positive amounts
+_OUTFLOW_FIELDS = {"capital_expenditure", "dividends_paid", "share_repurchases", "interest_expense"}
+
+
+class RatioBasis(str, Enum):
+    TTM = "ttm"              # Flows summed over the trailing twelve months
+    QUARTERLY = "quarterly"  # Flows of the reporting period itself
+
+
+class RatioSet(str, Enum):
+    BALANCE_SHEET = "balance_sheet"
+    INCOME_STATEMENT = "income_statement"
+    CASH_FLOW = "cash_flow"
+    EARNINGS_QUALITY = "earnings_quality"
+
+
+RATIO_SETS: dict[RatioSet, list[str]] = {
+    RatioSet.BALANCE_SHEET: [
+        "current_ratio", "quick_ratio", "cash_ratio", "working_capital",
+        "debt_to_equity", "debt_to_assets", "liabilities_to_equity", "net_debt", "net_debt_to_ebitda",
+        "goodwill_and_intangibles_to_equity", "tangible_equity", "return_on_equity", "return_on_assets",
+    ],
+    RatioSet.INCOME_STATEMENT: [
+        "revenue", "revenue_growth_yoy", "gross_margin", "operating_margin", "ebitda_margin", "net_margin",
+        "operating_income_growth_yoy", "net_income_growth_yoy", "eps_diluted", "eps_growth_yoy",
+        "interest_coverage", "effective_tax_rate", "sbc_to_revenue",
+    ],
+    RatioSet.CASH_FLOW: [
+        "operating_cash_flow", "capital_expenditure", "free_cash_flow", "ocf_margin", "fcf_margin",
+        "capex_to_revenue", "capex_to_depreciation", "fcf_to_net_income",
+        "dividends_paid", "share_repurchases", "shareholder_returns_to_fcf", "sbc_to_ocf",
+    ],
+    RatioSet.EARNINGS_QUALITY: [
+        "accruals_ratio", "ocf_to_net_income", "fcf_to_net_income", "revenue_growth_yoy",
+        "receivables_growth_yoy", "days_sales_outstanding", "days_inventory_outstanding",
+        "sbc_to_net_income", "gross_margin", "operating_margin",
+    ],
+}
+
+
+@dataclass
+class NormalizedStatements:
+    """
+    Financial statements in a canonical schema: one float64 array per canonical field
+    of FIELD_ALIASES, aligned on the reporting period end dates (NaN when a period
+    doesn't report the field). Outflows are positive amounts.
+    """
+    ticker: str
+    period_ends: np.ndarray         # datetime64[D], ascending
+    periods_per_year: int           # 4 for quarterly statements, 1 for annual ones
+    fields: dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.period_ends)
+
+
+def normalize_statements(ticker: str, financials: ColumnarSeries) -> NormalizedStatements:
+    """
+    Maps the raw fields of a financial statements series onto the canonical schema
+    and derives the standard fields a payload doesn't report directly (gross profit,
+    EBITDA, free cash flow, total debt) from their components.
+    """
+    length = len(financials)
+
+    def column(name: str) -> np.ndarray:
+        values = resolve_field(financials.columns, name)
+        values = np.array(values, dtype=float) if values is not None else np.full(length, np.nan)
+        return np.abs(values) if name in _OUTFLOW_FIELDS else values
+
+    fields = {name: column(name) for name in STATEMENT_FIELDS}
+
+    def fill(name: str, derived: np.ndarray) -> None:
+        fields[name] = np.where(np.isnan(fields[name]), derived, fields[name])
+
+    fill("gross_profit", fields["revenue"] - fields["cost_of_revenue"])
+    fill("cost_of_revenue", fields["revenue"] - fields["gross_profit"])
+    fill("ebitda", fields["operating_income"] + fields["depreciation_and_amortization"])
+    fill("free_cash_flow", fields["operating_cash_flow"] - fields["capital_expenditure"])
+    fill("total_debt", np.nan_to_num(fields["long_term_debt"]) + np.nan_to_num(fields["short_term_debt"]))
+    # Don't report zero debt when neither component is reported
+    fields["total_debt"] = np.where(
+        np.isnan(fields["long_term_debt"]) & np.isnan(fields["short_term_debt"]) & (fields["total_debt"] == 0),
+        np.nan,
+        fields["total_debt"],
+    )
+
+    return NormalizedStatements(
+        ticker=ticker.upper(),
+        period_ends=np.asarray(financials.dates, dtype="datetime64[D]"),
+        periods_per_year=periods_per_year(financials.dates),
+        fields=fields,
+    )
+
+
+def _shift(values: np.ndarray, periods: int) -> np.ndarray:
+    """The values `periods` rows earlier, NaN for the first rows."""
+    shifted = np.full(values.shape, np.nan)
+    if periods < len(values):
+        shifted[periods:] = values[:len(values) - periods]
+    return shifted
+
+
+def compute_ratios(statements: NormalizedStatements, basis: RatioBasis = RatioBasis.TTM) -> dict[str, np.ndarray]:
+    """
+    Computes every ratio of RATIO_SETS for every reporting period in one vectorized
+    pass over the period arrays.
+
+    With the TTM basis, flows are summed over the trailing twelve months and averaged
+    balances span the same twelve months; with the quarterly basis they cover the
+    reporting period. Balances are always the period end values.
+
+    Returns:
+        Ratio name to a (P,) array aligned with statements.period_ends.
+    """
+    fields = statements.fields
+    year = statements.periods_per_year
+    window = year if basis == RatioBasis.TTM else 1
+    days_in_window = 365 * window / year
+
+    flow = {
+        name: trailing_sum(values, window) if name in FLOW_FIELDS and window > 1 else values
+        for name, values in fields.items()
+    }
+    revenue, net_income, ebitda = flow["revenue"], flow["net_income"], flow["ebitda"]
+    operating_cash_flow, free_cash_flow = flow["operating_cash_flow"], flow["free_cash_flow"]
+    total_debt, equity, total_assets = fields["total_debt"], fields["total_equity"], fields["total_assets"]
+    net_debt = total_debt - np.nan_to_num(fields["cash_and_equivalents"])
+    average_assets = (total_assets + _shift(total_assets, window)) / 2
+    average_equity = (equity + _shift(equity, window)) / 2
+
+    def growth(values: np.ndarray) -> np.ndarray:
+        previous = _shift(values, year)
+        return safe_divide(values - previous, np.abs(previous))
+
+    def positive(values: np.ndarray) -> np.ndarray:
+        """Denominators that make a ratio meaningless when negative (e.g. P/E style ratios)."""
+        return np.where(values > 0, values, np.nan)
+
+    ratios = {
+        # Balance sheet
+        "current_ratio": safe_divide(fields["current_assets"], fields["current_liabilities"]),
+        "quick_ratio": safe_divide(fields["current_assets"] - np.nan_to_num(fields["inventory"]), fields["current_liabilities"]),
+        "cash_ratio": safe_divide(fields["cash_and_equivalents"], fields["current_liabilities"]),
+        "working_capital": fields["current_assets"] - fields["current_liabilities"],
+        "debt_to_equity": safe_divide(total_debt, positive(equity)),
+        "debt_to_assets": safe_divide(total_debt, total_assets),
+        "liabilities_to_equity": safe_divide(fields["total_liabilities"], positive(equity)),
+        "net_debt": net_debt,
+        "net_debt_to_ebitda": safe_divide(net_debt, positive(ebitda)),
+        "goodwill_and_intangibles_to_equity": safe_divide(fields["goodwill_and_intangibles"], positive(equity)),
+        "tangible_equity": equity - np.nan_to_num(fields["goodwill_and_intangibles"]),
+        "return_on_equity": safe_divide(net_income, positive(average_equity)),
+        "return_on_assets": safe_divide(net_income, average_assets),
+        # Income statement
+        "revenue": revenue,
+        "revenue_growth_yoy": growth(revenue),
+        "gross_margin": safe_divide(flow["gross_profit"], revenue),
+        "operating_margin": safe_divide(flow["operating_income"], revenue),
+        "ebitda_margin": safe_divide(ebitda, revenue),
+        "net_margin": safe_divide(net_income, revenue),
+        "operating_income_growth_yoy": growth(flow["operating_income"]),
+        "net_income_growth_yoy": growth(net_income),
+        "eps_diluted": flow["eps_diluted"],
+        "eps_growth_yoy": growth(flow["eps_diluted"]),
+        "interest_coverage": safe_divide(flow["operating_income"], flow["interest_expense"]),
+        "effective_tax_rate": safe_divide(flow["income_tax_expense"], positive(net_income + flow["income_tax_expense"])),
+        "sbc_to_revenue": safe_divide(flow["stock_based_compensation"], revenue),
+        # Cash flow statement
+        "operating_cash_flow": operating_cash_flow,
+        "capital_expenditure": flow["capital_expenditure"],
+        "free_cash_flow": free_cash_flow,
+        "ocf_margin": safe_divide(operating_cash_flow, revenue),
+        "fcf_margin": safe_divide(free_cash_flow, revenue),
+        "capex_to_revenue": safe_divide(flow["capital_expenditure"], revenue),
+        "capex_to_depreciation": safe_divide(flow["capital_expenditure"], flow["depreciation_and_amortization"]),
+        "fcf_to_net_income": safe_divide(free_cash_flow, positive(net_income)),
+        "dividends_paid": flow["dividends_paid"],
+        "share_repurchases": flow["share_repurchases"],
+        "shareholder_returns_to_fcf": safe_divide(
+            np.nan_to_num(flow["dividends_paid"]) + np.nan_to_num(flow["share_repurchases"]), positive(free_cash_flow),
+        ),
+        "sbc_to_ocf": safe_divide(flow["stock_based_compensation"], positive(operating_cash_flow)),
+        # Earnings quality
+        "accruals_ratio": safe_divide(net_income - operating_cash_flow, average_assets),
+        "ocf_to_net_income": safe_divide(operating_cash_flow, positive(net_income)),
+        "receivables_growth_yoy": growth(fields["receivables"]),
+        "days_sales_outstanding": safe_divide(fields["receivables"] * days_in_window, revenue),
+        "days_inventory_outstanding": safe_divide(fields["inventory"] * days_in_window, flow["cost_of_revenue"]),
+        "sbc_to_net_income": safe_divide(flow["stock_based_compensation"], positive(net_income)),
+    }
+    return {name: np.asarray(values, dtype=float) for name, values in ratios.items()}
+
+
+class FinancialRatioCache:
+    """
+    In-process LRU cache of computed ratios per (ticker, basis, last reporting period).
+    A newly reported period changes the key, so entries never need invalidating.
+    """
+
+    def __init__(self, max_entries: int = settings.FINANCIAL_RATIO_CACHE_MAX_ENTRIES):
+        self._max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str, str], tuple[np.ndarray, dict[str, np.ndarray]]] = OrderedDict()
+
+    def get_or_compute(
+        self,
+        statements: NormalizedStatements,
+        basis: RatioBasis,
+    ) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+        """Returns the period end dates and the ratios of the statements, computing them on a miss."""
+        last_period = str(statements.period_ends[-1]) if len(statements) else ""
+        key = (statements.ticker, basis.value, last_period)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+
+        entry = (statements.period_ends, compute_ratios(statements, basis))
+        self._entries[key] = entry
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+
+def build_ratio_tables(
+    period_ends: np.ndarray,
+    ratios: dict[str, np.ndarray],
+    ratio_sets: list[RatioSet],
+    periods: int = 4,
+) -> dict:
+    """
+    Builds one compact table per ratio set with a row per ratio and a column per
+    reporting period, most recent period last. Ratios the statements don't have the
+    data for in any of these periods are left out.
+    """
+    selected = slice(max(len(period_ends) - periods, 0), None)
+    columns = ["ratio"] + [str(date) for date in period_ends[selected]]
+    tables = {}
+    for ratio_set in ratio_sets:
+        rows = [[name] + round_values(ratios[name][selected], 4) for name in RATIO_SETS[ratio_set]]
+        tables[ratio_set.value] = {
+            "columns": columns,
+            "rows": [row for row in rows if any(value is not None for value in row[1:])],
+        }
+    return tables
+
+
+financial_ratio_cache = FinancialRatioCache()
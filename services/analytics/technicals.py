@@ -0,0 +1,182 @@
+import numpy as np
+
+from services.analytics.formatting import round_values
+
+
+TRADING_DAYS_PER_YEAR = 252
+# Trading days of the trailing returns reported for every ticker
+RETURN_PERIODS = {"1m": 21, "3m": 63, "6m": 126, "1y": 252}
+# Bars back to look for moving average crossovers
+CROSSOVER_LOOKBACK = 20
+
+
+def rolling_means(closes: np.ndarray, windows: list[int]) -> np.ndarray:
+    """
+    Simple moving averages of a close series for several windows at once.
+
+    Returns:
+        A (W, T) array, NaN until a window has enough bars.
+    """
+    cumulative = np.concatenate([[0.0], np.cumsum(closes)])
+    means = np.full((len(windows), len(closes)), np.nan)
+    for i, window in enumerate(windows):
+        if window <= len(closes):
+            means[i, window - 1:] = (cumulative[window:] - cumulative[:-window]) / window
+    return means
+
+
+def rolling_stds(closes: np.ndarray, window: int) -> np.ndarray:
+    """Population standard deviation over a rolling window, NaN until the window is full."""
+    stds = np.full(len(closes), np.nan)
+    if window <= len(closes):
+        stds[window - 1:] = np.lib.stride_tricks.sliding_window_view(closes, window).std(axis=1)
+    return stds
+
+
+def exponential_means(values: np.ndarray, alphas: np.ndarray) -> np.ndarray:
+    """
+    Exponential moving averages of one or several series for several smoothing
+    factors at once, seeded with the first value.
+
+    Args:
+        values: The (T,) series, or (S, T) series.
+        alphas: The (W,) smoothing factors, 2 / (span + 1) for the usual EMA.
+
+    Returns:
+        A (W, T) array, or (W, S, T) for several series.
+    """
+    values = np.asarray(values, dtype=float)
+    alphas = np.asarray(alphas, dtype=float).reshape((-1,) + (1,) * (values.ndim - 1))
+    means = np.empty((alphas.shape[0],) + values.shape)
+    if values.shape[-1] == 0:
+        return means
+    means[..., 0] = values[..., 0]
+    # The recursion runs over time, every step is vectorized over the windows and series
+    for t in range(1, values.shape[-1]):
+        means[..., t] = alphas * values[..., t] + (1 - alphas) * means[..., t - 1]
+    return means
+
+
+def relative_strength_index(closes: np.ndarray, window: int = 14) -> float:
+    """Wilder's RSI of the last bar."""
+    if len(closes) <= window:
+        return np.nan
+    changes = np.diff(closes)
+    # (2, T) gains and losses, seeded with the mean of the first window
+    moves = np.vstack([np.clip(changes, 0, None), np.clip(-changes, 0, None)])
+    seeded = np.concatenate([moves[:, :window].mean(axis=1, keepdims=True), moves[:, window:]], axis=1)
+    # Wilder's smoothing is an EMA with alpha = 1 / window
+    average_gain, average_loss = exponential_means(seeded, [1 / window])[0, :, -1]
+    if average_loss == 0:
+        return 100.0 if average_gain > 0 else 50.0
+    return float(100 - 100 / (1 + average_gain / average_loss))
+
+
+def _last_crossover(fast: np.ndarray, slow: np.ndarray) -> tuple[str, int] | None:
+    """The direction and age in bars of the last crossover of two series within CROSSOVER_LOOKBACK bars."""
+    sign = np.sign(fast - slow)
+    recent = sign[-(CROSSOVER_LOOKBACK + 1):]
+    valid = ~np.isnan(recent)
+    recent = recent[valid]
+    changes = np.flatnonzero((recent[1:] != recent[:-1]) & (recent[1:] != 0))
+    if not len(changes):
+        return None
+    last = changes[-1] + 1
+    return ("bullish" if recent[last] > 0 else "bearish"), int(len(recent) - 1 - last)
+
+
+def summarize_indicators(
+    closes: np.ndarray,
+    sma_windows: list[int],
+    ema_windows: list[int],
+    rsi_window: int = 14,
+    macd_windows: tuple[int, int, int] = (12, 26, 9),
+    bollinger_window: int = 20,
+    bollinger_std: float = 2.0,
+) -> tuple[dict[str, float | None], list[str]]:
+    """
+    Computes the latest value of a batch of technical indicators of one close series.
+
+    Every moving average is computed over the whole series in one pass, but only the
+    values of the last bar are returned, together with the trend signals (price vs
+    moving averages, crossovers, overbought / oversold) they imply.
+
+    Args:
+        closes: The daily closes, oldest first.
+        sma_windows: Simple moving average windows in bars.
+        ema_windows: Exponential moving average spans in bars.
+        rsi_window: RSI window in bars.
+        macd_windows: MACD fast span, slow span and signal span.
+        bollinger_window: Bollinger band window in bars.
+        bollinger_std: Bollinger band width in standard deviations.
+
+    Returns:
+        The indicator values by name (None when there aren't enough bars), and the signals.
+    """
+    closes = np.asarray(closes, dtype=float)
+    last_close = closes[-1]
+    indicators: dict[str, float] = {"close": last_close}
+    signals: list[str] = []
+
+    smas = rolling_means(closes, sma_windows)
+    for window, sma in zip(sma_windows, smas):
+        indicators[f"sma_{window}"] = sma[-1]
+        indicators[f"close_vs_sma_{window}"] = last_close / sma[-1] - 1
+
+    fast_span, slow_span, signal_span = macd_windows
+    spans = list(ema_windows) + [fast_span, slow_span]
+    emas = exponential_means(closes, 2 / (np.array(spans) + 1))
+    for span, ema in zip(ema_windows, emas):
+        indicators[f"ema_{span}"] = ema[-1]
+
+    macd_line = emas[-2] - emas[-1]
+    signal_line = exponential_means(macd_line[slow_span - 1:], [2 / (signal_span + 1)])[0] if len(closes) >= slow_span else np.array([np.nan])
+    indicators["macd"] = macd_line[-1] if len(closes) >= slow_span else np.nan
+    indicators["macd_signal"] = signal_line[-1]
+    indicators["macd_histogram"] = indicators["macd"] - indicators["macd_signal"]
+
+    indicators["rsi"] = relative_strength_index(closes, rsi_window)
+
+    middle = rolling_means(closes, [bollinger_window])[0, -1]
+    width = bollinger_std * rolling_stds(closes, bollinger_window)[-1]
+    indicators["bollinger_upper"] = middle + width
+    indicators["bollinger_lower"] = middle - width
+    # Position of the close within the bands: 0 at the lower band, 1 at the upper band
+    indicators["bollinger_percent_b"] = (last_close - (middle - width)) / (2 * width) if width > 0 else np.nan
+
+    for period, bars in RETURN_PERIODS.items():
+        indicators[f"return_{period}"] = last_close / closes[-1 - bars] - 1 if len(closes) > bars else np.nan
+    year = closes[-TRADING_DAYS_PER_YEAR:]
+    indicators["high_52w"] = year.max()
+    indicators["low_52w"] = year.min()
+    indicators["close_vs_high_52w"] = last_close / year.max() - 1
+    daily_returns = closes[1:] / closes[:-1] - 1
+    indicators["volatility_annualized"] = daily_returns[-TRADING_DAYS_PER_YEAR:].std(ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR) if len(daily_returns) > 1 else np.nan
+
+    # Signals
+    for window, sma in zip(sma_windows, smas):
+        if last_close != sma[-1] and not np.isnan(sma[-1]):
+            signals.append(f"Close {'above' if last_close > sma[-1] else 'below'} SMA {window}")
+    sorted_windows = sorted(zip(sma_windows, smas), key=lambda item: item[0])
+    if len(sorted_windows) >= 2:
+        (fast_window, fast), (slow_window, slow) = sorted_windows[-2], sorted_windows[-1]
+        crossover = _last_crossover(fast, slow)
+        if crossover:
+            direction, age = crossover
+            name = "Golden cross" if direction == "bullish" else "Death cross"
+            signals.append(f"{name} (SMA {fast_window} / SMA {slow_window}) {age} bars ago")
+    if len(closes) >= slow_span:
+        crossover = _last_crossover(macd_line[slow_span - 1:], signal_line)
+        if crossover:
+            direction, age = crossover
+            signals.append(f"MACD {direction} crossover {age} bars ago")
+    if indicators["rsi"] >= 70:
+        signals.append("RSI overbought (>= 70)")
+    elif indicators["rsi"] <= 30:
+        signals.append("RSI oversold (<= 30)")
+    if indicators["bollinger_percent_b"] > 1:
+        signals.append("Close above the upper Bollinger band")
+    elif indicators["bollinger_percent_b"] < 0:
+        signals.append("Close below the lower Bollinger band")
+
+    return {name: round_values(value, 4) for name, value in indicators.items()}, signals
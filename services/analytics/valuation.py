@@ -0,0 +1,202 @@
+import numpy as np
+
+from services.analytics.formatting import round_values
+
+
+DEFAULT_MARGIN_OF_SAFETY_LEVELS = [0.2, 0.33, 0.5]
+
+
+def _margin_of_safety(current_price: float, value: float) -> float:
+    """1 - price / value, NaN when the intrinsic value isn't positive and no price is a bargain."""
+    return 1 - current_price / value if value > 0 else np.nan
+
+
+def _terminal_values(
+    final_cash_flows: np.ndarray,
+    discount_rates: np.ndarray,
+    terminal_growth_rates: np.ndarray | None,
+    terminal_multiple: float | None,
+) -> np.ndarray:
+    """
+    Terminal value at the end of the projection for every (discount rate, terminal growth) pair.
+
+    Args:
+        final_cash_flows: Cash flow of the last projected year, shape (S,) for S growth scenarios.
+        discount_rates: Shape (D,).
+        terminal_growth_rates: Shape (G,). Gordon growth model, ignored when terminal_multiple is given.
+        terminal_multiple: Exit multiple applied to the last projected cash flow.
+
+    Returns:
+        Array of shape (S, D, G). Pairs where the growth rate is not below the discount rate
+        (rejected by run_dcf_valuation) are NaN.
+    """
+    if terminal_multiple is not None:
+        shape = (final_cash_flows.size, discount_rates.size, 1)
+        return np.broadcast_to(final_cash_flows[:, None, None] * terminal_multiple, shape).copy()
+
+    if terminal_growth_rates is None:
+        return np.zeros((final_cash_flows.size, discount_rates.size, 1))
+
+    spread = discount_rates[:, None] - terminal_growth_rates[None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = final_cash_flows[:, None, None] * (1 + terminal_growth_rates[None, None, :]) / spread[None, :, :]
+    return np.where(spread[None, :, :] > 0, values, np.nan)
+
+
+def run_dcf_valuation(
+    base_cash_flow: float,
+    growth_rates: list[float],
+    discount_rate: float,
+    terminal_growth_rate: float | None = None,
+    terminal_multiple: float | None = None,
+    net_debt: float = 0.0,
+    shares_outstanding: float | None = None,
+    current_price: float | None = None,
+    mid_year_convention: bool = False,
+    scenarios: dict[str, list[float]] | None = None,
+    discount_rate_grid: list[float] | None = None,
+    terminal_growth_rate_grid: list[float] | None = None,
+    margin_of_safety_levels: list[float] | None = None,
+) -> dict:
+    """
+    Runs a complete DCF valuation in a single vectorized pass.
+
+    Every combination of growth scenario, discount rate and terminal growth rate is
+    valued at once with NumPy broadcasting: projected cash flows have shape (S, N),
+    discount factors (D, N) and terminal values (S, D, G), so the full sensitivity
+    matrix costs about as much as a single point estimate.
+
+    Args:
+        base_cash_flow: Cash flow of the base year (e.g. trailing free cash flow or earnings power).
+        growth_rates: Growth rate of every projected year, e.g. [0.10, 0.08, 0.06, 0.05, 0.04].
+            Pass an empty list for an earnings power value (no growth, perpetuity of the base cash flow).
+        discount_rate: Discount rate (cost of capital) of the base case.
+        terminal_growth_rate: Perpetual growth after the projection (Gordon growth model). It and
+            every rate of terminal_growth_rate_grid must be below every discount rate.
+        terminal_multiple: Exit multiple of the last projected cash flow. Overrides terminal_growth_rate.
+        net_debt: Debt minus excess cash, subtracted from enterprise value to get equity value.
+        shares_outstanding: If given, values are also reported per share.
+        current_price: If given together with shares_outstanding, margins of safety are reported.
+        mid_year_convention: Discount cash flows from the middle of each year.
+        scenarios: Additional named growth paths, e.g. {"bear": [...], "bull": [...]}.
+        discount_rate_grid: Discount rates for the sensitivity matrix.
+        terminal_growth_rate_grid: Terminal growth rates for the sensitivity matrix.
+        margin_of_safety_levels: Required margins for the buy-below price bands.
+
+    Returns:
+        A dict with the base case DCF table, the value summary of every scenario, the
+        sensitivity matrix and the margin of safety bands.
+    """
+    scenario_paths = {"base": growth_rates, **(scenarios or {})}
+    if len({len(path) for path in scenario_paths.values()}) > 1:
+        raise ValueError("All growth scenarios must have the same number of years as growth_rates")
+
+    if not growth_rates and terminal_growth_rate is None and terminal_multiple is None:
+        # Earnings power value: the base cash flow as a zero-growth perpetuity
+        terminal_growth_rate = 0.0
+
+    scenario_names = list(scenario_paths)
+    growth = np.asarray([scenario_paths[name] for name in scenario_names], dtype=float).reshape(len(scenario_names), -1)
+    years = np.arange(1, growth.shape[1] + 1, dtype=float)
+    discount_timing = years - 0.5 if mid_year_convention else years
+
+    rates = np.asarray(sorted({discount_rate, *(discount_rate_grid or [])}), dtype=float)
+    terminal_rates = None
+    if terminal_growth_rate is not None and terminal_multiple is None:
+        terminal_rates = np.asarray(sorted({terminal_growth_rate, *(terminal_growth_rate_grid or [])}), dtype=float)
+        # The Gordon growth model has no value when growth is not below the discount rate
+        if rates[0] <= terminal_rates[-1]:
+            raise ValueError(
+                f"Every discount rate must be above every terminal growth rate, got a discount rate of "
+                f"{rates[0]:.2%} and a terminal growth rate of {terminal_rates[-1]:.2%}"
+            )
+
+    # (S, N) projected cash flows and (D, N) discount factors
+    cash_flows = base_cash_flow * np.cumprod(1 + growth, axis=1)
+    discount_factors = (1 + rates[:, None]) ** -discount_timing[None, :]
+    final_discount_factors = (1 + rates) ** -(years[-1] if years.size else 0.0)
+
+    final_cash_flows = cash_flows[:, -1] if years.size else np.full(len(scenario_names), float(base_cash_flow))
+
+    # (S, D) present value of the projected cash flows, (S, D, G) present value of the terminal value
+    pv_cash_flows = cash_flows @ discount_factors.T
+    terminal_values = _terminal_values(final_cash_flows, rates, terminal_rates, terminal_multiple)
+    pv_terminal_values = terminal_values * final_discount_factors[None, :, None]
+    enterprise_values = pv_cash_flows[:, :, None] + pv_terminal_values
+    equity_values = enterprise_values - net_debt
+
+    per_share = shares_outstanding is not None and shares_outstanding > 0
+    values = equity_values / shares_outstanding if per_share else equity_values
+
+    base_rate_index = int(np.searchsorted(rates, discount_rate))
+    base_terminal_index = int(np.searchsorted(terminal_rates, terminal_growth_rate)) if terminal_rates is not None else 0
+
+    base_enterprise_value = enterprise_values[0, base_rate_index, base_terminal_index]
+    dcf_table = {
+        "columns": ["year", "growth_rate", "cash_flow", "discount_factor", "present_value"],
+        "rows": [
+            [int(year), round_values(growth[0, i], 4), round_values(cash_flows[0, i]), round_values(discount_factors[base_rate_index, i], 4), round_values(cash_flows[0, i] * discount_factors[base_rate_index, i])]
+            for i, year in enumerate(years)
+        ],
+    }
+
+    base_case = {
+        "dcf_table": dcf_table,
+        "sum_pv_cash_flows": round_values(pv_cash_flows[0, base_rate_index]),
+        "terminal_value": round_values(terminal_values[0, base_rate_index, base_terminal_index]),
+        "pv_terminal_value": round_values(pv_terminal_values[0, base_rate_index, base_terminal_index]),
+        "terminal_value_share_of_ev": round_values(pv_terminal_values[0, base_rate_index, base_terminal_index] / base_enterprise_value, 4),
+        "enterprise_value": round_values(base_enterprise_value),
+        "equity_value": round_values(equity_values[0, base_rate_index, base_terminal_index]),
+    }
+    if per_share:
+        base_case["value_per_share"] = round_values(values[0, base_rate_index, base_terminal_index])
+
+    result: dict = {
+        "value_unit": "per_share" if per_share else "equity_value",
+        "base_case": base_case,
+        "scenarios": {
+            name: {
+                "enterprise_value": round_values(enterprise_values[i, base_rate_index, base_terminal_index]),
+                "value": round_values(values[i, base_rate_index, base_terminal_index]),
+            }
+            for i, name in enumerate(scenario_names)
+        },
+    }
+
+    if rates.size > 1 or (terminal_rates is not None and terminal_rates.size > 1):
+        result["sensitivity"] = {
+            "rows": "discount_rate",
+            "columns": "terminal_growth_rate" if terminal_rates is not None else "terminal_multiple",
+            "discount_rates": round_values(rates, 4),
+            "terminal_growth_rates": round_values(terminal_rates, 4) if terminal_rates is not None else None,
+            "values": round_values(values[0]),
+        }
+
+    if per_share and current_price:
+        grid_values = values[0][~np.isnan(values[0])]
+        levels = np.asarray(margin_of_safety_levels or DEFAULT_MARGIN_OF_SAFETY_LEVELS, dtype=float)
+        base_value = values[0, base_rate_index, base_terminal_index]
+        result["margin_of_safety"] = {
+            "current_price": current_price,
+            "intrinsic_value_range": {
+                "low": round_values(np.percentile(grid_values, 10)),
+                "base": round_values(base_value),
+                "high": round_values(np.percentile(grid_values, 90)),
+            },
+            "current_margin_of_safety": round_values(_margin_of_safety(current_price, base_value), 4),
+            "share_of_grid_above_price": round_values(np.mean(grid_values > current_price), 4),
+            "buy_below_prices": {
+                f"{level:.0%}": round_values(base_value * (1 - level) if base_value > 0 else np.nan) for level in levels
+            },
+            "scenario_margins_of_safety": {
+                name: round_values(_margin_of_safety(current_price, values[i, base_rate_index, base_terminal_index]), 4)
+                for i, name in enumerate(scenario_names)
+            },
+        }
+        if base_value <= 0:
+            result["margin_of_safety"]["note"] = (
+                "The base case intrinsic value is not positive: there is no margin of safety at any price."
+            )
+
+    return result
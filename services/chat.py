@@ -10,6 +10,7 @@ from services.session import (
     SessionService,
 )
 from services.agent_service import TextAgentService
+from services.agents.tool_memo import SessionToolMemo
 
 
 class ChatService(ABC):
@@ -32,8 +33,13 @@ class AgenticChatService(ChatService):
         conversation = session.messages
         user_id = session.user_id
         conversation.append(Message(role=MessageRole.USER, content=message))
+        session_tool_memo = SessionToolMemo(session.tool_memo)
 
-        agent_response = await self._agent_service.generate_agent_text_response(user_id, conversation)
+        agent_response = await self._agent_service.generate_agent_text_response(
+            user_id,
+            conversation,
+            session_tool_memo=session_tool_memo,
+        )
 
         # Store the message and response in the session
         await self._session_service.add_message(
@@ -52,5 +58,7 @@ class AgenticChatService(ChatService):
                 created_at=dt.datetime.now(dt.timezone.utc).isoformat(),
             ),
         )
+        if session_tool_memo.dirty:
+            await self._session_service.update_tool_memo(session_id, session_tool_memo.to_entries())
         # Return the response
         return agent_response
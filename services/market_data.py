@@ -0,0 +1,405 @@
+from abc import ABC, abstractmethod
+import asyncio
+from dataclasses import dataclass
+import datetime as dt
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from langchain_core.tools import BaseTool
+from langchain_mcp_adapters.client import MultiServerMCPClient
+import numpy as np
+
+from config import settings
+from services.agents.tool_cache import (
+    CachedToolResult,
+    ToolResultCache,
+    tool_cache_key,
+)
+from services.series_store import (
+    ColumnarSeries,
+    ColumnarSeriesStore,
+)
+
+logger = logging.getLogger(__name__)
+
+
+_RECORD_LIST_KEYS = ["prices", "historical", "history", "bars", "data", "results", "values"]
+_DATE_KEYS = ["date", "datetime", "timestamp", "time", "t"]
+_CLOSE_KEYS = ["adjClose", "adj_close", "adjusted_close", "close", "c", "price", "value"]
+_PERIOD_KEYS = ["fiscalDateEnding", "period_end", "periodEnd", "endDate", "end_date", "reportDate", "date"]
+
+PRICE_DATASET = "daily_prices"
+FINANCIALS_DATASET = "quarterly_financials"
+# Price history may start up to a few days after the requested start date (weekends, holidays)
+_PRICE_HISTORY_START_TOLERANCE = np.timedelta64(7, "D")
+
+
+class MarketDataError(Exception):
+    pass
+
+
+@dataclass
+class PriceHistory:
+    ticker: str
+    dates: np.ndarray   # datetime64[D], ascending
+    closes: np.ndarray  # float64
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+
+def _content_text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            block.get("text", "") if isinstance(block, dict) else str(block)
+            for block in content
+        )
+    return json.dumps(content, default=str)
+
+
+def parse_tool_payload(content: Any) -> Any:
+    """Parses the JSON payload of an MCP tool result (a string or a list of text blocks)."""
+    text = _content_text(content)
+    try:
+        return json.loads(text)
+    except ValueError as e:
+        raise MarketDataError(f"Tool result is not JSON: {text[:200]}") from e
+
+
+def _find_records(payload: Any) -> list[dict]:
+    if isinstance(payload, list):
+        return [record for record in payload if isinstance(record, dict)]
+    if isinstance(payload, dict):
+        for key in _RECORD_LIST_KEYS:
+            if isinstance(payload.get(key), (list, dict)):
+                return _find_records(payload[key])
+        for value in payload.values():
+            if isinstance(value, list) and value and isinstance(value[0], dict):
+                return value
+    return []
+
+
+def _parse_date(value: Any) -> np.datetime64 | None:
+    if isinstance(value, (int, float)):
+        # Epoch seconds or milliseconds
+        seconds = value / 1000 if value > 1e11 else value
+        return np.datetime64(dt.datetime.fromtimestamp(seconds, dt.timezone.utc).date(), "D")
+    if isinstance(value, str) and len(value) >= 10:
+        try:
+            return np.datetime64(value[:10], "D")
+        except ValueError:
+            return None
+    return None
+
+
+def parse_price_history(ticker: str, payload: Any) -> PriceHistory:
+    """
+    Extracts a daily close series from a price history payload. The payload is
+    expected to contain a list of bars with a date and a close (or adjusted close)
+    field; the usual field names of market data APIs are recognized.
+    """
+    records = _find_records(payload)
+    if not records:
+        raise MarketDataError(f"No price history found for {ticker}")
+
+    date_key = next((key for key in _DATE_KEYS if key in records[0]), None)
+    close_key = next((key for key in _CLOSE_KEYS if key in records[0]), None)
+    if date_key is None or close_key is None:
+        raise MarketDataError(f"Unrecognized price history format for {ticker}: {list(records[0])}")
+
+    bars = {}
+    for record in records:
+        date = _parse_date(record.get(date_key))
+        close = record.get(close_key)
+        if date is not None and isinstance(close, (int, float)) and close > 0:
+            bars[date] = float(close)
+
+    if not bars:
+        raise MarketDataError(f"No valid prices found for {ticker}")
+
+    dates = np.array(sorted(bars), dtype="datetime64[D]")
+    return PriceHistory(
+        ticker=ticker,
+        dates=dates,
+        closes=np.array([bars[date] for date in dates], dtype=float),
+    )
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _collect_period_records(payload: Any, records: list[dict]) -> None:
+    if isinstance(payload, dict):
+        period_key = next((key for key in _PERIOD_KEYS if key in payload), None)
+        if period_key and any(_is_number(value) for key, value in payload.items() if key not in _PERIOD_KEYS):
+            records.append(payload)
+            return
+        # Prefer quarterly data when the payload has both annual and quarterly statements
+        quarterly_keys = [key for key in payload if "quarter" in key.lower()]
+        for key in quarterly_keys or payload:
+            _collect_period_records(payload[key], records)
+    elif isinstance(payload, list):
+        for item in payload:
+            _collect_period_records(item, records)
+
+
+def parse_financial_statements(ticker: str, payload: Any) -> ColumnarSeries:
+    """
+    Extracts the numeric fields of every reporting period from a financial statements
+    payload. Records of the different statements (income statement, balance sheet,
+    cash flow statement) are merged by period end date.
+    """
+    records: list[dict] = []
+    _collect_period_records(payload, records)
+
+    periods: dict[np.datetime64, dict[str, float]] = {}
+    for record in records:
+        period_key = next(key for key in _PERIOD_KEYS if key in record)
+        date = _parse_date(record[period_key])
+        if date is None:
+            continue
+        fields = periods.setdefault(date, {})
+        for key, value in record.items():
+            # A numeric period key (e.g. an epoch timestamp) is the date, not a field
+            if key not in _PERIOD_KEYS and _is_number(value):
+                fields.setdefault(key, float(value))
+
+    if not periods:
+        raise MarketDataError(f"No financial statements found for {ticker}")
+
+    dates = np.array(sorted(periods), dtype="datetime64[D]")
+    field_names = list(dict.fromkeys(field for date in dates for field in periods[date]))
+    return ColumnarSeries(
+        dates=dates,
+        columns={
+            field: np.array([periods[date].get(field, np.nan) for date in dates], dtype=float)
+            for field in field_names
+        },
+        updated_at=time.time(),
+    )
+
+
+class MarketDataService(ABC):
+    @abstractmethod
+    async def call_tool(self, tool_name: str, args: dict[str, Any]) -> Any:
+        """
+        Calls a market-data tool and returns its parsed JSON payload.
+
+        Raises:
+            MarketDataError: If the tool is unknown, fails or doesn't return JSON.
+        """
+        pass
+
+    @abstractmethod
+    async def get_price_history(self, ticker: str, start_date: dt.date, end_date: dt.date) -> PriceHistory:
+        pass
+
+    @abstractmethod
+    async def get_financials(self, ticker: str) -> ColumnarSeries:
+        """Returns the numeric fields of the ticker's financial statements, one row per reporting period."""
+        pass
+
+    @abstractmethod
+    async def get_overview(self, ticker: str) -> dict[str, Any]:
+        """Returns the stock overview of the ticker (market cap, price, sector...)."""
+        pass
+
+    @staticmethod
+    async def _fetch_many(
+        tickers: list[str],
+        fetch: Callable[[str], Awaitable[Any]],
+    ) -> tuple[dict[str, Any], dict[str, str]]:
+        semaphore = asyncio.Semaphore(settings.MARKET_DATA_MAX_CONCURRENT_REQUESTS)
+
+        async def bounded_fetch(ticker: str) -> Any:
+            async with semaphore:
+                return await fetch(ticker)
+
+        results = await asyncio.gather(*(bounded_fetch(ticker) for ticker in tickers), return_exceptions=True)
+        values, errors = {}, {}
+        for ticker, result in zip(tickers, results):
+            if isinstance(result, Exception):
+                errors[ticker] = str(result)
+            else:
+                values[ticker] = result
+        return values, errors
+
+    async def get_price_histories(
+        self,
+        tickers: list[str],
+        start_date: dt.date,
+        end_date: dt.date,
+    ) -> tuple[dict[str, PriceHistory], dict[str, str]]:
+        """
+        Fetches the price history of several tickers concurrently, with at most
+        settings.MARKET_DATA_MAX_CONCURRENT_REQUESTS requests in flight.
+
+        Returns:
+            The price histories by ticker, and the error message of every ticker that failed.
+        """
+        return await self._fetch_many(
+            tickers, lambda ticker: self.get_price_history(ticker, start_date, end_date),
+        )
+
+    async def get_fundamentals(
+        self,
+        tickers: list[str],
+    ) -> tuple[dict[str, tuple[ColumnarSeries, dict[str, Any]]], dict[str, str]]:
+        """
+        Fetches the financial statements and the stock overview of several tickers
+        concurrently, with at most settings.MARKET_DATA_MAX_CONCURRENT_REQUESTS
+        tickers in flight.
+
+        Returns:
+            The (financials, overview) pair by ticker, and the error message of every
+            ticker that failed. A ticker without an overview gets an empty one.
+        """
+        async def fetch(ticker: str) -> tuple[ColumnarSeries, dict[str, Any]]:
+            financials, overview = await asyncio.gather(
+                self.get_financials(ticker), self.get_overview(ticker), return_exceptions=True,
+            )
+            if isinstance(financials, Exception):
+                raise financials
+            if isinstance(overview, Exception):
+                logger.info("No overview for %s: %s", ticker, str(overview))
+                overview = {}
+            return financials, overview
+
+        return await self._fetch_many(tickers, fetch)
+
+
+class MCPMarketDataService(MarketDataService):
+    """
+    Market data fetched through the tools of the market-data MCP server.
+
+    Results of tools with a TTL in settings.TOOL_RESULT_CACHE_TTLS go through the
+    shared tool result cache, under the same keys as the agents' own tool calls, so
+    data fetched by an analytics tool is reused by the agents and the other way around.
+
+    When a series store is given, price histories and financial statements are kept
+    in it: repeated reads are local memory-mapped reads, and once a series is older
+    than its refresh interval only the bars (or quarters) after the last stored one
+    are appended.
+    """
+    def __init__(
+        self,
+        mcp_client: MultiServerMCPClient,
+        tool_result_cache: ToolResultCache | None = None,
+        series_store: ColumnarSeriesStore | None = None,
+    ):
+        self._mcp_client = mcp_client
+        self._cache = tool_result_cache
+        self._series_store = series_store
+        self._tools: dict[str, BaseTool] | None = None
+        self._tools_lock = asyncio.Lock()
+
+    async def _get_tool(self, tool_name: str) -> BaseTool:
+        async with self._tools_lock:
+            if self._tools is None:
+                tools = await self._mcp_client.get_tools(server_name=settings.MARKET_DATA_MCP_SERVER_NAME)
+                self._tools = {tool.name: tool for tool in tools}
+        tool = self._tools.get(tool_name)
+        if tool is None:
+            raise MarketDataError(f"Market-data tool '{tool_name}' is not available")
+        return tool
+
+    async def _invoke(self, tool_name: str, args: dict[str, Any]) -> Any:
+        tool = await self._get_tool(tool_name)
+        try:
+            return await tool.ainvoke(args)
+        except Exception as e:
+            raise MarketDataError(f"Market-data tool '{tool_name}' failed: {e}") from e
+
+    async def _cached_invoke(self, tool_name: str, args: dict[str, Any]) -> Any:
+        ttl_seconds = settings.TOOL_RESULT_CACHE_TTLS.get(tool_name)
+        if self._cache is None or not ttl_seconds:
+            return await self._invoke(tool_name, args)
+
+        result = await self._cache.get_or_compute(
+            tool_name,
+            tool_cache_key(tool_name, args),
+            ttl_seconds,
+            compute=lambda: self._invoke(tool_name, args),
+            to_cached_result=lambda content, latency_seconds: CachedToolResult(
+                tool_name=tool_name,
+                content=content if isinstance(content, (str, list)) else json.dumps(content, default=str),
+                size_bytes=len(_content_text(content).encode()),
+                latency_seconds=latency_seconds,
+            ),
+        )
+        return result.content if isinstance(result, CachedToolResult) else result
+
+    async def call_tool(self, tool_name: str, args: dict[str, Any]) -> Any:
+        return parse_tool_payload(await self._cached_invoke(tool_name, args))
+
+    async def _fetch_price_history(self, ticker: str, start_date: dt.date, end_date: dt.date) -> PriceHistory:
+        payload = await self.call_tool(
+            settings.MARKET_DATA_PRICE_HISTORY_TOOL_NAME,
+            {
+                "ticker": ticker,
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat(),
+            },
+        )
+        return parse_price_history(ticker, payload)
+
+    async def get_price_history(self, ticker: str, start_date: dt.date, end_date: dt.date) -> PriceHistory:
+        if self._series_store is None:
+            return await self._fetch_price_history(ticker, start_date, end_date)
+
+        start, end = np.datetime64(start_date, "D"), np.datetime64(end_date, "D")
+        stored = self._series_store.read(PRICE_DATASET, ticker, ["close"])
+        if stored is None or not len(stored) or stored.dates[0] > start + _PRICE_HISTORY_START_TOLERANCE:
+            history = await self._fetch_price_history(ticker, start_date, end_date)
+            await asyncio.to_thread(
+                self._series_store.replace, PRICE_DATASET, ticker, history.dates, {"close": history.closes},
+            )
+            return history
+
+        is_fresh = time.time() - stored.updated_at < settings.PRICE_HISTORY_REFRESH_SECONDS
+        if stored.last_date < end and not is_fresh:
+            # Only fetch the bars after the last stored one
+            fetch_start = (stored.last_date + np.timedelta64(1, "D")).astype(dt.date)
+            try:
+                new_bars = await self._fetch_price_history(ticker, fetch_start, end_date)
+                await asyncio.to_thread(
+                    self._series_store.append, PRICE_DATASET, ticker, new_bars.dates, {"close": new_bars.closes},
+                )
+            except MarketDataError as e:
+                # No new bars yet (weekend, holiday); check again after the refresh interval
+                logger.info("No new bars for %s: %s", ticker, str(e))
+                await asyncio.to_thread(self._series_store.touch, PRICE_DATASET, ticker)
+            stored = self._series_store.read(PRICE_DATASET, ticker, ["close"])
+
+        window = stored.slice(start, end)
+        return PriceHistory(ticker=ticker, dates=window.dates, closes=window.columns["close"])
+
+    async def _fetch_financials(self, ticker: str) -> ColumnarSeries:
+        payload = await self.call_tool(settings.MARKET_DATA_FINANCIALS_TOOL_NAME, {"ticker": ticker})
+        return parse_financial_statements(ticker, payload)
+
+    async def get_financials(self, ticker: str) -> ColumnarSeries:
+        if self._series_store is None:
+            return await self._fetch_financials(ticker)
+
+        stored = self._series_store.read(FINANCIALS_DATASET, ticker)
+        if stored is not None and time.time() - stored.updated_at < settings.FINANCIALS_REFRESH_SECONDS:
+            return stored
+
+        financials = await self._fetch_financials(ticker)
+        # Only the quarters reported after the last stored one are written
+        await asyncio.to_thread(
+            self._series_store.append, FINANCIALS_DATASET, ticker, financials.dates, financials.columns,
+        )
+        return self._series_store.read(FINANCIALS_DATASET, ticker) or financials
+
+    async def get_overview(self, ticker: str) -> dict[str, Any]:
+        payload = await self.call_tool(settings.MARKET_DATA_OVERVIEW_TOOL_NAME, {"ticker": ticker})
+        if not isinstance(payload, dict):
+            raise MarketDataError(f"Unrecognized overview format for {ticker}")
+        return payload
@@ -0,0 +1,333 @@
+import asyncio
+from abc import ABC, abstractmethod
+from collections import (
+    Counter,
+    OrderedDict,
+)
+from collections.abc import (
+    Awaitable,
+    Callable,
+)
+from dataclasses import (
+    dataclass,
+    field,
+)
+import json
+import logging
+import time
+from typing import Any
+
+from pydantic import BaseModel
+from pymongo import (
+    AsyncMongoClient,
+    ReplaceOne,
+)
+
+from config import settings
+from models.agent_workflow import WorkflowResult
+from models.memory import (
+    MemorySnippet,
+    MemorySource,
+)
+from services.text_search import (
+    BM25Index,
+    tokenize,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_text(text: str, max_chars: int) -> list[str]:
+    """
+    Splits a report into passages of at most max_chars, on paragraph boundaries when
+    possible and on whitespace within longer paragraphs.
+    """
+    chunks: list[str] = []
+    current = ""
+    for paragraph in (paragraph.strip() for paragraph in text.split("\n\n")):
+        if not paragraph:
+            continue
+        while len(paragraph) > max_chars:
+            cut = paragraph.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(paragraph[:cut].strip())
+            paragraph = paragraph[cut:].strip()
+        if current and len(current) + len(paragraph) + 2 > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def render_note(key: str, value: Any) -> str:
+    return f"{key}: {value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)}"
+
+
+class MemorySearchService(ABC):
+    @abstractmethod
+    async def index_conversation_notes(self, user_id: str, date: str, notes: dict[str, Any]) -> None:
+        pass
+
+    @abstractmethod
+    async def remove_conversation_notes(self, user_id: str, dates: list[str]) -> None:
+        pass
+
+    @abstractmethod
+    async def index_workflow_result(self, result: WorkflowResult) -> None:
+        pass
+
+    @abstractmethod
+    async def search(self, user_id: str, source: MemorySource, query: str, k: int = 5) -> list[MemorySnippet]:
+        pass
+
+
+class MemoryChunkMongoDoc(BaseModel):
+    user_id: str
+    source: MemorySource
+    chunk_id: str           # "{date}/{note key}" for notes, "{result_id}/{passage number}" for workflow results
+    source_id: str          # The date (or digest period) of notes, the result_id of workflow results
+    date: str
+    workflow_name: str | None = None
+    text: str
+    terms: dict[str, int]   # Term counts of the text, as indexed
+
+
+@dataclass
+class UserMemoryIndex:
+    loaded_at: float
+    indexes: dict[MemorySource, BM25Index] = field(default_factory=lambda: {source: BM25Index() for source in MemorySource})
+    chunks: dict[tuple[MemorySource, str], MemoryChunkMongoDoc] = field(default_factory=dict)
+
+    def add(self, chunks: list[MemoryChunkMongoDoc]) -> None:
+        for source in MemorySource:
+            source_chunks = [chunk for chunk in chunks if chunk.source == source]
+            if not source_chunks:
+                continue
+            self.indexes[source].add(
+                [list(Counter(chunk.terms).elements()) for chunk in source_chunks],
+                [chunk.chunk_id for chunk in source_chunks],
+            )
+            for chunk in source_chunks:
+                self.chunks[(source, chunk.chunk_id)] = chunk
+
+    def remove(self, source: MemorySource, chunk_ids: list[str]) -> None:
+        self.indexes[source].remove(chunk_ids)
+        for chunk_id in chunk_ids:
+            self.chunks.pop((source, chunk_id), None)
+
+
+class MemoryIndexCache:
+    """
+    The per-user BM25 indexes of the process, evicting the least recently used users.
+
+    An index is reloaded from MongoDB once older than ttl_seconds, so that the chunks
+    indexed by other processes (e.g. the MCP server) are picked up.
+    """
+
+    def __init__(
+        self,
+        max_users: int = settings.MEMORY_SEARCH_CACHE_MAX_USERS,
+        ttl_seconds: int = settings.MEMORY_SEARCH_CACHE_TTL_SECONDS,
+    ):
+        self._max_users = max_users
+        self._ttl_seconds = ttl_seconds
+        self._indexes: OrderedDict[str, UserMemoryIndex] = OrderedDict()
+        self._loading: dict[str, asyncio.Future] = {}
+
+    def get(self, user_id: str) -> UserMemoryIndex | None:
+        index = self._indexes.get(user_id)
+        if index is None:
+            return None
+        if time.monotonic() - index.loaded_at > self._ttl_seconds:
+            del self._indexes[user_id]
+            return None
+        self._indexes.move_to_end(user_id)
+        return index
+
+    def set(self, user_id: str, index: UserMemoryIndex) -> None:
+        self._indexes[user_id] = index
+        self._indexes.move_to_end(user_id)
+        while len(self._indexes) > self._max_users:
+            self._indexes.popitem(last=False)
+
+    async def get_or_load(self, user_id: str, load: Callable[[], Awaitable[UserMemoryIndex]]) -> UserMemoryIndex:
+        """The user's index, loaded with load when missing. Concurrent calls for a user share a single load."""
+        index = self.get(user_id)
+        if index is not None:
+            return index
+        loading = self._loading.get(user_id)
+        if loading is None:
+            loading = asyncio.ensure_future(self._load(user_id, load))
+            self._loading[user_id] = loading
+        return await asyncio.shield(loading)
+
+    async def _load(self, user_id: str, load: Callable[[], Awaitable[UserMemoryIndex]]) -> UserMemoryIndex:
+        try:
+            index = await load()
+            self.set(user_id, index)
+            return index
+        finally:
+            self._loading.pop(user_id, None)
+
+    def get_metrics(self) -> dict:
+        return {
+            "users": len(self._indexes),
+            "chunks": sum(len(index.chunks) for index in self._indexes.values()),
+        }
+
+
+class MongoDBMemorySearchService(MemorySearchService):
+    """
+    Relevance search over the conversation notes and workflow results of a user.
+
+    Every note and every passage of a workflow report is a chunk, stored tokenized in
+    MongoDB when it is written and searched with a per-user BM25 index held in memory
+    (see MemoryIndexCache). Notes and results without chunks, e.g. written before the
+    index existed, are indexed whenever the user's index is loaded.
+    """
+
+    _indexes_created: bool = False
+
+    def __init__(self, mongo_client: AsyncMongoClient, index_cache: MemoryIndexCache):
+        self.db = mongo_client[settings.MONGO_DB_NAME]
+        self._index_cache = index_cache
+
+    async def _ensure_indexes(self) -> None:
+        if MongoDBMemorySearchService._indexes_created:
+            return
+        collection = self.db[settings.MEMORY_INDEX_COLLECTION_NAME]
+        await collection.create_index([("user_id", 1), ("source", 1), ("chunk_id", 1)], unique=True)
+        MongoDBMemorySearchService._indexes_created = True
+
+    def _note_chunks(self, user_id: str, date: str, notes: dict[str, Any]) -> list[MemoryChunkMongoDoc]:
+        chunks = []
+        for key, value in notes.items():
+            text = render_note(key, value)
+            chunks.append(MemoryChunkMongoDoc(
+                user_id=user_id,
+                source=MemorySource.CONVERSATION_NOTES,
+                chunk_id=f"{date}/{key}",
+                source_id=date,
+                date=date,
+                text=text,
+                terms=Counter(tokenize(text.replace("_", " "))),
+            ))
+        return chunks
+
+    def _result_chunks(self, result: WorkflowResult) -> list[MemoryChunkMongoDoc]:
+        return [
+            MemoryChunkMongoDoc(
+                user_id=result.user_id,
+                source=MemorySource.WORKFLOW_RESULTS,
+                chunk_id=f"{result.result_id}/{i}",
+                source_id=result.result_id,
+                date=result.ran_at,
+                workflow_name=result.workflow_name,
+                text=passage,
+                terms=Counter(tokenize(f"{result.workflow_name} {passage}")),
+            )
+            for i, passage in enumerate(chunk_text(result.output, settings.MEMORY_SEARCH_CHUNK_CHARS))
+        ]
+
+    async def _save_chunks(self, chunks: list[MemoryChunkMongoDoc]) -> None:
+        if not chunks:
+            return
+        await self._ensure_indexes()
+        collection = self.db[settings.MEMORY_INDEX_COLLECTION_NAME]
+        await collection.bulk_write([
+            ReplaceOne(
+                {"user_id": chunk.user_id, "source": chunk.source.value, "chunk_id": chunk.chunk_id},
+                chunk.model_dump(mode="json"),
+                upsert=True,
+            )
+            for chunk in chunks
+        ])
+        # Keep the user's in-memory index, if loaded, up to date
+        index = self._index_cache.get(chunks[0].user_id)
+        if index is not None:
+            index.add(chunks)
+
+    async def index_conversation_notes(self, user_id: str, date: str, notes: dict[str, Any]) -> None:
+        await self._save_chunks(self._note_chunks(user_id, date, notes))
+
+    async def remove_conversation_notes(self, user_id: str, dates: list[str]) -> None:
+        """Removes the notes of the given dates (or digest periods), e.g. once compacted into a digest."""
+        collection = self.db[settings.MEMORY_INDEX_COLLECTION_NAME]
+        query = {"user_id": user_id, "source": MemorySource.CONVERSATION_NOTES.value, "source_id": {"$in": dates}}
+        chunk_ids = [doc["chunk_id"] for doc in await collection.find(query, {"_id": 0, "chunk_id": 1}).to_list(length=None)]
+        if not chunk_ids:
+            return
+        await collection.delete_many(query)
+        index = self._index_cache.get(user_id)
+        if index is not None:
+            index.remove(MemorySource.CONVERSATION_NOTES, chunk_ids)
+
+    async def index_workflow_result(self, result: WorkflowResult) -> None:
+        await self._save_chunks(self._result_chunks(result))
+
+    async def _backfill(self, user_id: str, source: MemorySource, indexed_source_ids: set[str]) -> list[MemoryChunkMongoDoc]:
+        """
+        Indexes the notes or workflow results of the user that have no chunk in the index
+        yet, e.g. saved before the index existed. Only their ids are read when there is none.
+        """
+        chunks: list[MemoryChunkMongoDoc] = []
+        if source == MemorySource.CONVERSATION_NOTES:
+            collection = self.db[settings.USER_CONVERSATION_NOTES_COLLECTION_NAME]
+            docs = await collection.find({"user_id": user_id}, {"_id": 0, "date": 1, "period": 1}).to_list(length=None)
+            missing = [doc.get("period") or doc["date"] for doc in docs if (doc.get("period") or doc["date"]) not in indexed_source_ids]
+            if missing:
+                cursor = collection.find({
+                    "user_id": user_id,
+                    "$or": [{"period": {"$in": missing}}, {"period": None, "date": {"$in": missing}}],
+                })
+                async for doc in cursor:
+                    chunks.extend(self._note_chunks(user_id, doc.get("period") or doc["date"], doc.get("notes") or {}))
+        else:
+            collection = self.db[settings.WORKFLOW_RESULTS_COLLECTION_NAME]
+            docs = await collection.find({"user_id": user_id}, {"_id": 0, "result_id": 1}).to_list(length=None)
+            missing = [doc["result_id"] for doc in docs if doc["result_id"] not in indexed_source_ids]
+            if missing:
+                async for doc in collection.find({"user_id": user_id, "result_id": {"$in": missing}}):
+                    chunks.extend(self._result_chunks(WorkflowResult.model_validate(doc)))
+        if chunks:
+            logger.info("Backfilled %d %s chunks into the memory index of user %s", len(chunks), source.value, user_id)
+            await self._save_chunks(chunks)
+        return chunks
+
+    async def _load_index(self, user_id: str) -> UserMemoryIndex:
+        collection = self.db[settings.MEMORY_INDEX_COLLECTION_NAME]
+        docs = await collection.find({"user_id": user_id}, {"_id": 0}).to_list(length=None)
+        chunks = [MemoryChunkMongoDoc.model_validate(doc) for doc in docs]
+        # Chunks written since the index existed don't mean the older documents were indexed
+        for source in MemorySource:
+            indexed_source_ids = {chunk.source_id for chunk in chunks if chunk.source == source}
+            chunks.extend(await self._backfill(user_id, source, indexed_source_ids))
+
+        index = UserMemoryIndex(loaded_at=time.monotonic())
+        index.add(chunks)
+        return index
+
+    async def search(self, user_id: str, source: MemorySource, query: str, k: int = 5) -> list[MemorySnippet]:
+        """
+        The k chunks of the source most relevant to the query, best first. Chunks
+        sharing no term with the query are never returned.
+        """
+        index = await self._index_cache.get_or_load(user_id, lambda: self._load_index(user_id))
+        matches = index.indexes[source].top_k(tokenize(query), k)
+        snippets = []
+        for chunk_id, score in matches:
+            chunk = index.chunks[(source, chunk_id)]
+            snippets.append(MemorySnippet(
+                source=source,
+                source_id=chunk.source_id,
+                date=chunk.date,
+                workflow_name=chunk.workflow_name,
+                text=chunk.text,
+                score=round(score, 3),
+            ))
+        return snippets
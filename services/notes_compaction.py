@@ -0,0 +1,65 @@
+import datetime as dt
+from typing import Any
+
+from config import settings
+
+
+TEXT_SEPARATOR = "; "
+
+
+def notes_period(date: dt.date, today: dt.date) -> tuple[str, dt.date] | None:
+    """
+    The digest period the notes of a date are compacted into: its month (e.g. "2026-05")
+    once the whole month is older than NOTES_COMPACTION_MONTHLY_AFTER_DAYS, otherwise its
+    ISO week (e.g. "2026-W19") once the whole week is older than NOTES_COMPACTION_WEEKLY_AFTER_DAYS.
+
+    Returns:
+        The label and first day of the period, None while the date isn't old enough.
+    """
+    month_start = date.replace(day=1)
+    next_month_start = (month_start + dt.timedelta(days=32)).replace(day=1)
+    if (today - (next_month_start - dt.timedelta(days=1))).days > settings.NOTES_COMPACTION_MONTHLY_AFTER_DAYS:
+        return f"{date:%Y-%m}", month_start
+
+    week_start = date - dt.timedelta(days=date.weekday())
+    if (today - (week_start + dt.timedelta(days=6))).days > settings.NOTES_COMPACTION_WEEKLY_AFTER_DAYS:
+        iso_year, iso_week, _ = date.isocalendar()
+        return f"{iso_year}-W{iso_week:02d}", week_start
+    return None
+
+
+def _merge_texts(older: str, newer: str) -> str:
+    segments = [segment for segment in older.split(TEXT_SEPARATOR) if segment]
+    for segment in newer.split(TEXT_SEPARATOR):
+        if segment in segments:
+            segments.remove(segment)
+        if segment:
+            segments.append(segment)
+    # Drop the oldest segments beyond the budget, always keeping the newest one
+    while len(segments) > 1 and len(TEXT_SEPARATOR.join(segments)) > settings.NOTES_DIGEST_MAX_TEXT_CHARS:
+        segments.pop(0)
+    return TEXT_SEPARATOR.join(segments)
+
+
+def merge_note_values(older: Any, newer: Any) -> Any:
+    """
+    Merges two values of a note key: dicts key by key, lists as their union and texts as
+    their distinct "; "-separated segments, keeping the newest items within the digest
+    budgets. Any other value is replaced by the newer one. Merging a value into a digest
+    that already holds it leaves the digest unchanged.
+    """
+    if isinstance(older, dict) and isinstance(newer, dict):
+        return merge_notes(older, newer)
+    if isinstance(older, list) and isinstance(newer, list):
+        items = [item for item in older if item not in newer] + newer
+        return items[-settings.NOTES_DIGEST_MAX_LIST_ITEMS:]
+    if isinstance(older, str) and isinstance(newer, str):
+        return _merge_texts(older, newer)
+    return newer
+
+
+def merge_notes(older: dict[str, Any], newer: dict[str, Any]) -> dict[str, Any]:
+    merged = dict(older)
+    for key, value in newer.items():
+        merged[key] = merge_note_values(merged[key], value) if key in merged else value
+    return merged
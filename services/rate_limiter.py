@@ -0,0 +1,167 @@
+from abc import ABC, abstractmethod
+import asyncio
+import time
+
+from pymongo import (
+    AsyncMongoClient,
+    ReturnDocument,
+)
+from pymongo.errors import DuplicateKeyError
+
+from config import settings
+
+
+class TokenBucketStore(ABC):
+    @abstractmethod
+    async def consume(
+        self,
+        key: str,
+        tokens: float,
+        capacity: float,
+        refill_rate: float,
+    ) -> float:
+        """
+        Atomically refill the bucket for the elapsed time and take `tokens` from it if available.
+
+        Returns:
+            0 if the tokens were taken, otherwise the number of seconds until enough tokens are available.
+        """
+        pass
+
+
+class InMemoryTokenBucketStore(TokenBucketStore):
+    """Token buckets local to the current process."""
+
+    def __init__(self):
+        self._buckets: dict[str, tuple[float, float]] = {}  # key -> (tokens, updated_at)
+
+    async def consume(
+        self,
+        key: str,
+        tokens: float,
+        capacity: float,
+        refill_rate: float,
+    ) -> float:
+        now = time.monotonic()
+        available, updated_at = self._buckets.get(key, (capacity, now))
+        available = min(capacity, available + (now - updated_at) * refill_rate)
+
+        if available >= tokens:
+            self._buckets[key] = (available - tokens, now)
+            return 0
+
+        self._buckets[key] = (available, now)
+        return (tokens - available) / refill_rate
+
+
+class MongoDBTokenBucketStore(TokenBucketStore):
+    """
+    Token buckets shared by every worker and node that points to the same database.
+
+    Refill and consumption happen in a single find-and-modify pipeline update that
+    uses the database clock, so concurrent callers never double spend and clock
+    skew between nodes doesn't matter. Buckets expire through a TTL index once
+    they would have refilled completely.
+    """
+    _indexes_created: bool = False
+
+    def __init__(self, mongo_client: AsyncMongoClient):
+        self.db = mongo_client[settings.MONGO_DB_NAME]
+
+    async def _ensure_indexes(self) -> None:
+        if MongoDBTokenBucketStore._indexes_created:
+            return
+        collection = self.db[settings.RATE_LIMIT_COLLECTION_NAME]
+        await collection.create_index("key", unique=True)
+        await collection.create_index("expires_at", expireAfterSeconds=0)
+        MongoDBTokenBucketStore._indexes_created = True
+
+    async def consume(
+        self,
+        key: str,
+        tokens: float,
+        capacity: float,
+        refill_rate: float,
+    ) -> float:
+        await self._ensure_indexes()
+        collection = self.db[settings.RATE_LIMIT_COLLECTION_NAME]
+
+        now_seconds = {"$divide": [{"$toLong": "$$NOW"}, 1000]}
+        seconds_to_full = capacity / refill_rate
+        pipeline = [
+            {"$set": {
+                "tokens": {"$min": [
+                    capacity,
+                    {"$add": [
+                        {"$ifNull": ["$tokens", capacity]},
+                        {"$multiply": [
+                            {"$max": [0, {"$subtract": [now_seconds, {"$ifNull": ["$updated_at", now_seconds]}]}]},
+                            refill_rate,
+                        ]},
+                    ]},
+                ]},
+                "updated_at": now_seconds,
+            }},
+            {"$set": {"granted": {"$gte": ["$tokens", tokens]}}},
+            {"$set": {
+                "tokens": {"$cond": ["$granted", {"$subtract": ["$tokens", tokens]}, "$tokens"]},
+                "expires_at": {"$add": ["$$NOW", int(seconds_to_full * 1000)]},
+            }},
+        ]
+
+        try:
+            doc = await collection.find_one_and_update(
+                {"key": key},
+                pipeline,
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Another worker created the bucket at the same time, the retry updates it
+            doc = await collection.find_one_and_update(
+                {"key": key},
+                pipeline,
+                return_document=ReturnDocument.AFTER,
+            )
+
+        if doc["granted"]:
+            return 0
+        return (tokens - doc["tokens"]) / refill_rate
+
+
+class TokenBucketRateLimiter:
+    """
+    Waits until a token bucket, identified by key, can pay for the requested tokens.
+    Whether the limit holds per process or for the whole fleet depends on the store.
+    """
+
+    def __init__(self, store: TokenBucketStore):
+        self._store = store
+
+    async def acquire(
+        self,
+        key: str,
+        tokens: float,
+        capacity: float,
+        refill_rate: float,
+    ) -> None:
+        """
+        Args:
+            key: Identifies the bucket.
+            tokens: The cost of the operation.
+            capacity: The maximum number of tokens the bucket holds (the allowed burst).
+            refill_rate: Tokens added to the bucket per second.
+        """
+        if tokens > capacity:
+            raise ValueError(f"Cannot acquire {tokens} tokens from a bucket with capacity {capacity}")
+
+        while True:
+            wait_seconds = await self._store.consume(
+                key=key,
+                tokens=tokens,
+                capacity=capacity,
+                refill_rate=refill_rate,
+            )
+            if wait_seconds <= 0:
+                return
+            await asyncio.sleep(wait_seconds)
@@ -0,0 +1,292 @@
+import asyncio
+from dataclasses import dataclass
+import logging
+import os
+from pathlib import Path
+import time
+from typing import Any
+
+import numpy as np
+
+from config import settings
+from services.analytics.expressions import (
+    ExpressionError,
+    evaluate_expression,
+    expression_names,
+    parse_expression,
+)
+from services.analytics.formatting import round_values
+from services.analytics.fundamentals import (
+    find_field,
+    periods_per_year,
+    resolve_field,
+    safe_divide,
+    trailing_sum,
+)
+from services.analytics.peers import (
+    PEER_METRICS,
+    compute_peer_metrics,
+)
+from services.market_data import MarketDataService
+from services.series_store import ColumnarSeries
+
+logger = logging.getLogger(__name__)
+
+
+# Fields of the snapshot besides the peer comparison metrics
+SCREENER_BASE_FIELDS = ["market_cap", "price", "dividend_yield", "payout_ratio"]
+SCREENER_FIELDS = SCREENER_BASE_FIELDS + list(PEER_METRICS)
+
+
+class ScreenerError(Exception):
+    pass
+
+
+@dataclass
+class ScreenerSnapshot:
+    """Fundamentals of the whole screener universe, one float64 column per field."""
+    tickers: np.ndarray             # str, shape (N,)
+    sectors: np.ndarray             # str, shape (N,), "" when unknown
+    columns: dict[str, np.ndarray]  # float64, shape (N,), NaN when unknown
+    built_at: float                 # Unix time
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+
+def compute_screener_fields(financials: ColumnarSeries, overview: dict[str, Any]) -> dict[str, float]:
+    """Computes the snapshot fields of one company from its financial statements and overview."""
+    fields = compute_peer_metrics(financials.dates, financials.columns, overview)
+
+    market_cap = find_field(overview, "market_cap")
+    market_cap = float(market_cap) if isinstance(market_cap, (int, float)) else np.nan
+    price = find_field(overview, "price")
+    fields["market_cap"] = market_cap
+    fields["price"] = float(price) if isinstance(price, (int, float)) else np.nan
+
+    dividends = np.nan
+    net_income = np.nan
+    if len(financials):
+        window = periods_per_year(financials.dates)
+        dividends_paid = resolve_field(financials.columns, "dividends_paid")
+        if dividends_paid is not None:
+            # Reported as a cash outflow by most APIs
+            dividends = float(np.abs(trailing_sum(dividends_paid, window)[-1]))
+        income = resolve_field(financials.columns, "net_income")
+        if income is not None:
+            net_income = float(trailing_sum(income, window)[-1])
+    fields["dividend_yield"] = float(safe_divide(dividends, market_cap))
+    fields["payout_ratio"] = float(safe_divide(dividends, net_income)) if net_income > 0 else np.nan
+    return fields
+
+
+class ScreenerSnapshotStore:
+    """
+    Holds the current screener snapshot in memory and persists it as a single
+    compressed .npz file, so that it survives restarts and is shared by the workers.
+    """
+
+    def __init__(self, path: str = settings.SCREENER_SNAPSHOT_PATH):
+        self._path = Path(path)
+        self._snapshot: ScreenerSnapshot | None = None
+        self._loaded_mtime: float | None = None
+        self.refresh_lock = asyncio.Lock()
+        self.refresh_task: asyncio.Task | None = None
+
+    def get(self) -> ScreenerSnapshot | None:
+        """Returns the current snapshot, reloading it if another worker saved a newer one."""
+        try:
+            mtime = self._path.stat().st_mtime
+        except FileNotFoundError:
+            return self._snapshot
+        if mtime == self._loaded_mtime:
+            return self._snapshot
+
+        try:
+            with np.load(self._path, allow_pickle=False) as data:
+                self._snapshot = ScreenerSnapshot(
+                    tickers=data["tickers"],
+                    sectors=data["sectors"],
+                    columns={field: data[f"field_{field}"] for field in SCREENER_FIELDS if f"field_{field}" in data},
+                    built_at=float(data["built_at"]),
+                )
+            self._loaded_mtime = mtime
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Failed to load screener snapshot %s: %s", self._path, str(e))
+        return self._snapshot
+
+    def save(self, snapshot: ScreenerSnapshot) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._path.with_name(f"{self._path.stem}.{os.getpid()}.tmp.npz")
+        np.savez_compressed(
+            tmp_path,
+            tickers=snapshot.tickers,
+            sectors=snapshot.sectors,
+            built_at=np.float64(snapshot.built_at),
+            **{f"field_{field}": values for field, values in snapshot.columns.items()},
+        )
+        os.replace(tmp_path, self._path)
+        self._snapshot = snapshot
+        self._loaded_mtime = self._path.stat().st_mtime
+
+    def get_metrics(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "tickers": len(snapshot) if snapshot else 0,
+            "age_seconds": round(time.time() - snapshot.built_at) if snapshot else None,
+        }
+
+
+class ScreenerService:
+    """
+    Screens the universe in settings.SCREENER_UNIVERSE on a fundamentals snapshot.
+
+    The snapshot is built from the market-data tools (through the series store, so
+    only new quarters are fetched) and refreshed in the background once it is older
+    than settings.SCREENER_REFRESH_SECONDS. Screens never call the market-data tools:
+    filter and rank expressions are evaluated on the snapshot columns as NumPy arrays.
+    """
+
+    def __init__(
+        self,
+        market_data_service: MarketDataService,
+        snapshot_store: ScreenerSnapshotStore,
+        universe: list[str] = settings.SCREENER_UNIVERSE,
+    ):
+        self._market_data_service = market_data_service
+        self._snapshot_store = snapshot_store
+        self._universe = list(dict.fromkeys(ticker.upper() for ticker in universe))
+
+    async def refresh(self) -> ScreenerSnapshot:
+        """Rebuilds the snapshot from the market-data tools."""
+        start = time.monotonic()
+        fundamentals, errors = await self._market_data_service.get_fundamentals(self._universe)
+        tickers = [ticker for ticker in self._universe if ticker in fundamentals]
+        if not tickers:
+            raise ScreenerError("No fundamentals available for any ticker of the screener universe")
+
+        rows = [compute_screener_fields(*fundamentals[ticker]) for ticker in tickers]
+        sectors = [find_field(fundamentals[ticker][1], "sector") for ticker in tickers]
+        snapshot = ScreenerSnapshot(
+            tickers=np.array(tickers),
+            sectors=np.array([sector if isinstance(sector, str) else "" for sector in sectors]),
+            columns={field: np.array([row[field] for row in rows], dtype=float) for field in SCREENER_FIELDS},
+            built_at=time.time(),
+        )
+        await asyncio.to_thread(self._snapshot_store.save, snapshot)
+        logger.info(
+            "Built screener snapshot of %d tickers in %.1fs (%d failed)",
+            len(tickers), time.monotonic() - start, len(errors),
+        )
+        return snapshot
+
+    async def _refresh_safely(self) -> None:
+        async with self._snapshot_store.refresh_lock:
+            snapshot = self._snapshot_store.get()
+            if snapshot and time.time() - snapshot.built_at < settings.SCREENER_REFRESH_SECONDS:
+                return
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning("Failed to refresh the screener snapshot: %s", str(e))
+
+    async def get_snapshot(self) -> ScreenerSnapshot:
+        """
+        Returns the current snapshot. A stale snapshot is returned as is while a fresh
+        one is built in the background; without any snapshot, the first one is built
+        before returning.
+        """
+        snapshot = self._snapshot_store.get()
+        if snapshot is None:
+            async with self._snapshot_store.refresh_lock:
+                snapshot = self._snapshot_store.get() or await self.refresh()
+        elif time.time() - snapshot.built_at >= settings.SCREENER_REFRESH_SECONDS:
+            task = self._snapshot_store.refresh_task
+            if task is None or task.done():
+                self._snapshot_store.refresh_task = asyncio.create_task(self._refresh_safely())
+        return snapshot
+
+    async def screen(
+        self,
+        filter_by: str | None = None,
+        rank_by: str | None = None,
+        descending: bool = True,
+        sectors: list[str] | None = None,
+        limit: int = 20,
+    ) -> dict:
+        """
+        Screens the universe.
+
+        Args:
+            filter_by: Boolean expression over the snapshot fields, e.g.
+                "pe_ratio < 20 and dividend_yield > 0.03". Companies with a missing
+                field in a comparison don't match.
+            rank_by: Expression the matches are sorted by, e.g. "fcf_yield" or
+                "revenue_growth_yoy / pe_ratio". Companies without a value come last.
+            descending: Whether the highest ranked values come first.
+            sectors: Only keep the companies of these sectors (case-insensitive).
+            limit: Maximum number of companies returned.
+
+        Returns:
+            The matching companies as a compact table with the fields the expressions
+            refer to, the number of matches and the snapshot age.
+
+        Raises:
+            ExpressionError: If an expression is invalid or refers to an unknown field.
+        """
+        filter_tree = parse_expression(filter_by) if filter_by else None
+        rank_tree = parse_expression(rank_by) if rank_by else None
+        referenced_fields = set()
+        for tree in (filter_tree, rank_tree):
+            if tree is not None:
+                unknown_fields = expression_names(tree) - set(SCREENER_FIELDS)
+                if unknown_fields:
+                    raise ExpressionError(
+                        f"Unknown fields: {', '.join(sorted(unknown_fields))}. Available fields: {', '.join(SCREENER_FIELDS)}"
+                    )
+                referenced_fields |= expression_names(tree)
+
+        snapshot = await self.get_snapshot()
+        start = time.perf_counter()
+        mask = np.ones(len(snapshot), dtype=bool)
+        if sectors:
+            mask &= np.isin(np.char.lower(snapshot.sectors), [sector.lower() for sector in sectors])
+
+        try:
+            with np.errstate(all="ignore"):
+                if filter_tree is not None:
+                    # NaN fails every comparison, so companies missing a filtered field are dropped
+                    matches = evaluate_expression(filter_tree, snapshot.columns)
+                    mask &= np.broadcast_to(np.asarray(matches, dtype=bool), mask.shape)
+                indices = np.flatnonzero(mask)
+                scores = None
+                if rank_tree is not None:
+                    scores = evaluate_expression(rank_tree, snapshot.columns)
+                    scores = np.broadcast_to(np.asarray(scores, dtype=float), mask.shape)[indices]
+                    # Sort the NaNs last in both directions
+                    keys = np.where(np.isnan(scores), np.inf, -scores if descending else scores)
+                    order = np.argsort(keys, kind="stable")
+                    indices, scores = indices[order], scores[order]
+        except ExpressionError:
+            raise
+        except (TypeError, ValueError) as e:
+            raise ExpressionError(f"Failed to evaluate the screen: {e}") from e
+        indices = indices[:limit]
+
+        fields = ["market_cap"] + [field for field in SCREENER_FIELDS if field in referenced_fields and field != "market_cap"]
+        columns = ["ticker", "sector"] + fields + (["rank_score"] if scores is not None else [])
+        rows = []
+        for i, index in enumerate(indices):
+            row = [str(snapshot.tickers[index]), str(snapshot.sectors[index]) or None]
+            row += [round_values(snapshot.columns[field][index], 4) for field in fields]
+            if scores is not None:
+                row.append(round_values(scores[i], 4))
+            rows.append(row)
+
+        return {
+            "matches": int(mask.sum()),
+            "universe_size": len(snapshot),
+            "results": {"columns": columns, "rows": rows},
+            "snapshot_age_seconds": round(time.time() - snapshot.built_at),
+            "screen_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
@@ -0,0 +1,279 @@
+from dataclasses import dataclass
+import fcntl
+import json
+import logging
+import os
+from pathlib import Path
+import re
+import shutil
+import time
+from urllib.parse import quote
+
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+_META_FILE = "meta.json"
+_DATES_FILE = "date.i8"
+# Version of the file layout, series written with another layout are rewritten
+_LAYOUT_VERSION = 2
+_LOCK_FILE = ".lock"
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9._-]")
+
+
+@dataclass
+class ColumnarSeries:
+    """
+    A date-indexed set of numeric columns. When read from the store the arrays are
+    read-only memory maps of the files on disk, so reading doesn't copy the data.
+    """
+    dates: np.ndarray               # datetime64[D], ascending
+    columns: dict[str, np.ndarray]  # float64, aligned with dates
+    updated_at: float               # Unix time of the last append
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @property
+    def last_date(self) -> np.datetime64 | None:
+        return self.dates[-1] if len(self.dates) else None
+
+    def slice(self, start: np.datetime64 | None = None, end: np.datetime64 | None = None) -> "ColumnarSeries":
+        lo = np.searchsorted(self.dates, start, side="left") if start is not None else 0
+        hi = np.searchsorted(self.dates, end, side="right") if end is not None else len(self.dates)
+        return ColumnarSeries(
+            dates=self.dates[lo:hi],
+            columns={name: values[lo:hi] for name, values in self.columns.items()},
+            updated_at=self.updated_at,
+        )
+
+
+class ColumnarSeriesStore:
+    """
+    Local on-disk columnar store for numeric time series, e.g. daily bars or quarterly
+    financials, one directory per dataset and ticker:
+
+        <root>/<dataset>/<TICKER>/meta.json
+        <root>/<dataset>/<TICKER>/date.i8      # days since epoch
+        <root>/<dataset>/<TICKER>/<field>.f8   # one raw float64 file per field, percent-encoded
+
+    Columns are raw little-endian arrays, so new rows are appended to the end of the
+    files and reads are memory maps. meta.json holds the committed row count and is
+    replaced atomically after the data files are written, so readers never see a
+    partial append. Writers of the same series are serialized with a file lock,
+    which also holds across worker processes sharing the directory.
+
+    Series that weren't updated for settings.SERIES_STORE_MAX_AGE_SECONDS are
+    evicted, and when the store grows over settings.SERIES_STORE_MAX_BYTES the
+    least recently updated series are evicted first.
+    """
+
+    def __init__(
+        self,
+        root_dir: str = settings.SERIES_STORE_DIR,
+        max_bytes: int = settings.SERIES_STORE_MAX_BYTES,
+        max_age_seconds: int = settings.SERIES_STORE_MAX_AGE_SECONDS,
+        eviction_interval_seconds: float = 60.0,
+    ):
+        self._root = Path(root_dir)
+        self._max_bytes = max_bytes
+        self._max_age_seconds = max_age_seconds
+        self._eviction_interval_seconds = eviction_interval_seconds
+        self._last_eviction = 0.0
+
+    def _series_dir(self, dataset: str, ticker: str) -> Path:
+        return self._root / _UNSAFE_CHARS.sub("_", dataset) / _UNSAFE_CHARS.sub("_", ticker.upper())
+
+    @staticmethod
+    def _column_file(series_dir: Path, field: str) -> Path:
+        # Percent-encoding is one-to-one, two fields never share a file
+        return series_dir / f"{quote(field, safe='')}.f8"
+
+    @staticmethod
+    def _read_meta(series_dir: Path, any_layout: bool = False) -> dict | None:
+        try:
+            meta = json.loads((series_dir / _META_FILE).read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+        if not any_layout and meta.get("version") != _LAYOUT_VERSION:
+            return None
+        return meta
+
+    @staticmethod
+    def _write_meta(series_dir: Path, meta: dict) -> None:
+        tmp_path = series_dir / f"{_META_FILE}.{os.getpid()}.tmp"
+        tmp_path.write_text(json.dumps(meta))
+        os.replace(tmp_path, series_dir / _META_FILE)
+
+    @staticmethod
+    def _map(path: Path, dtype: str, length: int) -> np.ndarray:
+        if length == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", shape=(length,))
+
+    def read(self, dataset: str, ticker: str, fields: list[str] | None = None) -> ColumnarSeries | None:
+        """
+        Reads a series as memory maps.
+
+        Args:
+            dataset: The dataset, e.g. "daily_prices".
+            ticker: The ticker.
+            fields: The columns to read. Defaults to every column.
+
+        Returns:
+            The series, or None if it isn't in the store.
+        """
+        series_dir = self._series_dir(dataset, ticker)
+        meta = self._read_meta(series_dir)
+        if meta is None:
+            return None
+
+        length = meta["length"]
+        try:
+            dates = self._map(series_dir / _DATES_FILE, "<i8", length).view("datetime64[D]")
+            columns = {
+                field: self._map(self._column_file(series_dir, field), "<f8", length)
+                for field in (fields if fields is not None else meta["fields"])
+                if field in meta["fields"]
+            }
+        except (FileNotFoundError, ValueError) as e:
+            # Evicted by another worker in the meantime
+            logger.warning("Failed to read series %s/%s: %s", dataset, ticker, str(e))
+            return None
+
+        return ColumnarSeries(dates=dates, columns=columns, updated_at=meta["updated_at"])
+
+    def append(self, dataset: str, ticker: str, dates: np.ndarray, columns: dict[str, np.ndarray]) -> int:
+        """
+        Appends the rows dated after the last stored row. Fields that are new to the
+        series are backfilled with NaN, and stored fields missing from the new rows
+        are filled with NaN.
+
+        Returns:
+            The number of rows appended.
+        """
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        series_dir = self._series_dir(dataset, ticker)
+        series_dir.mkdir(parents=True, exist_ok=True)
+
+        with open(series_dir / _LOCK_FILE, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            meta = self._read_meta(series_dir)
+            if meta is None:
+                # Start over, dropping the files of a series written with an older layout
+                for path in series_dir.iterdir():
+                    if path.name != _LOCK_FILE:
+                        path.unlink(missing_ok=True)
+                meta = {"length": 0, "fields": [], "last_date": None}
+            length = meta["length"]
+
+            new_rows = np.ones(len(dates), dtype=bool)
+            if meta["last_date"] is not None:
+                new_rows = dates > np.datetime64(meta["last_date"], "D")
+            order = np.argsort(dates[new_rows], kind="stable")
+            new_dates = dates[new_rows][order]
+
+            fields = list(meta["fields"])
+            for field in columns:
+                if field not in fields:
+                    fields.append(field)
+                    # Backfill the rows stored before the field appeared
+                    with open(self._column_file(series_dir, field), "wb") as f:
+                        np.full(length, np.nan, dtype="<f8").tofile(f)
+
+            if len(new_dates):
+                with open(series_dir / _DATES_FILE, "r+b" if length else "wb") as f:
+                    # Drop anything past the committed length left over by an interrupted append
+                    f.truncate(length * 8)
+                    f.seek(0, os.SEEK_END)
+                    new_dates.astype("<i8").tofile(f)
+                for field in fields:
+                    values = columns.get(field)
+                    values = np.asarray(values, dtype="<f8")[new_rows][order] if values is not None else np.full(len(new_dates), np.nan)
+                    with open(self._column_file(series_dir, field), "r+b") as f:
+                        f.truncate(length * 8)
+                        f.seek(0, os.SEEK_END)
+                        values.astype("<f8").tofile(f)
+
+            self._write_meta(series_dir, {
+                "version": _LAYOUT_VERSION,
+                "length": length + len(new_dates),
+                "fields": fields,
+                "last_date": str(new_dates[-1]) if len(new_dates) else meta["last_date"],
+                "updated_at": time.time(),
+            })
+
+        self._maybe_evict()
+        return len(new_dates)
+
+    def replace(self, dataset: str, ticker: str, dates: np.ndarray, columns: dict[str, np.ndarray]) -> None:
+        """Replaces a whole series, e.g. when older history than the stored one is needed."""
+        self.delete(dataset, ticker)
+        self.append(dataset, ticker, dates, columns)
+
+    def touch(self, dataset: str, ticker: str) -> None:
+        """Marks a series as up to date without appending rows."""
+        self.append(dataset, ticker, np.empty(0, dtype="datetime64[D]"), {})
+
+    def delete(self, dataset: str, ticker: str) -> None:
+        shutil.rmtree(self._series_dir(dataset, ticker), ignore_errors=True)
+
+    def _maybe_evict(self) -> None:
+        now = time.monotonic()
+        if now - self._last_eviction < self._eviction_interval_seconds:
+            return
+        self._last_eviction = now
+        try:
+            self.evict()
+        except OSError as e:
+            logger.warning("Series store eviction failed: %s", str(e))
+
+    def evict(self) -> int:
+        """
+        Evicts the series older than the max age, then the least recently updated
+        series until the store fits in the max size.
+
+        Returns:
+            The number of series evicted.
+        """
+        if not self._root.exists():
+            return 0
+
+        series = []
+        for series_dir in self._root.glob("*/*"):
+            meta = self._read_meta(series_dir, any_layout=True)
+            if meta is None:
+                continue
+            size = sum(path.stat().st_size for path in series_dir.iterdir() if path.is_file())
+            series.append((meta["updated_at"], size, series_dir))
+
+        series.sort()
+        now = time.time()
+        total_size = sum(size for _, size, _ in series)
+        evicted = 0
+        for updated_at, size, series_dir in series:
+            if now - updated_at <= self._max_age_seconds and total_size <= self._max_bytes:
+                break
+            shutil.rmtree(series_dir, ignore_errors=True)
+            total_size -= size
+            evicted += 1
+
+        if evicted:
+            logger.info("Evicted %d series from the series store", evicted)
+        return evicted
+
+    def get_metrics(self) -> dict:
+        series_count = 0
+        total_size = 0
+        if self._root.exists():
+            for series_dir in self._root.glob("*/*"):
+                series_count += 1
+                total_size += sum(path.stat().st_size for path in series_dir.iterdir() if path.is_file())
+        return {
+            "series": series_count,
+            "size_bytes": total_size,
+            "max_bytes": self._max_bytes,
+        }
@@ -9,6 +9,7 @@ from config import settings
 from models.session import (
     Session,
     Message,
+    ToolMemoEntry,
 )
 from services.user_context import UserContextNotFoundError
 
@@ -38,6 +39,10 @@ class SessionService(ABC):
     async def get_user_sessions(self, user_id: str) -> list[Session]:
         pass
 
+    @abstractmethod
+    async def update_tool_memo(self, session_id: str, tool_memo: list[ToolMemoEntry]) -> None:
+        pass
+
 
 class MessageMongoDoc(Message):
     pass
@@ -49,6 +54,7 @@ class SessionMongoDoc(BaseModel):
     messages: list[MessageMongoDoc]
     name: str
     created_at: str
+    tool_memo: list[ToolMemoEntry] = []
 
 
 class MongoDBSessionService(SessionService):
@@ -122,6 +128,7 @@ class MongoDBSessionService(SessionService):
             ],
             name=mongo_doc.name,
             created_at=mongo_doc.created_at,
+            tool_memo=mongo_doc.tool_memo,
         )
 
     async def add_message(self, session_id: str, message: Message) -> Session | None:
@@ -170,3 +177,22 @@ class MongoDBSessionService(SessionService):
                 )
             )
         return sessions
+
+    async def update_tool_memo(self, session_id: str, tool_memo: list[ToolMemoEntry]) -> None:
+        """
+        Replace the tool call memo stored alongside the session.
+
+        Args:
+            session_id (str): The ID of the session.
+            tool_memo (list[ToolMemoEntry]): The memo entries to store.
+
+        Raises:
+            SessionNotFoundError: If the session doesn't exist.
+        """
+        session_collection = self.db[settings.SESSION_COLLECTION_NAME]
+        result = await session_collection.update_one(
+            {"sessionID": session_id},
+            {"$set": {"tool_memo": [entry.model_dump() for entry in tool_memo]}},
+        )
+        if result.matched_count == 0:
+            raise SessionNotFoundError("Session not found")
@@ -0,0 +1,111 @@
+from collections import Counter
+from collections.abc import (
+    Hashable,
+    Sequence,
+)
+import re
+
+import numpy as np
+
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i if in into is it its me my of on or our "
+    "should so than that the their them then there these this to was we what when which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased word tokens without stopwords, with a naive plural stemming."""
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a small corpus, held as a dense (documents, vocabulary) term frequency
+    matrix. Documents are identified by a key and can be added, replaced and removed
+    incrementally; the BM25 weights are recomputed on the first search after a change.
+    """
+
+    def __init__(
+        self,
+        documents: Sequence[list[str]] = (),
+        keys: Sequence[Hashable] | None = None,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary: dict[str, int] = {}
+        self.keys: list[Hashable] = []
+        self._term_frequencies = np.zeros((0, 0), dtype=np.float32)
+        self._weights: np.ndarray | None = None
+        self.add(documents, keys if keys is not None else range(len(documents)))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, documents: Sequence[list[str]], keys: Sequence[Hashable]) -> None:
+        """Adds tokenized documents, replacing the documents already indexed under the same keys."""
+        keys = list(keys)
+        if not keys:
+            return
+        self.remove(keys)
+        new_terms = sorted({term for document in documents for term in document} - self.vocabulary.keys())
+        for term in new_terms:
+            self.vocabulary[term] = len(self.vocabulary)
+
+        rows = np.zeros((len(documents), len(self.vocabulary)), dtype=np.float32)
+        for i, document in enumerate(documents):
+            for term, count in Counter(document).items():
+                rows[i, self.vocabulary[term]] = count
+        term_frequencies = np.pad(self._term_frequencies, ((0, 0), (0, len(new_terms))))
+        self._term_frequencies = np.vstack([term_frequencies, rows])
+        self.keys.extend(keys)
+        self._weights = None
+
+    def remove(self, keys: Sequence[Hashable]) -> None:
+        removed = set(keys)
+        keep = np.array([key not in removed for key in self.keys], dtype=bool)
+        if keep.all():
+            return
+        self._term_frequencies = self._term_frequencies[keep]
+        self.keys = [key for key in self.keys if key not in removed]
+        self._weights = None
+
+    @property
+    def weights(self) -> np.ndarray:
+        if self._weights is None:
+            term_frequencies = self._term_frequencies
+            lengths = term_frequencies.sum(axis=1, keepdims=True)
+            document_frequencies = (term_frequencies > 0).sum(axis=0)
+            idf = np.log(1 + (len(term_frequencies) - document_frequencies + 0.5) / (document_frequencies + 0.5))
+            average_length = lengths.mean() if len(lengths) else 0.0
+            normalization = self.k1 * (1 - self.b + self.b * lengths / max(average_length, 1.0))
+            self._weights = idf * term_frequencies * (self.k1 + 1) / (term_frequencies + normalization)
+        return self._weights
+
+    def score(self, query: list[str]) -> np.ndarray:
+        """The BM25 score of every document for the query, in the order of keys."""
+        counts = Counter(term for term in query if term in self.vocabulary)
+        if not counts:
+            return np.zeros(len(self.keys), dtype=np.float32)
+        indices = [self.vocabulary[term] for term in counts]
+        return self.weights[:, indices] @ np.array(list(counts.values()), dtype=np.float32)
+
+    def top_k(self, query: list[str], k: int) -> list[tuple[Hashable, float]]:
+        """The keys and scores of the k best matching documents, leaving out the documents that don't match at all."""
+        scores = self.score(query)
+        if not len(scores):
+            return []
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(self.keys[i], float(scores[i])) for i in best if scores[i] > 0]
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
+from collections import defaultdict
 import datetime as dt
+import logging
 from typing import Any
 
 from pydantic import BaseModel
@@ -13,6 +15,13 @@ from models.user_context import (
     UserContext,
     UserConversationNotes,
 )
+from services.memory_search import MemorySearchService
+from services.notes_compaction import (
+    merge_notes,
+    notes_period,
+)
+
+logger = logging.getLogger(__name__)
 
 
 class UserContextAlreadyExistsError(Exception):
@@ -61,6 +70,10 @@ class UserContextService(ABC):
     ) -> None:
         pass
 
+    @abstractmethod
+    async def compact_conversation_notes(self, today: dt.date | None = None) -> dict[str, int]:
+        pass
+
 
 class UserContextMongoDoc(BaseModel):
     user_id: str
@@ -73,11 +86,13 @@ class UserConversationNotesMongoDoc(BaseModel):
     user_id: str
     date: str
     notes: dict
+    period: str | None = None   # Set on the digests of older notes, see compact_conversation_notes
 
 
 class MongoDBUserContextService(UserContextService):
-    def __init__(self, mongo_client: AsyncMongoClient):
+    def __init__(self, mongo_client: AsyncMongoClient, memory_search_service: MemorySearchService | None = None):
         self.db = mongo_client[settings.MONGO_DB_NAME]
+        self._memory_search_service = memory_search_service
 
     async def create_user_context(
         self, 
@@ -195,6 +210,7 @@ class MongoDBUserContextService(UserContextService):
     ) -> list[UserConversationNotes]:
         """
         Get conversation notes for the given user_id, ordered by most recent date first.
+        Older notes come as weekly or monthly digests (see compact_conversation_notes).
 
         Args:
             user_id: The user_id for which to get conversation notes.
@@ -212,6 +228,7 @@ class MongoDBUserContextService(UserContextService):
                 user_id=doc["user_id"],
                 date=doc["date"],
                 notes=doc["notes"],
+                period=doc.get("period"),
             )
             for doc in docs
         ]
@@ -242,7 +259,7 @@ class MongoDBUserContextService(UserContextService):
         if not notes:
             # If notes is empty, just ensure the document exists with an empty notes object if new
             await collection.update_one(
-                {"user_id": user_id, "date": date},
+                {"user_id": user_id, "date": date, "period": None},
                 {"$setOnInsert": {"notes": {}}},
                 upsert=True,
             )
@@ -251,7 +268,98 @@ class MongoDBUserContextService(UserContextService):
         # Use dot notation to update specific keys within the notes object without overwriting others
         update_data = {f"notes.{k}": v for k, v in notes.items()}
         await collection.update_one(
-            {"user_id": user_id, "date": date},
+            {"user_id": user_id, "date": date, "period": None},
             {"$set": update_data},
             upsert=True,
         )
+
+        if self._memory_search_service:
+            # The notes are saved either way, they are only missing from the search results
+            try:
+                await self._memory_search_service.index_conversation_notes(user_id=user_id, date=date, notes=notes)
+            except Exception as e:
+                logger.warning("Failed to index the conversation notes of user %s: %s", user_id, str(e))
+
+    async def compact_conversation_notes(self, today: dt.date | None = None) -> dict[str, int]:
+        """
+        Rolls the daily notes of every user into weekly digests once they are
+        NOTES_COMPACTION_WEEKLY_AFTER_DAYS old, and the weekly digests and days into
+        monthly digests once they are NOTES_COMPACTION_MONTHLY_AFTER_DAYS old (see
+        notes_period), so that the notes of a user grow by about one document a month.
+
+        The notes of a period are merged key by key in date order (see merge_notes) and
+        replace the documents they were merged from, in the memory index too. Notes
+        written late for a compacted period are merged into its digest on the next run.
+
+        Args:
+            today: The date compaction is computed from. Defaults to the current UTC date.
+
+        Returns:
+            The number of users compacted, digests written and documents merged into them.
+        """
+        today = today or dt.datetime.now(dt.timezone.utc).date()
+        cutoff = (today - dt.timedelta(days=settings.NOTES_COMPACTION_WEEKLY_AFTER_DAYS)).isoformat()
+        collection = self.db[settings.USER_CONVERSATION_NOTES_COLLECTION_NAME]
+        # Monthly digests are never compacted further, only merged into
+        user_ids = await collection.distinct(
+            "user_id",
+            {"date": {"$lt": cutoff}, "$or": [{"period": None}, {"period": {"$regex": "-W"}}]},
+        )
+
+        stats = {"users": 0, "digests": 0, "documents": 0}
+        for user_id in user_ids:
+            try:
+                digests, documents = await self._compact_user_conversation_notes(user_id, today, cutoff)
+            except Exception as e:
+                logger.error(f"Failed to compact the conversation notes of user {user_id}: {e}", exc_info=True)
+                continue
+            if digests:
+                stats["users"] += 1
+                stats["digests"] += digests
+                stats["documents"] += documents
+        logger.info(
+            "Compacted %d conversation notes documents of %d users into %d digests",
+            stats["documents"], stats["users"], stats["digests"],
+        )
+        return stats
+
+    async def _compact_user_conversation_notes(self, user_id: str, today: dt.date, cutoff: str) -> tuple[int, int]:
+        collection = self.db[settings.USER_CONVERSATION_NOTES_COLLECTION_NAME]
+        docs = await collection.find({"user_id": user_id, "date": {"$lt": cutoff}}).to_list(length=None)
+        groups: dict[tuple[str, dt.date], list[dict]] = defaultdict(list)
+        for doc in docs:
+            period = notes_period(dt.date.fromisoformat(doc["date"]), today)
+            if period is not None:
+                groups[period].append(doc)
+
+        digests = documents = 0
+        for (label, start), group in groups.items():
+            if len(group) == 1 and group[0].get("period") == label:
+                continue
+            # Date order, a digest before the days written late for its first date
+            group.sort(key=lambda doc: (doc["date"], doc.get("period") is None))
+            notes: dict[str, Any] = {}
+            for doc in group:
+                notes = merge_notes(notes, doc.get("notes") or {})
+
+            await collection.update_one(
+                {"user_id": user_id, "period": label},
+                {"$set": {"date": start.isoformat(), "notes": notes}},
+                upsert=True,
+            )
+            merged_ids = [doc["_id"] for doc in group if doc.get("period") != label]
+            await collection.delete_many({"_id": {"$in": merged_ids}})
+            digests += 1
+            documents += len(merged_ids)
+
+            if self._memory_search_service:
+                # The digest is saved either way, it is only missing from the search results
+                try:
+                    await self._memory_search_service.remove_conversation_notes(
+                        user_id=user_id,
+                        dates=[doc.get("period") or doc["date"] for doc in group],
+                    )
+                    await self._memory_search_service.index_conversation_notes(user_id=user_id, date=label, notes=notes)
+                except Exception as e:
+                    logger.warning("Failed to index the conversation notes digest %s of user %s: %s", label, user_id, str(e))
+        return digests, documents